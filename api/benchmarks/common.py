@@ -0,0 +1,44 @@
+"""
+Helpers shared by the benchmark scripts in this directory.
+
+Benchmarks run against the database configured in config.settings, e.g.
+`docker exec -it csapi poetry run python benchmarks/partitioning.py`
+"""
+
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def setup_django():
+    sys.path.insert(0, str(SRC_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+
+    django.setup()
+
+
+def measure(func, repeat):
+    """
+    Calls `func` `repeat` times and returns the durations in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations):
+    """
+    Returns the median and 95th percentile of `durations` in milliseconds.
+    """
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return "median %8.3f ms  p95 %8.3f ms" % (statistics.median(ordered), p95)
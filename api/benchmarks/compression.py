@@ -0,0 +1,69 @@
+"""
+Measures the CPU time against the bytes saved by compressing a resource list, as
+rendered by the resources API, for every encoding of
+core.middleware.CompressionMiddleware at a range of levels.
+
+Resources are built in memory, so the benchmark does not need any rows.
+
+Usage: python benchmarks/compression.py [--size 10000] [--repeat 20]
+"""
+
+import argparse
+
+from common import measure, setup_django, summarize
+
+LEVELS = {
+    "br": [1, 4, 6, 9, 11],
+    "zstd": [1, 3, 6, 12, 19],
+    "gzip": [1, 3, 6, 9],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=10_000, help="resources listed")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+
+    from core.compression import COMPRESSORS, compress
+    from core.renderers import FastJSONRenderer
+    from resources.models import Resource
+    from resources.serializers import ResourceSerializer
+
+    resources = [
+        Resource(
+            id=i,
+            title="Bitcoin is Sound Money, part %s" % i,
+            owner_id=i % 100,
+            created_at=timezone.now(),
+        )
+        for i in range(args.size)
+    ]
+    content = FastJSONRenderer().render(ResourceSerializer(resources, many=True).data)
+    print("%s resources, %.1f KiB uncompressed" % (args.size, len(content) / 1024))
+
+    for encoding, levels in LEVELS.items():
+        for level in levels:
+            compressor = COMPRESSORS[encoding]
+
+            durations = measure(
+                lambda: compress(compressor(level), content), args.repeat
+            )
+            size = len(compress(compressor(level), content))
+            print(
+                "  %-4s level %2s  %s  %8.1f KiB  ratio %5.1f"
+                % (
+                    encoding,
+                    level,
+                    summarize(durations),
+                    size / 1024,
+                    len(content) / size,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
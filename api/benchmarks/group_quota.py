@@ -0,0 +1,136 @@
+"""
+Measures concurrent resource creations by the members of one QuotaGroup, comparing:
+- a single counter row, which every creation locks until it commits
+- the group's counter sharded over `--shards` rows, see
+  resources.services.add_group_resource_count
+
+Each creation counts its resource, holds its lock for `--work-ms` as the rest of a
+creation would until it commits, then checks the group's quota. Every variant must
+create exactly `--amount` resources and reject the rest.
+
+A group and a member are created for the benchmark and deleted at the end.
+
+Usage: python benchmarks/group_quota.py [--threads 16] [--creates 50] [--shards 4 16]
+"""
+
+import argparse
+import threading
+import time
+
+from common import setup_django, summarize
+
+
+class Rejected(Exception):
+    pass
+
+
+def run(create, threads, creates):
+    """
+    Calls `create` `creates` times from each of `threads` threads. Returns the
+    durations of the calls in milliseconds, the number of resources created and the
+    total duration in seconds.
+    """
+    from django.db import connection
+
+    durations = []
+    created = []
+
+    def worker():
+        try:
+            for _ in range(creates):
+                start = time.perf_counter()
+                try:
+                    create()
+                    created.append(1)
+                except Rejected:
+                    pass
+                durations.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return durations, len(created), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--creates", type=int, default=50, help="per thread")
+    parser.add_argument("--shards", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--work-ms", type=float, default=2)
+    parser.add_argument(
+        "--amount", type=int, help="of the group, 3/4 of the creations by default"
+    )
+    args = parser.parse_args()
+    amount = args.amount or args.threads * args.creates * 3 // 4
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection, transaction
+
+    settings.SLOW_QUERY_THRESHOLD_MS = None  # lock waits are what is measured
+
+    from resources.models import QuotaGroup, QuotaGroupShard
+    from resources.services import (
+        add_group_resource_count,
+        get_exceeded_quota_groups,
+        recount_quota_group,
+    )
+    from users.models import EmailUser
+
+    member = EmailUser.objects.create_user("bench-group-quota@test-domain.com")
+    group = QuotaGroup.objects.create(name="bench-group-quota", amount=amount)
+    group.members.add(member)
+    table = QuotaGroupShard._meta.db_table
+
+    def work(cursor):
+        cursor.execute("SELECT pg_sleep(%s)", [args.work_ms / 1000])
+
+    def create_single_row():
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{table}" SET "count" = "count" + 1 '
+                'WHERE "group_id" = %s AND "count" < "capacity"',
+                [group.id],
+            )
+            if not cursor.rowcount:
+                raise Rejected
+            work(cursor)
+
+    def create_sharded():
+        with transaction.atomic(), connection.cursor() as cursor:
+            add_group_resource_count(member.id, 1, "default")
+            work(cursor)
+            if get_exceeded_quota_groups(member.id, "default"):
+                raise Rejected
+
+    variants = [("single row", 1, create_single_row)] + [
+        ("%s shards" % shards, shards, create_sharded) for shards in args.shards
+    ]
+
+    try:
+        print(
+            "%s threads x %s creations, group amount %s, %s ms of work per creation"
+            % (args.threads, args.creates, amount, args.work_ms)
+        )
+        for name, shards, create in variants:
+            settings.QUOTA_GROUP_SHARDS = shards
+            recount_quota_group(group.id, "default")  # resets the counts to 0
+
+            durations, created, seconds = run(create, args.threads, args.creates)
+            print(
+                "  %-12s %s  %8.0f creations/s  created %s"
+                % (name, summarize(durations), len(durations) / seconds, created)
+            )
+    finally:
+        group.delete()
+        member.delete()
+
+
+if __name__ == "__main__":
+    main()
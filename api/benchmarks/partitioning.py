@@ -0,0 +1,160 @@
+"""
+Compares an unpartitioned resource table with one hash partitioned by owner_id, as
+created by resources migration 0003.
+
+Both layouts are built in a scratch schema with the same generated rows, then measured
+on the queries ResourceViewSet issues (list, retrieve and count by owner), on index size
+and on the time to VACUUM after deleting a slice of rows.
+
+Usage: python benchmarks/partitioning.py [--rows 10000000] [--owners 100000]
+"""
+
+import argparse
+import random
+import time
+
+from common import measure, setup_django, summarize
+
+SCHEMA = "bench_partitioning"
+
+LAYOUTS = {
+    "unpartitioned": """
+        CREATE TABLE {table} (
+            id bigserial PRIMARY KEY,
+            title varchar(255) NOT NULL,
+            owner_id bigint NOT NULL
+        );
+    """,
+    "partitioned": """
+        CREATE TABLE {table} (
+            id bigserial,
+            title varchar(255) NOT NULL,
+            owner_id bigint NOT NULL,
+            PRIMARY KEY (id, owner_id)
+        ) PARTITION BY HASH (owner_id);
+    """,
+}
+
+
+def create_layout(cursor, layout, partitions):
+    table = "%s.%s" % (SCHEMA, layout)
+    cursor.execute(LAYOUTS[layout].format(table=table))
+
+    if layout == "partitioned":
+        for remainder in range(partitions):
+            cursor.execute(
+                "CREATE TABLE %s_p%s PARTITION OF %s "
+                "FOR VALUES WITH (MODULUS %s, REMAINDER %s)"
+                % (table, remainder, table, partitions, remainder)
+            )
+
+    cursor.execute("CREATE INDEX ON %s (owner_id)" % table)
+    return table
+
+
+def load(cursor, table, rows, owners):
+    cursor.execute(
+        "INSERT INTO %s (title, owner_id) "
+        "SELECT md5(n::text), 1 + floor(random() * %%s)::bigint "
+        "FROM generate_series(1, %%s) AS n" % table,
+        [owners, rows],
+    )
+    cursor.execute("VACUUM ANALYZE %s" % table)
+
+
+def index_size(cursor, table):
+    # pg_partition_tree() is empty for unpartitioned tables
+    cursor.execute(
+        "SELECT pg_size_pretty(coalesce("
+        "(SELECT sum(pg_indexes_size(relid)) FROM pg_partition_tree(%s::regclass)), "
+        "pg_indexes_size(%s::regclass)))",
+        [table, table],
+    )
+    return cursor.fetchone()[0]
+
+
+def bench_queries(cursor, table, owners, repeat):
+    def owner():
+        return random.randint(1, owners)
+
+    def list_by_owner():
+        cursor.execute(
+            "SELECT id, title, owner_id FROM %s WHERE owner_id = %%s" % table, [owner()]
+        )
+        return cursor.fetchall()
+
+    def count_by_owner():
+        cursor.execute(
+            "SELECT count(id) FROM %s WHERE owner_id = %%s" % table, [owner()]
+        )
+        return cursor.fetchone()
+
+    def retrieve():
+        owner_id = owner()
+        cursor.execute(
+            "SELECT id, title, owner_id FROM %s WHERE owner_id = %%s "
+            "AND id = (SELECT min(id) FROM %s WHERE owner_id = %%s)" % (table, table),
+            [owner_id, owner_id],
+        )
+        return cursor.fetchall()
+
+    for name, query in [
+        ("list by owner", list_by_owner),
+        ("count by owner", count_by_owner),
+        ("retrieve by id and owner", retrieve),
+    ]:
+        print("  %-26s %s" % (name, summarize(measure(query, repeat))))
+
+
+def bench_vacuum(cursor, table):
+    # delete ~10% of rows, the churn autovacuum has to clean up after
+    cursor.execute("DELETE FROM %s WHERE id %% 10 = 0" % table)
+    start = time.perf_counter()
+    cursor.execute("VACUUM %s" % table)
+    print(
+        "  %-26s %8.3f ms"
+        % ("vacuum after 10% delete", (time.perf_counter() - start) * 1000)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=10_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("DROP SCHEMA IF EXISTS %s CASCADE" % SCHEMA)
+        cursor.execute("CREATE SCHEMA %s" % SCHEMA)
+
+        try:
+            for layout in LAYOUTS:
+                table = create_layout(cursor, layout, args.partitions)
+
+                start = time.perf_counter()
+                load(cursor, table, args.rows, args.owners)
+                load_time = time.perf_counter() - start
+
+                print(
+                    "%s: %s rows, %s owners, loaded in %.1f s, indexes %s"
+                    % (
+                        layout,
+                        args.rows,
+                        args.owners,
+                        load_time,
+                        index_size(cursor, table),
+                    )
+                )
+                bench_queries(cursor, table, args.owners, args.repeat)
+                bench_vacuum(cursor, table)
+        finally:
+            cursor.execute("DROP SCHEMA IF EXISTS %s CASCADE" % SCHEMA)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures encoding resource lists, as returned by the resources API, comparing:
+- rest_framework.renderers.JSONRenderer, on top of the stdlib json module
+- core.renderers.FastJSONRenderer
+- core.renderers.MessagePackRenderer
+
+Resources are built in memory, so the benchmark does not need any rows.
+
+Usage: python benchmarks/renderers.py [--sizes 1000 10000] [--repeat 50]
+"""
+
+import argparse
+
+from common import measure, setup_django, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+
+    from core.renderers import FastJSONRenderer, MessagePackRenderer
+    from resources.models import Resource
+    from resources.serializers import ResourceSerializer
+
+    renderers = [JSONRenderer(), FastJSONRenderer(), MessagePackRenderer()]
+
+    for size in args.sizes:
+        resources = [
+            Resource(
+                id=i,
+                title="Bitcoin is Sound Money, part %s" % i,
+                owner_id=i % 100,
+                created_at=timezone.now(),
+            )
+            for i in range(size)
+        ]
+        data = ResourceSerializer(resources, many=True).data
+
+        print("%s resources" % size)
+        for renderer in renderers:
+            durations = measure(lambda: renderer.render(data), args.repeat)
+            print(
+                "  %-20s %s  %8.1f KiB"
+                % (
+                    type(renderer).__name__,
+                    summarize(durations),
+                    len(renderer.render(data)) / 1024,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measures title search over one user's resources, comparing:
+- downloading the whole list, as clients had to before `?search=`
+- an unindexed `icontains` filter
+- resources.filters.TitleSearchFilter, served by the owner/title GIN index
+
+Rows are generated inside a transaction that is rolled back at the end, so the
+benchmark leaves no data behind.
+
+Usage: python benchmarks/resource_search.py [--rows 1000000] [--other-users 10]
+"""
+
+import argparse
+import random
+
+from common import measure, setup_django, summarize
+
+VOCABULARY_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+def generate_resources(cursor, owner_ids, rows):
+    cursor.execute(
+        """
+        WITH vocabulary AS (
+            SELECT array_agg(substr(md5(i::text), 1, 6)) AS words
+            FROM generate_series(1, %s) AS i
+        )
+        INSERT INTO resources_resource (title, owner_id)
+        SELECT (
+            SELECT string_agg(words[1 + floor(random() * %s)::int], ' ')
+            FROM vocabulary, generate_series(1, 5)
+            WHERE n > 0  -- correlated, so that each row gets a new title
+        ), owner_id
+        FROM unnest(%s::bigint[]) AS owner_id, generate_series(1, %s) AS n
+        """,
+        [VOCABULARY_SIZE, VOCABULARY_SIZE, owner_ids, rows],
+    )
+    cursor.execute("ANALYZE resources_resource")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per user")
+    parser.add_argument("--other-users", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection, transaction
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from resources.filters import TitleSearchFilter
+    from resources.models import Resource
+    from users.models import EmailUser
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            users = [
+                EmailUser.objects.create_user("bench-search-%s@test-domain.com" % i)
+                for i in range(args.other_users + 1)
+            ]
+            generate_resources(cursor, [user.id for user in users], args.rows)
+
+            user_resources = Resource.objects.filter(owner=users[0])
+            words = list(
+                user_resources.values_list("title", flat=True)[:100].iterator()
+            )
+
+            def search_term():
+                word = random.choice(words).split()[0]
+                return word[: random.randint(3, len(word))]  # search-as-you-type
+
+            def list_all():
+                return list(user_resources.values_list("id", "title"))
+
+            def icontains():
+                queryset = user_resources.filter(title__icontains=search_term())
+                return list(queryset.values_list("id", "title"))
+
+            def full_text():
+                request = Request(
+                    APIRequestFactory().get("/", {"search": search_term()})
+                )
+                queryset = TitleSearchFilter().filter_queryset(
+                    request, user_resources, None
+                )
+                return list(queryset.values_list("id", "title")[:50])
+
+            print("%s resources per user, %s users" % (args.rows, args.other_users + 1))
+            for name, query in [
+                ("download whole list", list_all),
+                ("icontains", icontains),
+                ("full-text search (top 50)", full_text),
+            ]:
+                print("  %-26s %s" % (name, summarize(measure(query, args.repeat))))
+
+            request = Request(APIRequestFactory().get("/", {"search": search_term()}))
+            plan = (
+                TitleSearchFilter()
+                .filter_queryset(request, user_resources, None)[:50]
+                .explain(analyze=True, buffers=True)
+            )
+            print("\nfull-text search plan:\n" + plan)
+
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
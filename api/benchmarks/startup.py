@@ -0,0 +1,151 @@
+"""
+Measures the time-to-first-response of a new worker process, as after a deploy or a
+scale-up, comparing:
+- no bytecode: every module is compiled at startup, as in an image built without
+  `compileall` and run with PYTHONDONTWRITEBYTECODE
+- bytecode: modules are imported from their compiled bytecode
+- bytecode and core.warmup: the worker also warms up before taking its first request
+
+Each run starts a new interpreter that loads the WSGI application and serves an
+authenticated `GET /resources/`, then a second one for comparison. A user is created
+for the requests and deleted at the end.
+
+Usage: python benchmarks/startup.py [--repeat 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import SRC_DIR, setup_django
+
+BENCHMARK_EMAIL = "startup-benchmark@localhost"
+
+
+def child(warm_up):
+    """
+    Runs in the measured interpreter: loads the WSGI application and serves two
+    requests, then prints the durations of each phase in milliseconds.
+    """
+    start = time.perf_counter()
+    sys.path.insert(0, str(SRC_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    from wsgiref.util import setup_testing_defaults
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    if warm_up:
+        from core.warmup import warm_up
+
+        warm_up()
+
+    loaded = time.perf_counter()
+
+    def request():
+        environ = {
+            "PATH_INFO": "/resources/",
+            "wsgi.url_scheme": "https",
+            "HTTP_COOKIE": "%s=%s"
+            % (settings.JWT_ACCESS_TOKEN_COOKIE_NAME, os.environ["BENCHMARK_TOKEN"]),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        body = application(environ, lambda status, headers: statuses.append(status))
+        b"".join(body)
+        assert statuses[0].startswith("200"), statuses[0]
+
+    request()
+    first = time.perf_counter()
+    request()
+    second = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "load": (loaded - start) * 1000,
+                "first": (first - loaded) * 1000,
+                "second": (second - first) * 1000,
+            }
+        )
+    )
+
+
+def run(warm_up, env):
+    """
+    Returns the durations of a new interpreter's phases, including its own startup.
+    """
+    args = [sys.executable, __file__, "--child"] + (["--warm-up"] if warm_up else [])
+    start = time.perf_counter()
+    output = subprocess.run(args, env=env, check=True, capture_output=True, text=True)
+    durations = json.loads(output.stdout.splitlines()[-1])
+    durations["process"] = (time.perf_counter() - start) * 1000
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warm-up", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.warm_up)
+
+    setup_django()
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from users.models import EmailUser
+
+    user, _ = EmailUser.objects.get_or_create(email=BENCHMARK_EMAIL)
+    env = {**os.environ, "BENCHMARK_TOKEN": str(AccessToken.for_user(user))}
+
+    # an empty, read-only cache of bytecode for the `no bytecode` runs
+    no_bytecode_dir = tempfile.TemporaryDirectory()
+    no_bytecode_env = {
+        **env,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "PYTHONPYCACHEPREFIX": no_bytecode_dir.name,
+    }
+
+    variants = [
+        ("no bytecode", False, no_bytecode_env),
+        ("bytecode", False, env),
+        ("bytecode + warm-up", True, env),
+    ]
+
+    try:
+        run(False, env)  # writes the bytecode of the `bytecode` runs
+
+        print("%s runs, median ms" % args.repeat)
+        print(
+            "  %-20s %10s %10s %10s %10s"
+            % ("", "load", "1st req", "2nd req", "process")
+        )
+        for name, warm_up, variant_env in variants:
+            runs = [run(warm_up, variant_env) for _ in range(args.repeat)]
+            print(
+                "  %-20s %10.1f %10.1f %10.1f %10.1f"
+                % (
+                    name,
+                    *(
+                        statistics.median(r[phase] for r in runs)
+                        for phase in ("load", "first", "second", "process")
+                    ),
+                )
+            )
+    finally:
+        no_bytecode_dir.cleanup()
+        user.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,26 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.stickiness import start_stickiness_listener  # noqa: E402
+from core.warmup import warm_up  # noqa: E402
+from resources.cache import start_quota_invalidation_listener  # noqa: E402
+from resources.events import RESOURCE_EVENTS_PATH, resource_events  # noqa: E402
+
+# drop quotas cached by this worker when any worker changes them
+start_quota_invalidation_listener()
+
+# pin the reads of users who wrote through any worker to the primary
+start_stickiness_listener()
+
+# build what django and DRF build lazily before the first request, not during it
+warm_up()
+
+
+async def application(scope, receive, send):
+    # the event stream outlives a request, which django's ASGI handler does not support
+    if scope["type"] == "http" and scope["path"] == RESOURCE_EVENTS_PATH:
+        return await resource_events(scope, receive, send)
+
+    return await django_application(scope, receive, send)
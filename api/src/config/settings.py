@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -43,12 +44,18 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
+    "core.apps.CoreConfig",
     "users.apps.UsersConfig",
     "resources.apps.ResourcesConfig",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.RequestIdMiddleware",
+    "core.middleware.AdmissionControlMiddleware",
+    "core.middleware.ProfilingMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.ReplicaStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -87,7 +94,18 @@ CSRF_TRUSTED_ORIGINS = ["test-domain.com"]  # TODO: externalize test settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-    ]
+    ],
+    # orjson based JSON, and MessagePack for clients sending the matching `Accept`
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
@@ -105,6 +123,35 @@ DATABASES = {
     }
 }
 
+# Read replicas, as a comma-separated list of hosts sharing the credentials above.
+# Reads are routed to them by core.routers.PrimaryReplicaRouter. Locally, a replica can
+# be simulated by pointing it at the primary e.g. DB_REPLICA_HOSTS=csdb
+# Leave it unset when running tests, which only set up the default database.
+DB_REPLICA_HOSTS = [h for h in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if h]
+REPLICA_DATABASES = []
+
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    alias = "replica_%s" % index
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+
+# After a write, a user reads from the primary for this long so that they see their own
+# writes while the replicas catch up. See core.middleware.ReplicaStickinessMiddleware
+REPLICA_STICKINESS_SECONDS = 10
+
+# Response compression, see core.middleware.CompressionMiddleware. Encodings in order
+# of preference mapped to their level, e.g. lower levels trade bytes for CPU time.
+# Compare levels with benchmarks/compression.py
+COMPRESSION_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+# Bodies smaller than this many bytes are not worth compressing
+COMPRESSION_MIN_SIZE = 1024
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -148,6 +195,114 @@ SIMPLE_JWT = {
 JWT_ACCESS_TOKEN_COOKIE_NAME = "access"
 JWT_REFRESH_TOKEN_COOKIE_NAME = "refresh"
 
+# Quotas read by the quota check of resource creation are cached per process for this
+# many seconds, which bounds their staleness should an invalidation be missed, for up
+# to this many users. See resources.cache
+QUOTA_CACHE_TTL = 300
+QUOTA_CACHE_SIZE = 10_000
+
+# Resources of a QuotaGroup are counted on this many shards, so that members creating
+# resources at the same time rarely wait on each other's counter lock. Recount the groups
+# (see the QuotaGroup admin) after changing it. See resources.services
+QUOTA_GROUP_SHARDS = 16
+
+# Idle resource event streams send a comment this often, so that proxies keep them
+# open. See resources.events
+RESOURCE_EVENTS_HEARTBEAT_SECONDS = 15
+
+# Users deleted through the admin are deactivated, then their resources are deleted in
+# batches of this many rows by a background job. See users.services
+USER_DELETION_BATCH_SIZE = 1000
+
+# Users provisioned in bulk from a file are inserted in batches of this many rows, while
+# their passwords are hashed by this many processes, all cores if None. See
+# users.services.UserProvisioningService
+USER_PROVISIONING_BATCH_SIZE = 1000
+USER_PROVISIONING_PROCESSES = None
+# Passwords of a file uploaded to POST /users/provision/ are hashed in the request, so
+# that they are never stored in plaintext. Larger files are provisioned with
+# `manage.py provision_users`
+USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS = 100
+
+# Background jobs, see core.jobs. Idle workers check for due jobs this often, besides
+# being woken when a job is queued
+JOBS_POLL_SECONDS = 5
+# a job whose worker did not renew its lease for this long is assumed lost and run
+# again. Running jobs have their lease renewed this often
+JOBS_LEASE_SECONDS = 15 * 60
+JOBS_LEASE_RENEWAL_SECONDS = 60
+# failed jobs are retried this many times in total, with exponential backoff
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF_SECONDS = 10
+JOBS_MAX_RETRY_BACKOFF_SECONDS = 60 * 60
+
+# Staff profile a request by sending a token from POST /profiles/token/, valid this many
+# seconds, in its X-Profile header. The request's stack is sampled this often, and up to
+# this many of its queries are recorded. See core.profiling
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_INTERVAL_SECONDS = 0.001
+PROFILING_MAX_QUERIES = 1000
+
+# Queries taking this many milliseconds or more are logged with the innermost frames of
+# the project code that issued them, up to this many, and the latest of them are kept
+# per process. None, set by an empty or `off` value, disables the slow-query log. See
+# core.slow_queries
+SLOW_QUERY_THRESHOLD_MS = os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200").strip()
+SLOW_QUERY_THRESHOLD_MS = (
+    float(SLOW_QUERY_THRESHOLD_MS)
+    if SLOW_QUERY_THRESHOLD_MS.lower() not in ("", "off")
+    else None
+)
+SLOW_QUERY_STACK_DEPTH = 8
+SLOW_QUERY_LOG_SIZE = 500
+
+# Requests in progress and queued per route, by URL name, beyond which requests are
+# turned away with a 503, retried after ADMISSION_RETRY_AFTER_SECONDS. Routes not listed
+# share the default limits, priority routes are always admitted. Limits are per process.
+# See core.admission
+ADMISSION_LIMITS = {
+    "default": {"concurrency": 32, "queue": 64},
+    "users:login": {"concurrency": 4, "queue": 16},
+    "users:register": {"concurrency": 4, "queue": 16},
+    "users:provision": {"concurrency": 1, "queue": 0},
+    "resources:quota-bulk": {"concurrency": 2, "queue": 4},
+}
+ADMISSION_PRIORITY_ROUTES = ["users:get-csrf-cookie", "core:health"]
+ADMISSION_QUEUE_TIMEOUT_SECONDS = 2
+ADMISSION_RETRY_AFTER_SECONDS = 1
+
+# Admin changelists of large tables show the planner's row estimate instead of an exact
+# COUNT(*) once the estimate reaches this many rows. See core.paginators
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+# Logging
+# https://docs.djangoproject.com/en/3.2/topics/logging/
+
+# Records are queued by the thread that logs them and written to stderr as JSON lines by
+# a background thread, so that requests never wait on log I/O. Beyond LOG_QUEUE_SIZE
+# queued records the oldest are dropped, and the number dropped is logged. See core.log
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = 10_000
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "queue": {
+            "()": "core.log.QueueLogHandler",
+            "stream": "ext://sys.stderr",
+            "maxsize": LOG_QUEUE_SIZE,
+            "drop": "oldest",
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # replaces the console and mail_admins handlers of django's default config
+        "django": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
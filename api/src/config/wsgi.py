@@ -14,3 +14,18 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# drop quotas cached by this worker when any worker changes them
+from resources.cache import start_quota_invalidation_listener  # noqa: E402
+
+start_quota_invalidation_listener()
+
+# pin the reads of users who wrote through any worker to the primary
+from core.stickiness import start_stickiness_listener  # noqa: E402
+
+start_stickiness_listener()
+
+# build what django and DRF build lazily before the first request, not during it
+from core.warmup import warm_up  # noqa: E402
+
+warm_up()
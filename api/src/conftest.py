@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
@@ -23,6 +25,14 @@ def csrftoken(csrf_enforced_client):
 TRUSTED_REFERER = "https://test-domain.com/path/to/"
 
 
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
 @pytest.fixture
 def email(faker):
     return faker.company_email()
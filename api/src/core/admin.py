@@ -0,0 +1,55 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, RequestProfile
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "name",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_at",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "name")
+    ordering = ("-created_at",)
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ["requeue"]
+
+    @admin.action(description="Run selected jobs again")
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED,
+            run_at=timezone.now(),
+            attempts=0,
+            finished_at=None,
+        )
+        self.message_user(request, "%s jobs queued." % count)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "samples",
+        "user",
+        "created_at",
+    )
+    list_filter = ("method", "status_code")
+    ordering = ("-created_at",)
+    readonly_fields = [field.name for field in RequestProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
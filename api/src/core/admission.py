@@ -0,0 +1,89 @@
+"""
+Admission control: bounds how many requests of a route are handled at once, so that
+under overload requests are turned away quickly with a 503 instead of queueing without
+bound, which would make every request slow.
+
+Routes are identified by their URL name. Those listed in `ADMISSION_LIMITS` e.g. login,
+whose password hashing is expensive, or bulk operations, get a limiter of their own,
+any other route shares the `default` one. Each limiter admits up to `concurrency`
+requests, then queues up to `queue` more for up to `ADMISSION_QUEUE_TIMEOUT_SECONDS`,
+then rejects. Routes listed in `ADMISSION_PRIORITY_ROUTES` e.g. the CSRF cookie and the
+health check are cheap and always admitted, so that they keep working while expensive
+routes are saturated.
+
+Limits are per process, e.g. per gunicorn worker.
+"""
+
+import threading
+
+DEFAULT_ROUTE = "default"
+
+
+class AdmissionLimiter:
+    """
+    Admits up to `concurrency` callers at once, and queues up to `queue_size` more
+    callers for up to `timeout` seconds, in the order they came.
+    """
+
+    def __init__(self, concurrency, queue_size, timeout):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Returns whether the caller is admitted, in which case it must call `release()`
+        once done.
+        """
+        with self._condition:
+            # callers do not get ahead of those already waiting
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                return True
+
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self.active < self.concurrency, self.timeout
+                )
+            finally:
+                self.waiting -= 1
+
+            if admitted:
+                self.active += 1
+            else:
+                self.rejected += 1
+            return admitted
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "concurrency": self.concurrency,
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+            }
+
+
+def get_limiters(limits, timeout):
+    """
+    Returns a limiter per route of `limits`, a mapping of route names to their
+    `concurrency` and `queue` sizes, which must include `DEFAULT_ROUTE`.
+    """
+    return {
+        route: AdmissionLimiter(limit["concurrency"], limit["queue"], timeout)
+        for route, limit in limits.items()
+    }
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .jobs import autodiscover
+        from .slow_queries import install
+
+        connection_created.connect(install)
+
+        # enqueue() only accepts registered jobs, in web processes too
+        autodiscover()
@@ -0,0 +1,103 @@
+"""
+Fans out postgres notifications to asyncio subscribers e.g. the clients of an event
+stream, so that a worker serves any number of them from a single LISTEN connection.
+"""
+
+import asyncio
+import contextlib
+import json
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .notifications import Listener
+
+
+class Subscription:
+    """
+    Queue of the messages for one subscriber. A None message means messages may have
+    been missed, as the subscriber fell behind or the listener reconnected, and the
+    subscriber should reload its state.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = asyncio.Queue(maxsize)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def put(self, message):
+        if message is not None and not self.queue.full():
+            self.queue.put_nowait(message)
+            return
+
+        # the pending messages are superseded by the reload
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """
+    Delivers the JSON payloads notified on `channel` to the subscribers of their `key`
+    field, e.g. the owner of a changed resource.
+
+    The Listener thread is started by the first subscription and hands payloads over
+    to the event loop of that subscription, which all subscribers must share.
+    """
+
+    def __init__(self, channel, key, using=DEFAULT_DB_ALIAS, maxsize=100):
+        self.channel = channel
+        self.key = key
+        self.using = using
+        self.maxsize = maxsize
+
+        self._subscriptions = defaultdict(set)  # key -> subscriptions
+        self._listener = None
+        self._loop = None
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, key):
+        if self._listener is None:
+            self._start()
+
+        subscription = Subscription(self.maxsize)
+        self._subscriptions[key].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions[key].discard(subscription)
+            if not self._subscriptions[key]:
+                del self._subscriptions[key]
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    @property
+    def subscription_count(self):
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._listener = Listener(self.channel, self._on_notification, using=self.using)
+        self._listener.start()
+
+    def _on_notification(self, payload):
+        # called from the listener thread
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, payload)
+        except RuntimeError:  # the event loop was closed e.g. on server shutdown
+            self.stop()
+
+    def _dispatch(self, payload):
+        if payload is None:
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.put(None)
+            return
+
+        message = json.loads(payload)
+        for subscription in self._subscriptions.get(message[self.key], ()):
+            subscription.put(message)
@@ -0,0 +1,67 @@
+"""
+Single-flight coalescing: concurrent calls with the same key share the result of the
+call that came first, instead of each computing it.
+
+Only calls in flight at the same time are coalesced, nothing is cached once the first
+call returns. Keys must therefore capture everything the result depends on.
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces the calls of the threads of a process, e.g. of a threaded WSGI worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def call(self, key, func):
+        """
+        Returns `func()`, or waits for the call in flight with the same `key` and
+        returns its result. An exception raised by the call is raised to every caller.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
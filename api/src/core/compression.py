@@ -0,0 +1,103 @@
+"""
+Incremental compressors for the content encodings negotiated by
+core.middleware.CompressionMiddleware.
+
+Every compressor exposes `compress(data)`, `flush()`, which returns everything
+compressed so far so that a streamed chunk can be sent right away, and `finish()`.
+"""
+
+import zlib
+
+import brotli
+import zstandard
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # 16 + MAX_WBITS writes the gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {
+    "br": BrotliCompressor,
+    "zstd": ZstdCompressor,
+    "gzip": GzipCompressor,
+}
+
+
+def parse_accept_encoding(header):
+    """
+    Returns the encodings of an `Accept-Encoding` header mapped to their q-value.
+    """
+    accepted = {}
+    for part in header.split(","):
+        encoding, *params = [value.strip() for value in part.split(";")]
+        if not encoding:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        accepted[encoding.lower()] = quality
+
+    return accepted
+
+
+def compress(compressor, content):
+    return compressor.compress(content) + compressor.finish()
+
+
+def compress_stream(compressor, chunks):
+    """
+    Compresses and flushes each chunk as it is produced, rather than buffering the
+    whole body, trading some compression ratio for latency of e.g. event streams.
+    """
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+
+    yield compressor.finish()
@@ -0,0 +1,256 @@
+"""
+Background jobs queued in postgres, so that heavy operations e.g. purges and imports
+run outside of requests without an external broker.
+
+Functions are registered with @job in a `jobs` module of an app, and queued with
+enqueue() e.g. from a view:
+
+    @job
+    def purge_user_deletion(deletion_id): ...
+
+    enqueue(purge_user_deletion, deletion.id)
+
+`manage.py run_jobs` workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so
+that concurrent workers never claim the same job nor wait on each other. A job that
+raises is retried with exponential backoff, up to its `max_attempts`. A job whose
+worker dies stops renewing its lease, and is run again once the lease expires. Jobs
+should therefore be idempotent.
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+from .notifications import Listener, notify
+
+logger = logging.getLogger(__name__)
+
+JOBS_CHANNEL = "jobs"
+
+registry = {}
+
+
+def job(func):
+    """
+    Registers `func` to be queued with enqueue(). Its arguments must be JSON
+    serializable.
+    """
+    registry[get_job_name(func)] = func
+    return func
+
+
+def get_job_name(func):
+    return "%s.%s" % (func.__module__, func.__name__)
+
+
+def autodiscover():
+    autodiscover_modules("jobs")
+
+
+def enqueue(func, *args, run_at=None, max_attempts=None, **kwargs):
+    """
+    Queues a call of the registered `func`. The job is only visible to workers once
+    the current transaction commits, so it can be queued along the data it works on.
+    """
+    name = get_job_name(func)
+    if name not in registry:
+        raise ValueError("%s is not registered with @job" % name)
+
+    queued = Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+    # wakes idle workers, rather than waiting for their next poll
+    notify(JOBS_CHANNEL, using=router.db_for_write(Job))
+    return queued
+
+
+def claim_job(worker):
+    """
+    Marks the next due job as running by `worker` and returns it, None if no job is
+    due. Includes running jobs whose lease expired.
+    """
+    now = timezone.now()
+    due = Q(status=Job.STATUS_QUEUED, run_at__lte=now) | Q(
+        status=Job.STATUS_RUNNING, locked_until__lt=now
+    )
+
+    with transaction.atomic(using=router.db_for_write(Job)):
+        claimed = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("run_at")
+            .first()
+        )
+        if claimed is None:
+            return None
+
+        claimed.status = Job.STATUS_RUNNING
+        claimed.attempts = F("attempts") + 1
+        claimed.locked_until = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        claimed.locked_by = worker
+        claimed.save(update_fields=["status", "attempts", "locked_until", "locked_by"])
+
+    claimed.refresh_from_db(fields=["attempts"])
+    return claimed
+
+
+def get_retry_delay(attempts):
+    """
+    Returns the exponential backoff before retrying a job failed `attempts` times.
+    """
+    delay = settings.JOBS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.JOBS_MAX_RETRY_BACKOFF_SECONDS))
+
+
+def run_job(claimed):
+    """
+    Runs a claimed job, then marks it done, or queues it again or marks it failed if it
+    raises.
+    """
+    renewer = LeaseRenewer(claimed, settings.JOBS_LEASE_RENEWAL_SECONDS)
+    renewer.start()
+    try:
+        registry[claimed.name](*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception("Job %s failed, attempt %s", claimed, claimed.attempts)
+        error = traceback.format_exc()
+
+        if claimed.attempts < claimed.max_attempts:
+            changes = {
+                "status": Job.STATUS_QUEUED,
+                "run_at": timezone.now() + get_retry_delay(claimed.attempts),
+            }
+        else:
+            changes = {"status": Job.STATUS_FAILED, "finished_at": timezone.now()}
+
+        changes["last_error"] = error
+    else:
+        changes = {"status": Job.STATUS_DONE, "finished_at": timezone.now()}
+    finally:
+        renewer.stop()
+
+    # only if still ours, an expired lease may have been claimed by another worker
+    Job.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by).update(
+        locked_until=None, **changes
+    )
+
+
+class LeaseRenewer(threading.Thread):
+    """
+    Extends the lease of a claimed job every `interval` seconds until stopped, so that
+    a job running longer than `JOBS_LEASE_SECONDS` is not claimed again while its
+    worker is alive. Only a dead worker lets the lease expire.
+    """
+
+    def __init__(self, claimed, interval):
+        super().__init__(name="job-lease-%s" % claimed.pk, daemon=True)
+        self.claimed = claimed
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    self.renew()
+                except Exception:
+                    # e.g. a dropped connection, retried at the next interval
+                    logger.exception(
+                        "Renewing the lease of job %s failed", self.claimed
+                    )
+        finally:
+            connections.close_all()
+
+    def renew(self):
+        locked_until = timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        # only if still ours, like run_job's update
+        Job.objects.filter(
+            pk=self.claimed.pk,
+            status=Job.STATUS_RUNNING,
+            locked_by=self.claimed.locked_by,
+        ).update(locked_until=locked_until)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class Worker:
+    """
+    Runs due jobs until `stop` is set. Sleeps up to `JOBS_POLL_SECONDS` when no job is
+    due, or until `wake` is set e.g. by a job being queued.
+    """
+
+    def __init__(self, name, stop, wake):
+        self.name = name
+        self.stop = stop
+        self.wake = wake
+
+    def run(self, burst=False):
+        """
+        Runs jobs until stopped, or until no job is due given `burst`.
+        """
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+
+                claimed = claim_job(self.name)
+                if claimed is not None:
+                    run_job(claimed)
+                    continue
+
+                if burst:
+                    return
+
+                self.wake.wait(settings.JOBS_POLL_SECONDS)
+                self.wake.clear()
+        finally:
+            # closes the connections of this thread, which ends with the worker
+            connections.close_all()
+
+
+def run_workers(concurrency, stop, burst=False):
+    """
+    Runs `concurrency` Worker threads in this process, which share a listener waking
+    them when jobs are queued, until they return.
+    """
+    wake = threading.Event()
+    listener = None
+    if not burst:
+        listener = Listener(
+            JOBS_CHANNEL, lambda payload: wake.set(), using=router.db_for_write(Job)
+        )
+        listener.start()
+
+    prefix = "%s:%s" % (socket.gethostname(), os.getpid())
+    threads = [
+        threading.Thread(
+            target=Worker("%s:%s" % (prefix, i), stop, wake).run,
+            kwargs={"burst": burst},
+            name="job-worker-%s" % i,
+        )
+        for i in range(concurrency)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if listener is not None:
+        listener.stop()
@@ -0,0 +1,186 @@
+"""
+Logging off the request path: records are put on a bounded queue by the thread that
+logs them, and written out by a background thread, as JSON lines.
+
+Wired into config.settings.LOGGING, e.g.:
+
+    "handlers": {
+        "queue": {
+            "()": "core.log.QueueLogHandler",
+            "stream": "ext://sys.stderr",
+            "maxsize": 10000,
+            "drop": "oldest",
+        },
+    },
+
+A burst of records e.g. failed logins during credential stuffing never blocks requests
+on handler I/O. Once the queue is full records are dropped, and the number dropped is
+logged once the queue drains.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+# attributes of every LogRecord, any other attribute was passed as `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a record as a JSON object with its time, level, logger and message, the
+    exception if any, and the attributes passed as `extra`.
+    """
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name not in data:
+                data[name] = value
+
+        return orjson.dumps(data, default=str).decode()
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Puts records on a queue of `maxsize` records, for a listener thread to write them
+    to `stream` with JSONFormatter. Once the queue is full, either the `oldest` queued
+    record or the `newest` record is dropped, as given by `drop`.
+
+    Queued records are written out at exit. A forked process starts a listener of its
+    own, the parent's thread does not survive the fork.
+    """
+
+    def __init__(self, stream=None, maxsize=10000, drop=DROP_OLDEST):
+        if drop not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError("drop must be %r or %r" % (DROP_OLDEST, DROP_NEWEST))
+
+        super().__init__(queue.Queue(maxsize))
+        self.drop = drop
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+        self.target = logging.StreamHandler(stream)
+        self.target.setFormatter(JSONFormatter())
+        self.listener = None
+        self.start()
+
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._start_in_child)
+
+    def start(self):
+        self.listener = _Listener(self)
+        self.listener.start()
+
+    def _start_in_child(self):
+        if self.listener is None:  # closed
+            return
+
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.start()
+
+    def prepare(self, record):
+        """
+        Resolves what the listener thread cannot safely read later: the message
+        arguments, the exception's traceback and any object passed as `extra`.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and not isinstance(
+                value, (str, int, float, bool, type(None))
+            ):
+                setattr(record, name, str(value))
+
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.drop == DROP_OLDEST:
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):  # raced with other threads
+                pass
+
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def take_dropped(self):
+        """
+        Returns the number of records dropped since the previous call.
+        """
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+class _Listener(QueueListener):
+    def __init__(self, handler):
+        super().__init__(handler.queue, handler.target)
+        self.owner = handler
+
+    def handle(self, record):
+        super().handle(record)
+
+        # reported as the queue drains, the drops happened while it was full
+        if self.queue.empty():
+            dropped = self.owner.take_dropped()
+            if dropped:
+                super().handle(
+                    logging.makeLogRecord(
+                        {
+                            "name": __name__,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": "Dropped %s log records, the log queue was full",
+                            "args": (dropped,),
+                            "dropped": dropped,
+                        }
+                    )
+                )
+
+    def enqueue_sentinel(self):
+        # waits for room rather than failing on a full queue, to write it all out
+        self.queue.put(self._sentinel)
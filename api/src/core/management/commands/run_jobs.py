@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import run_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs, see core.jobs. Stops after the running jobs on "
+        "SIGINT or SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of jobs run at the same time.",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Run each job in a process of its own instead of a thread, for CPU "
+            "bound jobs.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due, e.g. when run from cron.",
+        )
+
+    def handle(self, *args, concurrency, processes, burst, **options):
+        if not processes:
+            stop = threading.Event()
+            self.stop_on_signals(stop)
+            run_workers(concurrency, stop, burst=burst)
+            return
+
+        stop = multiprocessing.Event()
+        self.stop_on_signals(stop)
+
+        # forked processes must open connections of their own
+        connections.close_all()
+        children = [
+            multiprocessing.Process(
+                target=self.run_process, args=(stop, burst), name="run_jobs-%s" % i
+            )
+            for i in range(concurrency)
+        ]
+
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+
+    @staticmethod
+    def run_process(stop, burst):
+        # the parent sets `stop` on signals, a terminal's SIGINT reaches every process
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        run_workers(1, stop, burst=burst)
+
+    @staticmethod
+    def stop_on_signals(stop):
+        def handler(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, handler)
+        signal.signal(signal.SIGTERM, handler)
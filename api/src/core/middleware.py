@@ -0,0 +1,218 @@
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from .admission import DEFAULT_ROUTE, get_limiters
+from .compression import COMPRESSORS, compress, compress_stream, parse_accept_encoding
+from .models import RequestProfile
+from .profiling import PROFILE_HEADER, PROFILE_ID_HEADER, get_token_user, profile
+from .routers import use_primary
+from .slow_queries import REQUEST_ID_RESPONSE_HEADER, get_request_id, request_context
+from .stickiness import is_request_pinned, pin_user
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pins a user's reads to the primary database for a short window after they write,
+    so that they read their own writes even if the replicas lag behind. See
+    core.stickiness
+
+    The window is keyed by the authenticated user rather than the client, so that it
+    holds for all the user's clients e.g. a second tab or device. Requests that write
+    are pinned for their whole duration, so checks made before a write e.g. quota
+    checks read from the primary as well.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+
+        if not (writes or is_request_pinned(request)):
+            return self.get_response(request)
+
+        with use_primary():
+            response = self.get_response(request)
+
+        # the user authenticated by the view, e.g. by DRF
+        user = getattr(request, "user", None)
+        if writes and user is not None and user.is_authenticated:
+            pin_user(user.id)
+
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the encoding of `COMPRESSION_LEVELS` the client prefers,
+    like django.middleware.gzip.GZipMiddleware which only does gzip.
+
+    Bodies smaller than `COMPRESSION_MIN_SIZE` are sent as they are, since the
+    encoding overhead outweighs the saved bytes. Streaming responses are compressed
+    chunk by chunk, as their size is not known upfront.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header("Content-Encoding"):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self.get_encoding(request)
+        if encoding is None:
+            return response
+
+        compressor = COMPRESSORS[encoding](settings.COMPRESSION_LEVELS[encoding])
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                compressor, response.streaming_content
+            )
+            del response["Content-Length"]
+        else:
+            compressed = compress(compressor, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # the compressed body is not byte for byte the entity the strong ETag names
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
+
+    def get_encoding(self, request):
+        """
+        Returns the encoding the client prefers by q-value, the most preferred of
+        `COMPRESSION_LEVELS` among those it prefers equally.
+        """
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        qualities = {
+            encoding: accepted.get(encoding, accepted.get("*", 0))
+            for encoding in settings.COMPRESSION_LEVELS
+        }
+
+        # max() returns the first of equal encodings, in the order of preference
+        encoding = max(qualities, key=qualities.get, default=None)
+        if encoding is None or qualities[encoding] <= 0:
+            return None
+        return encoding
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests that carry a staff user's profiling token, and stores their
+    profile. See core.profiling
+
+    The profile covers the middleware below this one and the view. The content of
+    streaming responses is produced after it, and is not covered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get(PROFILE_HEADER)
+        if token is None:
+            return self.get_response(request)
+
+        user = get_token_user(token)
+        if user is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response, sampler, recorder = profile(lambda: self.get_response(request))
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        request_profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path(),
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            stacks=sampler.folded(),
+            samples=sum(sampler.stacks.values()),
+            queries=recorder.queries,
+        )
+        response[PROFILE_ID_HEADER] = str(request_profile.id)
+        return response
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request an id, returned in its X-Request-Id header, and attributes the
+    slow queries made while handling it to it. See core.slow_queries
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = get_request_id(request)
+
+        with request_context(request, request_id):
+            response = self.get_response(request)
+
+        response[REQUEST_ID_RESPONSE_HEADER] = request_id
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Turns requests away with a 503 and a Retry-After header once their route has as many
+    requests in progress and queued as it admits. See core.admission
+
+    Requests are admitted once their route is resolved, and leave as their response is
+    returned. The content of streaming responses is produced after that, and is not
+    limited.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limiters = get_limiters(
+            settings.ADMISSION_LIMITS, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        )
+        self.priority_routes = set(settings.ADMISSION_PRIORITY_ROUTES)
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            limiter = getattr(request, "_admission_limiter", None)
+            if limiter is not None:
+                limiter.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        route = request.resolver_match.view_name
+        if route in self.priority_routes:
+            return None
+
+        limiter = self.limiters.get(route, self.limiters[DEFAULT_ROUTE])
+        if not limiter.acquire():
+            response = JsonResponse(
+                {"detail": "Server is busy, try again later."}, status=503
+            )
+            response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+            return response
+
+        request._admission_limiter = limiter
+        return None
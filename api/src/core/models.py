@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    A call of a function registered with core.jobs.job, run by `manage.py run_jobs`
+    workers outside of requests. See core.jobs
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    # not run before, and retried at, this time
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    # a running job whose worker did not finish it by this time is run again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # claims, see core.jobs.claim_job
+            models.Index(
+                fields=["run_at"],
+                name="core_job_queued",
+                condition=models.Q(status="queued"),
+            ),
+            models.Index(
+                fields=["locked_until"],
+                name="core_job_running",
+                condition=models.Q(status="running"),
+            ),
+        ]
+
+    def __str__(self):
+        return "%s #%s" % (self.name, self.id)
+
+
+class RequestProfile(models.Model):
+    """
+    The stack samples and SQL queries of a request profiled on demand by staff, see
+    core.profiling
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    method = models.CharField(max_length=16)
+    path = models.TextField()
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    # samples per stack in the folded format of flamegraph.pl, one "a;b;c count" a line
+    stacks = models.TextField(blank=True)
+    samples = models.PositiveIntegerField(default=0)
+    # [{"sql": ..., "duration_ms": ..., "database": ...}] in execution order
+    queries = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "%s %s" % (self.method, self.path)
@@ -0,0 +1,79 @@
+"""
+Broadcasts between processes over postgres LISTEN/NOTIFY, e.g. so that every worker
+drops a cached value that one of them changed.
+
+Notifications are sent when the sending transaction commits and are only delivered to
+listeners connected at that time. Consumers should therefore be able to recover from
+missed notifications, which Listener signals after every (re)connect.
+"""
+
+import logging
+import select
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+def notify(channel, payload="", using=DEFAULT_DB_ALIAS):
+    """
+    Sends `payload` to the listeners of `channel` once the current transaction
+    commits, or right away in autocommit mode.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [channel, payload])
+
+
+class Listener(threading.Thread):
+    """
+    Calls `callback(payload)` for each notification on `channel`, from a daemon thread
+    with a connection of its own.
+
+    After connecting, and reconnecting after an error, it calls `callback(None)` since
+    notifications may have been missed in the meantime.
+    """
+
+    def __init__(self, channel, callback, using=DEFAULT_DB_ALIAS, poll_timeout=5.0):
+        super().__init__(name="listener-%s" % channel, daemon=True)
+        self.channel = channel
+        self.callback = callback
+        self.using = using
+        self.poll_timeout = poll_timeout
+        self.retry_delay = 1.0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Listening on %s failed, reconnecting", self.channel)
+                self._stopped.wait(self.retry_delay)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _listen(self):
+        # a raw connection, as django's connections are closed at the end of requests
+        # and do not expose psycopg2's notifications
+        wrapper = connections[self.using]
+        connection = wrapper.Database.connect(**wrapper.get_connection_params())
+
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute("LISTEN %s" % wrapper.ops.quote_name(self.channel))
+
+            self.callback(None)
+
+            while not self._stopped.is_set():
+                readable, _, _ = select.select([connection], [], [], self.poll_timeout)
+                if not readable:
+                    continue
+
+                connection.poll()
+                while connection.notifies:
+                    self.callback(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
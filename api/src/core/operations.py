@@ -0,0 +1,69 @@
+"""
+Migration operations for postgres partitioned tables.
+"""
+
+from django.contrib.postgres.operations import NotInTransactionMixin
+from django.db.migrations import AddIndex
+
+
+def get_partitions(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass ORDER BY 1",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class AddIndexToPartitions(NotInTransactionMixin, AddIndex):
+    """
+    Adds an index to a partitioned table without blocking writes to it.
+
+    Postgres cannot CREATE INDEX CONCURRENTLY on a partitioned table. Instead, the index
+    is created on the partitioned table ONLY, which leaves it invalid. Each partition's
+    index is then built concurrently and attached to it, and the index becomes valid
+    once every partition's index is attached. Partition indexes are named
+    `<partition>_<index name>`.
+    """
+
+    atomic = False
+
+    def describe(self):
+        return "Concurrently create index %s on partitions of model %s" % (
+            self.index.name,
+            self.model_name,
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        quote_name = schema_editor.quote_name
+        table = model._meta.db_table
+
+        statement = self.index.create_sql(model, schema_editor)
+        statement.parts["table"] = "ONLY %s" % quote_name(table)
+        schema_editor.execute(statement)
+
+        for partition in get_partitions(schema_editor, table):
+            partition_index = "%s_%s" % (partition, self.index.name)
+
+            statement = self.index.create_sql(model, schema_editor, concurrently=True)
+            statement.rename_table_references(table, partition)
+            statement.parts["name"] = quote_name(partition_index)
+            schema_editor.execute(statement)
+
+            schema_editor.execute(
+                "ALTER INDEX %s ATTACH PARTITION %s"
+                % (quote_name(self.index.name), quote_name(partition_index))
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # an index on a partitioned table cannot be dropped concurrently, dropping it
+        # drops the attached partition indexes
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index)
@@ -0,0 +1,139 @@
+"""
+On-demand profiling of single requests, e.g. of an endpoint that got slow in
+production, without redeploying.
+
+Staff get a token from `POST /profiles/token/`, valid for `PROFILING_TOKEN_MAX_AGE`
+seconds, and send it in the `X-Profile` header of the request to profile. While the
+request is handled, ProfilingMiddleware samples its thread's stack every
+`PROFILING_INTERVAL_SECONDS` and records its SQL queries. The result is stored as a
+RequestProfile, whose id is returned in the `X-Profile-Id` header. Its stacks are in
+the folded format read by flamegraph.pl and speedscope, see `GET /profiles/<id>/folded/`.
+
+Requests without the header only pay for a header lookup.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_signer = signing.TimestampSigner(salt="core.profiling")
+
+
+def make_token(user):
+    return _signer.sign(str(user.pk))
+
+
+def get_token_user(token):
+    """
+    Returns the active staff user the token was made for, None if the token is
+    invalid, expired or its user is no longer staff.
+    """
+    try:
+        user_id = _signer.unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+    return (
+        get_user_model()
+        .objects.filter(pk=user_id, is_staff=True, is_active=True)
+        .first()
+    )
+
+
+class StackSampler(threading.Thread):
+    """
+    Counts the stacks of the thread `thread_id` sampled every `interval` seconds, from
+    the outermost frame to the innermost one.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[get_stack(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        return "\n".join(
+            "%s %s" % (stack, count) for stack, count in self.stacks.items()
+        )
+
+
+def get_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append("%s.%s" % (frame.f_globals.get("__name__", "?"), code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording the queries run and their duration, up to
+    `PROFILING_MAX_QUERIES` of them.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append(
+                    {
+                        "sql": sql,
+                        "duration_ms": (time.perf_counter() - start) * 1000,
+                        "database": context["connection"].alias,
+                    }
+                )
+
+    def record(self):
+        """
+        Returns a context manager recording the queries of every database connection.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def profile(func):
+    """
+    Calls `func` while sampling the current thread's stack and recording its queries.
+    Returns its result, the sampler and the recorder.
+    """
+    sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_SECONDS)
+    recorder = QueryRecorder()
+
+    sampler.start()
+    try:
+        with recorder.record():
+            result = func()
+    finally:
+        sampler.stop()
+
+    return result, sampler, recorder
@@ -0,0 +1,61 @@
+"""
+Routes reads to read replicas and writes to the primary database.
+
+Replication is asynchronous, so a replica may briefly lag behind the primary. Reads are
+pinned to the primary whenever they need to see the latest writes:
+- while a request that writes is being handled, see `use_primary`
+- while a user is inside the stickiness window after a write, see
+`core.middleware.ReplicaStickinessMiddleware`
+- inside a transaction on the primary
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_DATABASE = DEFAULT_DB_ALIAS
+
+_use_primary = ContextVar("use_primary", default=False)
+
+
+@contextmanager
+def use_primary():
+    """
+    Routes every read made within the block to the primary database.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+
+        if (
+            not replicas
+            or _use_primary.get()
+            or connections[PRIMARY_DATABASE].in_atomic_block
+        ):
+            return PRIMARY_DATABASE
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        databases = {PRIMARY_DATABASE, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive schema changes through replication
+        return db == PRIMARY_DATABASE
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+
+from .models import RequestProfile
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        fields = [
+            "id",
+            "user",
+            "method",
+            "path",
+            "status_code",
+            "duration_ms",
+            "samples",
+            "stacks",
+            "queries",
+            "created_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,156 @@
+"""
+Slow-query log: queries taking `SLOW_QUERY_THRESHOLD_MS` or more are logged, along with
+the code that issued them, the view being served and the request's id.
+
+Every database connection gets `record_slow_query` as an execute wrapper when it is
+opened, so that queries of views, the admin, authentication and background jobs alike
+are covered. Query parameters are not recorded, they may hold credentials.
+
+The latest `SLOW_QUERY_LOG_SIZE` slow queries of a process are kept in `slow_queries`,
+served to staff by `GET /slow-queries/`. Each is also logged as a warning of the
+`core.slow_queries` logger.
+"""
+
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+
+REQUEST_ID_HEADER = "HTTP_X_REQUEST_ID"
+REQUEST_ID_RESPONSE_HEADER = "X-Request-Id"
+
+logger = logging.getLogger(__name__)
+
+_request = ContextVar("slow_query_request", default=None)
+
+_this_file = os.path.splitext(__file__)[0]
+
+
+class SlowQueryLog:
+    """
+    Ring buffer of the latest `maxlen` slow queries.
+    """
+
+    def __init__(self, maxlen):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """
+        Returns the slow queries, the latest first.
+        """
+        with self._lock:
+            return list(reversed(self._records))
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+slow_queries = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+
+def get_request_id(request):
+    """
+    Returns the id of the request given by a proxy in its X-Request-Id header, or a new
+    one.
+    """
+    request_id = request.META.get(REQUEST_ID_HEADER, "")[:64]
+    return request_id or uuid.uuid4().hex
+
+
+@contextmanager
+def request_context(request, request_id):
+    """
+    Attributes the slow queries made within the block to `request`.
+    """
+    token = _request.set((request, request_id))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def get_stack(depth):
+    """
+    Returns the innermost `depth` frames of the current stack that belong to the project,
+    as "path:line in function", falling back to any frame when none does.
+    """
+    base_dir = str(settings.BASE_DIR) + os.sep
+    frames = [
+        frame
+        for frame in traceback.StackSummary.extract(
+            traceback.walk_stack(None), lookup_lines=False
+        )
+        if not frame.filename.startswith(_this_file)
+    ]
+    own_frames = [
+        frame
+        for frame in frames
+        if frame.filename.startswith(base_dir) and "site-packages" not in frame.filename
+    ]
+
+    return [
+        "%s:%s in %s" % (frame.filename.replace(base_dir, ""), frame.lineno, frame.name)
+        for frame in (own_frames or frames)[:depth]
+    ]
+
+
+def record_slow_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is not None and duration_ms >= threshold:
+            add_slow_query(sql, duration_ms, context["connection"].alias)
+
+
+def add_slow_query(sql, duration_ms, database):
+    request, request_id = _request.get() or (None, None)
+    resolver_match = getattr(request, "resolver_match", None)
+
+    record = {
+        "sql": sql,
+        "duration_ms": round(duration_ms, 3),
+        "database": database,
+        "view": resolver_match.view_name if resolver_match else None,
+        "request_id": request_id,
+        "stack": get_stack(settings.SLOW_QUERY_STACK_DEPTH),
+        "created_at": timezone.now().isoformat(),
+    }
+    slow_queries.add(record)
+    logger.warning(
+        "Slow query (%.1f ms) in %s",
+        duration_ms,
+        record["view"] or "-",
+        extra={
+            **{name: value for name, value in record.items() if name != "created_at"},
+            "stack": "\n".join(record["stack"]),
+        },
+    )
+
+
+def install(sender, connection, **kwargs):
+    """
+    connection_created receiver adding `record_slow_query` to the connection's execute
+    wrappers, once as the connection object is reused by reconnections.
+
+    It is inserted first: the connection may be opened within `execute_wrapper()`
+    blocks e.g. of core.profiling, which pop the last wrapper on exit.
+    """
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow_query)
@@ -0,0 +1,118 @@
+"""
+Pins the reads of a user to the primary database for a short window after they write,
+so that they read their own writes from any of their clients while the replicas lag
+behind. See core.middleware.ReplicaStickinessMiddleware
+
+Pins are kept per process and broadcast to every worker, like the invalidations of
+resources.cache. A worker only receives them once it runs start_stickiness_listener(),
+and pins every user for a window after (re)connecting, as it may have missed pins.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .notifications import Listener, notify
+from .routers import PRIMARY_DATABASE
+
+STICKINESS_CHANNEL = "replica_stickiness"
+
+
+class PrimaryPins:
+    """
+    Users pinned to the primary for `window` seconds after their last pin. Thread safe.
+    """
+
+    def __init__(self, window, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+
+        # user id -> pinned until, in the order they were pinned and thus expire
+        self._until = OrderedDict()
+        self._all_until = float("-inf")
+        self._lock = threading.Lock()
+
+    def pin(self, user_id=None):
+        """
+        Pins the user, or all users given None.
+        """
+        now = self.clock()
+
+        with self._lock:
+            if user_id is None:
+                self._all_until = now + self.window
+            else:
+                self._until[user_id] = now + self.window
+                self._until.move_to_end(user_id)
+
+            # bounds the pins to the users who wrote within the window
+            while self._until and next(iter(self._until.values())) <= now:
+                self._until.popitem(last=False)
+
+    def is_pinned(self, user_id):
+        now = self.clock()
+
+        with self._lock:
+            return self._all_until > now or self._until.get(user_id, now) > now
+
+    def __bool__(self):
+        now = self.clock()
+
+        with self._lock:
+            return self._all_until > now or any(
+                until > now for until in self._until.values()
+            )
+
+
+primary_pins = PrimaryPins(settings.REPLICA_STICKINESS_SECONDS)
+
+
+def pin_user(user_id):
+    """
+    Pins the reads of the user to the primary in every process, in this one right away
+    and in the others once the current transaction commits.
+    """
+    primary_pins.pin(user_id)
+    notify(STICKINESS_CHANNEL, str(user_id), using=PRIMARY_DATABASE)
+
+
+def is_request_pinned(request):
+    """
+    Returns whether the reads of the user authenticated by the request's JWT cookie
+    are pinned to the primary.
+    """
+    # the token is only decoded while a user of this process is pinned
+    if not primary_pins:
+        return False
+
+    raw_token = request.COOKIES.get(settings.JWT_ACCESS_TOKEN_COOKIE_NAME)
+    if raw_token is None:
+        return False
+
+    try:
+        token = JWTAuthentication().get_validated_token(raw_token)
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (InvalidToken, KeyError):
+        return False
+
+    return primary_pins.is_pinned(user_id)
+
+
+def start_stickiness_listener():
+    listener = Listener(STICKINESS_CHANNEL, _on_pin, using=PRIMARY_DATABASE)
+    listener.start()
+    return listener
+
+
+def _on_pin(payload):
+    # None after (re)connecting, when pins may have been missed
+    if payload is None:
+        primary_pins.pin()
+    else:
+        primary_pins.pin(int(payload))
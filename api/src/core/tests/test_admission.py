@@ -0,0 +1,107 @@
+import threading
+
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+import pytest
+from core.admission import AdmissionLimiter
+
+
+def acquire_in_thread(limiter, results):
+    thread = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    thread.start()
+    return thread
+
+
+class TestAdmissionLimiter:
+    def test_acquire_should_reject_given_full_queue(self):
+        # given
+        limiter = AdmissionLimiter(concurrency=1, queue_size=0, timeout=1)
+
+        # when
+        admitted = [limiter.acquire(), limiter.acquire()]
+
+        # then
+        assert admitted == [True, False]
+        assert limiter.stats() == {
+            "concurrency": 1,
+            "active": 1,
+            "waiting": 0,
+            "rejected": 1,
+        }
+
+    def test_acquire_should_reject_after_timeout(self):
+        # given
+        limiter = AdmissionLimiter(concurrency=1, queue_size=1, timeout=0.01)
+        limiter.acquire()
+
+        # when
+        admitted = limiter.acquire()
+
+        # then
+        assert admitted is False
+        assert limiter.stats()["waiting"] == 0
+
+    def test_acquire_should_admit_queued_caller_on_release(self):
+        # given
+        limiter = AdmissionLimiter(concurrency=1, queue_size=1, timeout=5)
+        limiter.acquire()
+        results = []
+        thread = acquire_in_thread(limiter, results)
+        while not limiter.stats()["waiting"]:
+            pass
+
+        # when
+        barging = limiter.acquire()  # the slot is not free yet
+        limiter.release()
+        thread.join()
+
+        # then
+        assert barging is False
+        assert results == [True]
+        assert limiter.stats()["active"] == 1
+
+
+@pytest.mark.django_db
+class TestAdmissionControlMiddleware:
+    def test_should_shed_saturated_route_and_admit_priority_routes(self, settings):
+        # given
+        settings.ADMISSION_LIMITS = {
+            "default": {"concurrency": 0, "queue": 0},
+        }
+        client = APIClient()
+
+        # when
+        shed = client.get(reverse("resources:resource-list"))
+        health = client.get(reverse("core:health"))
+        csrf = client.get(reverse("users:get-csrf-cookie"))
+
+        # then
+        assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert shed["Retry-After"] == "1"
+        assert shed.json() == {"detail": "Server is busy, try again later."}
+        assert health.status_code == status.HTTP_200_OK
+        assert csrf.status_code == status.HTTP_200_OK
+
+    def test_should_limit_routes_separately(self, settings, email, password):
+        # given
+        settings.ADMISSION_LIMITS = {
+            "default": {"concurrency": 1, "queue": 0},
+            "users:login": {"concurrency": 0, "queue": 0},
+        }
+        client = APIClient()
+
+        # when
+        login = client.post(
+            reverse("users:login"), {"email": email, "password": password}
+        )
+        responses = [client.get(reverse("resources:resource-list")) for _ in range(2)]
+
+        # then
+        assert login.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        # each request leaves its slot as it is returned
+        assert [r.status_code for r in responses] == [
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_401_UNAUTHORIZED,
+        ]
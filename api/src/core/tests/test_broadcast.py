@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+import pytest
+from core.broadcast import Broadcaster, Subscription
+from core.notifications import notify
+
+
+class TestSubscription:
+    def test_put_should_replace_pending_messages_by_reload_once_full(self):
+        async def run():
+            # given
+            subscription = Subscription(maxsize=2)
+
+            # when
+            for message in [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]:
+                subscription.put(message)
+
+            # then
+            return [await subscription.get(), await subscription.get()]
+
+        # the messages pending on overflow were dropped, later ones are kept
+        assert asyncio.run(run()) == [None, {"id": 4}]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBroadcaster:
+    def test_should_deliver_notifications_to_subscribers_of_key(self):
+        # given
+        broadcaster = Broadcaster("test_broadcast", key="owner")
+
+        async def receive(subscription):
+            return await asyncio.wait_for(subscription.get(), timeout=5)
+
+        async def run():
+            async with broadcaster.subscribe(1) as first, broadcaster.subscribe(
+                1
+            ) as second, broadcaster.subscribe(2) as other:
+                # reload, as notifications could be missed before connecting
+                assert [await receive(s) for s in (first, second, other)] == [None] * 3
+
+                # when
+                for owner in [2, 1]:
+                    payload = json.dumps({"owner": owner, "id": owner * 10})
+                    await sync_to_async(notify)("test_broadcast", payload)
+
+                # then
+                assert await receive(first) == {"owner": 1, "id": 10}
+                assert await receive(second) == {"owner": 1, "id": 10}
+                assert await receive(other) == {"owner": 2, "id": 20}
+                assert broadcaster.subscription_count == 3
+
+            assert broadcaster.subscription_count == 0
+
+        try:
+            async_to_sync(run)()
+        finally:
+            broadcaster.stop()
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from core.coalescing import SingleFlight
+
+
+def start_follower(single_flight, key, results):
+    def follow():
+        try:
+            results.append(single_flight.call(key, lambda: "follower"))
+        except RuntimeError as e:
+            results.append(e)
+
+    thread = threading.Thread(target=follow)
+    thread.start()
+    return thread
+
+
+def wait_for_shared(single_flight, count):
+    # the follower is counted right before it waits for the leader
+    while single_flight.stats()["shared"] < count:
+        time.sleep(0.01)
+
+
+class TestSingleFlight:
+    def test_call_should_share_result_of_call_in_flight(self):
+        # given
+        single_flight = SingleFlight()
+        results = []
+        followers = []
+
+        def leader():
+            followers.append(start_follower(single_flight, "key", results))
+            wait_for_shared(single_flight, 1)
+            return "leader"
+
+        # when
+        result = single_flight.call("key", leader)
+        followers[0].join(timeout=5)
+
+        # then
+        assert result == "leader"
+        assert results == ["leader"]
+        assert single_flight.stats() == {"calls": 2, "shared": 1, "in_flight": 0}
+
+    def test_call_should_share_error_of_call_in_flight(self):
+        # given
+        single_flight = SingleFlight()
+        results = []
+        followers = []
+
+        def leader():
+            followers.append(start_follower(single_flight, "key", results))
+            wait_for_shared(single_flight, 1)
+            raise RuntimeError("boom")
+
+        # when
+        with pytest.raises(RuntimeError):
+            single_flight.call("key", leader)
+        followers[0].join(timeout=5)
+
+        # then
+        assert str(results[0]) == "boom"
+
+    def test_call_should_not_share_across_keys_or_once_returned(self):
+        # given
+        single_flight = SingleFlight()
+
+        # when
+        results = [
+            single_flight.call("key", lambda: 1),
+            single_flight.call("key", lambda: 2),
+            single_flight.call(
+                "key", lambda: single_flight.call("other key", lambda: 3)
+            ),
+        ]
+
+        # then
+        assert results == [1, 2, 3]
+        assert single_flight.stats()["shared"] == 0
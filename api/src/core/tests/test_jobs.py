@@ -0,0 +1,237 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+
+import pytest
+from core.jobs import claim_job, enqueue, get_retry_delay, job, run_job
+from core.models import Job
+
+calls = []
+
+
+@job
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@job
+def explode():
+    raise RuntimeError("boom")
+
+
+@job
+def outlive_lease(seconds):
+    # claims meanwhile, as another worker would once the lease expired
+    time.sleep(seconds)
+    calls.append(claim_job("other"))
+
+
+def unregistered():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+class TestEnqueue:
+    def test_should_queue_job(self, settings):
+        # when
+        queued = enqueue(record, 1, "two", three=3)
+
+        # then
+        queued.refresh_from_db()
+        assert queued.name == "core.tests.test_jobs.record"
+        assert queued.args == [1, "two"]
+        assert queued.kwargs == {"three": 3}
+        assert queued.status == Job.STATUS_QUEUED
+        assert queued.max_attempts == settings.JOBS_MAX_ATTEMPTS
+
+    def test_should_raise_error_given_unregistered_function(self):
+        # when
+        with pytest.raises(ValueError) as excinfo:
+            enqueue(unregistered)
+
+        # then
+        assert "is not registered with @job" in str(excinfo.value)
+        assert not Job.objects.exists()
+
+
+@pytest.mark.django_db
+class TestClaimJob:
+    def test_should_claim_due_jobs_in_order(self, settings):
+        # given
+        now = timezone.now()
+        later = enqueue(record, run_at=now - timedelta(minutes=1))
+        first = enqueue(record, run_at=now - timedelta(minutes=2))
+        enqueue(record, run_at=now + timedelta(minutes=1))
+
+        # when
+        claimed = [claim_job("worker"), claim_job("worker"), claim_job("worker")]
+
+        # then
+        assert claimed[:2] == [first, later]
+        assert claimed[2] is None
+        assert claimed[0].status == Job.STATUS_RUNNING
+        assert claimed[0].attempts == 1
+        assert claimed[0].locked_by == "worker"
+        assert claimed[0].locked_until > now + timedelta(
+            seconds=settings.JOBS_LEASE_SECONDS - 60
+        )
+
+    def test_should_claim_running_job_given_expired_lease(self):
+        # given
+        queued = enqueue(record)
+        claim_job("dead")
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        # when
+        claimed = claim_job("alive")
+
+        # then
+        assert claimed == queued
+        assert claimed.attempts == 2
+        assert claimed.locked_by == "alive"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_claim_job_should_skip_locked_jobs():
+    # given
+    now = timezone.now()
+    locked = enqueue(record, run_at=now - timedelta(minutes=2))
+    free = enqueue(record, run_at=now - timedelta(minutes=1))
+    is_locked, release = threading.Event(), threading.Event()
+
+    def lock():
+        try:
+            with transaction.atomic():
+                Job.objects.select_for_update().get(pk=locked.pk)
+                is_locked.set()
+                release.wait(timeout=5)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=lock)
+    thread.start()
+    assert is_locked.wait(timeout=5)
+
+    try:
+        # when
+        claimed = claim_job("worker")
+    finally:
+        release.set()
+        thread.join(timeout=5)
+
+    # then
+    assert claimed == free
+
+
+@pytest.mark.django_db
+class TestRunJob:
+    def test_should_mark_job_done(self):
+        # given
+        enqueue(record, 1, two=2)
+        claimed = claim_job("worker")
+
+        # when
+        run_job(claimed)
+
+        # then
+        claimed.refresh_from_db()
+        assert calls == [((1,), {"two": 2})]
+        assert claimed.status == Job.STATUS_DONE
+        assert claimed.finished_at is not None
+        assert claimed.locked_until is None
+
+    def test_should_retry_with_backoff_given_error(self, settings):
+        # given
+        settings.JOBS_RETRY_BACKOFF_SECONDS = 10
+        enqueue(explode, max_attempts=2)
+        claimed = claim_job("worker")
+        started = timezone.now()
+
+        # when
+        run_job(claimed)
+
+        # then
+        claimed.refresh_from_db()
+        assert claimed.status == Job.STATUS_QUEUED
+        assert claimed.run_at >= started + timedelta(seconds=10)
+        assert "RuntimeError: boom" in claimed.last_error
+        assert claim_job("worker") is None  # not due yet
+
+    def test_should_fail_given_last_attempt(self):
+        # given
+        enqueue(explode, max_attempts=1)
+        claimed = claim_job("worker")
+
+        # when
+        run_job(claimed)
+
+        # then
+        claimed.refresh_from_db()
+        assert claimed.status == Job.STATUS_FAILED
+        assert claimed.finished_at is not None
+
+    def test_should_not_update_job_claimed_by_another_worker(self):
+        # given
+        enqueue(record)
+        claimed = claim_job("dead")
+        Job.objects.update(locked_by="alive")
+
+        # when
+        run_job(claimed)
+
+        # then
+        assert Job.objects.get().status == Job.STATUS_RUNNING
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_job_should_renew_lease_of_running_job(settings):
+    # given
+    settings.JOBS_LEASE_SECONDS = 1
+    settings.JOBS_LEASE_RENEWAL_SECONDS = 0.2
+    enqueue(outlive_lease, 1.5)
+    claimed = claim_job("worker")
+
+    # when
+    run_job(claimed)
+
+    # then
+    assert calls == [None]  # not claimed again
+    assert Job.objects.get().status == Job.STATUS_DONE
+
+
+@pytest.mark.parametrize("attempts,expected", [(1, 10), (2, 20), (4, 80), (20, 3600)])
+def test_get_retry_delay_should_back_off_exponentially(settings, attempts, expected):
+    # given
+    settings.JOBS_RETRY_BACKOFF_SECONDS = 10
+    settings.JOBS_MAX_RETRY_BACKOFF_SECONDS = 3600
+
+    # when
+    delay = get_retry_delay(attempts)
+
+    # then
+    assert delay == timedelta(seconds=expected)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("options", [{}, {"concurrency": 2}])
+def test_run_jobs_command_should_run_due_jobs_given_burst(options):
+    # given
+    for i in range(3):
+        enqueue(record, i)
+    enqueue(record, 3, run_at=timezone.now() + timedelta(minutes=1))
+
+    # when
+    call_command("run_jobs", burst=True, **options)
+
+    # then
+    assert sorted(calls) == [((i,), {}) for i in range(3)]
+    assert Job.objects.filter(status=Job.STATUS_DONE).count() == 3
@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+
+import pytest
+from core.log import DROP_NEWEST, DROP_OLDEST, JSONFormatter, QueueLogHandler
+
+
+def make_record(msg, *args, **extra):
+    return logging.makeLogRecord(
+        {
+            "name": "test",
+            "levelno": logging.ERROR,
+            "levelname": "ERROR",
+            "msg": msg,
+            "args": args,
+            **extra,
+        }
+    )
+
+
+def read_lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+
+class TestJSONFormatter:
+    def test_format_should_include_extra_and_exception(self):
+        # given
+        try:
+            raise ValueError("boom")
+        except ValueError as e:
+            record = make_record(
+                "Failed login: %s",
+                "x@y.com",
+                email="x@y.com",
+                exc_info=(ValueError, e, e.__traceback__),
+            )
+
+        # when
+        result = json.loads(JSONFormatter().format(record))
+
+        # then
+        assert result["level"] == "ERROR"
+        assert result["logger"] == "test"
+        assert result["message"] == "Failed login: x@y.com"
+        assert result["email"] == "x@y.com"
+        assert "ValueError: boom" in result["exception"]
+        assert "time" in result
+
+
+class TestQueueLogHandler:
+    def test_should_write_records_from_listener_thread(self, stream):
+        # given
+        handler = QueueLogHandler(stream)
+        logger = logging.getLogger("test_queue_log_handler")
+        logger.addHandler(handler)
+
+        # when
+        try:
+            logger.error("Failed login: %s", "x@y.com", extra={"request": object()})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()  # waits for the queue to be written out
+
+        # then
+        (line,) = read_lines(stream)
+        assert line["message"] == "Failed login: x@y.com"
+        assert line["request"].startswith("<object object")
+
+    @pytest.mark.parametrize(
+        "drop,kept", [(DROP_OLDEST, ["2", "3"]), (DROP_NEWEST, ["0", "1"])]
+    )
+    def test_should_drop_records_given_full_queue(self, stream, drop, kept):
+        # given
+        handler = QueueLogHandler(stream, maxsize=2, drop=drop)
+        handler.listener.stop()  # nothing is written out meanwhile
+
+        # when
+        for i in range(4):
+            handler.handle(make_record(str(i)))
+        handler.start()
+        handler.close()
+
+        # then
+        lines = read_lines(stream)
+        assert [line["message"] for line in lines[:2]] == kept
+        assert lines[2]["message"] == "Dropped 2 log records, the log queue was full"
+        assert lines[2]["level"] == "WARNING"
+
+    def test_should_reject_unknown_drop_policy(self):
+        # when
+        with pytest.raises(ValueError) as excinfo:
+            QueueLogHandler(drop="random")
+
+        # then
+        assert "drop must be 'oldest' or 'newest'" in str(excinfo.value)
@@ -0,0 +1,249 @@
+import gzip
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+import brotli
+import pytest
+import zstandard
+from conftest import UserFactory
+from core import stickiness
+from core.middleware import CompressionMiddleware, ReplicaStickinessMiddleware
+from core.routers import PRIMARY_DATABASE, PrimaryReplicaRouter
+from core.stickiness import PrimaryPins
+from resources.models import Resource
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+@pytest.fixture
+def primary_pins(settings, monkeypatch):
+    primary_pins = PrimaryPins(settings.REPLICA_STICKINESS_SECONDS)
+    monkeypatch.setattr(stickiness, "primary_pins", primary_pins)
+    return primary_pins
+
+
+@pytest.fixture
+def routed_dbs(settings, primary_pins):
+    settings.REPLICA_DATABASES = ["replica_0"]
+    routed_dbs = []
+
+    def get_response(request):
+        routed_dbs.append(PrimaryReplicaRouter().db_for_read(Resource))
+        return HttpResponse()
+
+    return routed_dbs, ReplicaStickinessMiddleware(get_response)
+
+
+def user_request(method, user, access=None):
+    request = getattr(RequestFactory(), method)("/")
+    # as authenticated by DRF, after the middleware
+    request.user = user
+    if access is not None:
+        request.COOKIES[settings.JWT_ACCESS_TOKEN_COOKIE_NAME] = str(access)
+    return request
+
+
+# outside of a test transaction, which would pin every read to the primary
+@pytest.mark.django_db(transaction=True)
+class TestReplicaStickinessMiddleware:
+    @pytest.mark.parametrize("method", ["post", "put", "patch", "delete"])
+    def test_write_should_read_from_primary_and_pin_user(
+        self, routed_dbs, primary_pins, given_user, method
+    ):
+        # given
+        routed_dbs, middleware = routed_dbs
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            middleware(user_request(method, given_user))
+
+        # then
+        assert routed_dbs == [PRIMARY_DATABASE]
+        assert primary_pins.is_pinned(given_user.id)
+        assert "SELECT pg_notify('replica_stickiness', '%s')" % given_user.id in [
+            query["sql"] for query in context.captured_queries
+        ]
+
+    def test_anonymous_write_should_not_pin(self, routed_dbs, primary_pins):
+        # given
+        routed_dbs, middleware = routed_dbs
+
+        # when
+        middleware(user_request("post", AnonymousUser()))
+
+        # then
+        assert routed_dbs == [PRIMARY_DATABASE]
+        assert not primary_pins
+
+    def test_read_should_read_from_replica(self, routed_dbs, given_user, access):
+        # given
+        routed_dbs, middleware = routed_dbs
+
+        # when
+        middleware(user_request("get", given_user, access))
+
+        # then
+        assert routed_dbs == ["replica_0"]
+
+    def test_read_after_write_should_read_from_primary(
+        self, routed_dbs, given_user, access
+    ):
+        # given
+        routed_dbs, middleware = routed_dbs
+        other_user = UserFactory.create()
+        # from another client of the user, without any cookie of the write
+        middleware(user_request("post", given_user))
+
+        # when
+        middleware(user_request("get", given_user, access))
+        middleware(
+            user_request(
+                "get", other_user, RefreshToken.for_user(other_user).access_token
+            )
+        )
+        middleware(user_request("get", AnonymousUser(), "not-a-token"))
+
+        # then
+        assert routed_dbs == [
+            PRIMARY_DATABASE,
+            PRIMARY_DATABASE,
+            "replica_0",
+            "replica_0",
+        ]
+        assert PrimaryReplicaRouter().db_for_read(Resource) == "replica_0"
+
+
+def decompress(encoding, content):
+    if encoding == "br":
+        return brotli.decompress(content)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+    return gzip.decompress(content)
+
+
+class TestCompressionMiddleware:
+    body = b'{"title": "Bitcoin is Sound Money"}' * 100
+
+    @pytest.mark.parametrize(
+        "accept_encoding,expected",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip, zstd", "zstd"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip;q=0.5", "gzip"),
+            ("*", "br"),
+            ("*, br;q=0", "zstd"),
+            ("gzip;q=1, br;q=0.1", "gzip"),
+            ("br;q=0.5, zstd;q=0.8, gzip;q=0.8", "zstd"),
+            ("gzip, *;q=0.5", "gzip"),
+        ],
+    )
+    def test_should_compress_with_preferred_accepted_encoding(
+        self, accept_encoding, expected
+    ):
+        # given
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+
+        # when
+        response = middleware(request)
+
+        # then
+        assert response["Content-Encoding"] == expected
+        assert response["Vary"] == "Accept-Encoding"
+        assert int(response["Content-Length"]) == len(response.content)
+        assert decompress(expected, response.content) == self.body
+
+    @pytest.mark.parametrize("accept_encoding", ["", "identity", "deflate", "gzip;q=0"])
+    def test_should_not_compress_given_no_accepted_encoding(self, accept_encoding):
+        # given
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+
+        # when
+        response = middleware(request)
+
+        # then
+        assert not response.has_header("Content-Encoding")
+        assert response.content == self.body
+
+    def test_should_not_compress_below_min_size(self, settings):
+        # given
+        settings.COMPRESSION_MIN_SIZE = len(self.body) + 1
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        # when
+        response = middleware(request)
+
+        # then
+        assert not response.has_header("Content-Encoding")
+        assert response.content == self.body
+
+    def test_should_compress_with_configured_level(self, settings):
+        # given
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        # when
+        settings.COMPRESSION_LEVELS = {"gzip": 1}
+        fast = middleware(request)
+        settings.COMPRESSION_LEVELS = {"gzip": 9}
+        small = middleware(request)
+
+        # then: the XFL byte of the gzip header flags the fastest and smallest levels
+        assert fast.content[8] == 4
+        assert small.content[8] == 2
+
+    @pytest.mark.parametrize("encoding", ["br", "zstd", "gzip"])
+    def test_should_compress_streaming_response_chunk_by_chunk(self, encoding):
+        # given
+        produced = []
+
+        def chunks():
+            for i in range(3):
+                produced.append(i)
+                yield self.body
+
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(chunks())
+        )
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=encoding)
+
+        # when
+        response = middleware(request)
+        first = next(response.streaming_content)
+
+        # then: the first chunk is sent before the next one is produced
+        assert produced == [0]
+
+        # when
+        streamed = [first, *response.streaming_content]
+
+        # then
+        assert response["Content-Encoding"] == encoding
+        assert not response.has_header("Content-Length")
+        assert decompress(encoding, b"".join(streamed)) == self.body * 3
+
+    def test_should_skip_encoded_response_and_weaken_etag(self):
+        # given
+        def get_response(request):
+            response = HttpResponse(self.body)
+            response["ETag"] = '"abc"'
+            return response
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        encoded = HttpResponse(self.body)
+        encoded["Content-Encoding"] = "identity"
+
+        # when
+        response = CompressionMiddleware(get_response)(request)
+        skipped = CompressionMiddleware(lambda request: encoded)(request)
+
+        # then
+        assert response["ETag"] == 'W/"abc"'
+        assert skipped.content == self.body
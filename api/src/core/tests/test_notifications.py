@@ -0,0 +1,34 @@
+import queue
+
+from django.db import transaction
+
+import pytest
+from core.notifications import Listener, notify
+
+
+@pytest.mark.django_db(transaction=True)
+class TestListener:
+    def test_should_receive_notifications_once_committed(self):
+        # given
+        payloads = queue.Queue()
+        listener = Listener("test_channel", payloads.put, poll_timeout=0.1)
+        listener.start()
+        assert payloads.get(timeout=5) is None  # connected
+
+        try:
+            # when
+            with transaction.atomic():
+                notify("test_channel", "first")
+                notify("other_channel", "ignored")
+                assert payloads.empty()  # not committed yet
+
+            notify("test_channel", "second")
+
+            # then
+            assert payloads.get(timeout=5) == "first"
+            assert payloads.get(timeout=5) == "second"
+        finally:
+            listener.stop()
+            listener.join(timeout=5)
+
+        assert not listener.is_alive()
@@ -0,0 +1,38 @@
+from django.db import connection
+
+import pytest
+
+
+@pytest.mark.django_db
+class TestAddIndexToPartitions:
+    # added by resources migration 0005
+    @pytest.mark.parametrize(
+        "index",
+        [
+            "resources_owner_id",
+            "resources_owner_created",
+            "resources_owner_title_prefix",
+        ],
+    )
+    def test_index_should_be_valid_and_attached_to_each_partition(self, index):
+        # when
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = %s::regclass",
+                [index],
+            )
+            (valid,) = cursor.fetchone()
+            cursor.execute(
+                "SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass",
+                [index],
+            )
+            (attached,) = cursor.fetchone()
+            cursor.execute(
+                "SELECT count(*) FROM pg_inherits "
+                "WHERE inhparent = 'resources_resource'::regclass"
+            )
+            (partitions,) = cursor.fetchone()
+
+        # then
+        assert valid
+        assert attached == partitions == 16
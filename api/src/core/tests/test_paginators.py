@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from conftest import UserFactory
+from core.paginators import EstimatedCountPaginator, estimate_count
+from users.models import EmailUser
+
+
+@pytest.mark.django_db
+class TestEstimateCount:
+    def test_should_return_planner_estimate_without_counting(self):
+        # given
+        UserFactory.create_batch(5)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE users_emailuser")
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            estimate = estimate_count(EmailUser.objects.order_by("email"))
+
+        # then
+        assert estimate == 5
+        assert len(context.captured_queries) == 1
+        assert context.captured_queries[0]["sql"].startswith("EXPLAIN (FORMAT JSON)")
+        assert "ORDER BY" not in context.captured_queries[0]["sql"]
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_count_should_be_exact_below_threshold(self, settings, mocker):
+        # given
+        settings.ESTIMATED_COUNT_THRESHOLD = 100
+        mocker.patch("core.paginators.estimate_count", return_value=99)
+        UserFactory.create_batch(3)
+
+        # when
+        paginator = EstimatedCountPaginator(EmailUser.objects.order_by("email"), 2)
+
+        # then
+        assert paginator.count == 3
+        assert paginator.num_pages == 2
+
+    def test_count_should_be_estimated_at_threshold(self, settings, mocker):
+        # given
+        settings.ESTIMATED_COUNT_THRESHOLD = 100
+        mocker.patch("core.paginators.estimate_count", return_value=1000)
+        UserFactory.create_batch(3)
+
+        # when
+        paginator = EstimatedCountPaginator(EmailUser.objects.order_by("email"), 2)
+
+        with CaptureQueriesContext(connection) as context:
+            count = paginator.count
+
+        # then
+        assert count == 1000
+        assert paginator.num_pages == 500
+        assert len(context.captured_queries) == 0
+
+    def test_count_should_be_exact_given_list(self, settings):
+        # given
+        settings.ESTIMATED_COUNT_THRESHOLD = 0
+
+        # when
+        paginator = EstimatedCountPaginator(list(range(7)), 2)
+
+        # then
+        assert paginator.count == 7
@@ -0,0 +1,33 @@
+import io
+
+from rest_framework.exceptions import ParseError
+
+import pytest
+from core.parsers import FastJSONParser
+
+
+class TestFastJSONParser:
+    @pytest.mark.parametrize(
+        "body,encoding",
+        [
+            ('{"title": "Sound Money ₿", "ids": [1, 2]}'.encode(), "utf-8"),
+            ('{"title": "Sound Money ₿", "ids": [1, 2]}'.encode("utf-16"), "utf-16"),
+        ],
+    )
+    def test_parse(self, body, encoding):
+        # when
+        data = FastJSONParser().parse(
+            io.BytesIO(body), parser_context={"encoding": encoding}
+        )
+
+        # then
+        assert data == {"title": "Sound Money ₿", "ids": [1, 2]}
+
+    @pytest.mark.parametrize("body", [b'{"title": ', b'{"amount": NaN}', b"\xff"])
+    def test_parse_should_raise_parse_error_given_invalid_json(self, body):
+        # when
+        with pytest.raises(ParseError) as excinfo:
+            FastJSONParser().parse(io.BytesIO(body))
+
+        # then
+        assert str(excinfo.value.detail).startswith("JSON parse error")
@@ -0,0 +1,182 @@
+import threading
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+import pytest
+from conftest import UserFactory
+from core.middleware import ProfilingMiddleware
+from core.models import RequestProfile
+from core.profiling import StackSampler, get_token_user, make_token
+from users.models import EmailUser
+
+
+@pytest.fixture
+def staff_user():
+    return UserFactory.create(is_staff=True)
+
+
+@pytest.fixture
+def staff_client(staff_user):
+    client = APIClient()
+    client.force_authenticate(user=staff_user)
+    return client
+
+
+def count_users(request):
+    EmailUser.objects.count()
+    time.sleep(0.02)
+    return HttpResponse()
+
+
+@pytest.mark.django_db
+class TestProfilingToken:
+    def test_get_token_user_should_return_staff_user(self, staff_user):
+        # when
+        user = get_token_user(make_token(staff_user))
+
+        # then
+        assert user == staff_user
+
+    def test_get_token_user_should_reject_expired_token(self, settings, staff_user):
+        # given
+        token = make_token(staff_user)
+        settings.PROFILING_TOKEN_MAX_AGE = -1
+
+        # when
+        user = get_token_user(token)
+
+        # then
+        assert user is None
+
+    @pytest.mark.parametrize("token", [None, "tampered"])
+    def test_get_token_user_should_reject_invalid_or_non_staff_token(
+        self, staff_user, token
+    ):
+        # given
+        if token is None:  # made for a user who is no longer staff
+            token = make_token(staff_user)
+            staff_user.is_staff = False
+            staff_user.save()
+        else:
+            token = make_token(staff_user) + token
+
+        # when
+        user = get_token_user(token)
+
+        # then
+        assert user is None
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    def test_should_store_profile_given_token(self, staff_user):
+        # given
+        middleware = ProfilingMiddleware(count_users)
+        request = RequestFactory().get(
+            "/resources/?page=2", HTTP_X_PROFILE=make_token(staff_user)
+        )
+
+        # when
+        response = middleware(request)
+
+        # then
+        profile = RequestProfile.objects.get()
+        assert response["X-Profile-Id"] == str(profile.id)
+        assert profile.user == staff_user
+        assert profile.method == "GET"
+        assert profile.path == "/resources/?page=2"
+        assert profile.status_code == 200
+        assert profile.duration_ms >= 20
+        assert profile.samples > 0
+        assert "test_profiling.count_users" in profile.stacks
+        (query,) = profile.queries
+        assert 'COUNT(*) AS "__count"' in query["sql"]
+        assert query["database"] == "default"
+
+    @pytest.mark.parametrize("headers", [{}, {"HTTP_X_PROFILE": "invalid"}])
+    def test_should_not_profile_without_valid_token(self, headers):
+        # given
+        middleware = ProfilingMiddleware(count_users)
+        request = RequestFactory().get("/", **headers)
+
+        # when
+        response = middleware(request)
+
+        # then
+        assert "X-Profile-Id" not in response
+        assert not RequestProfile.objects.exists()
+
+
+class TestStackSampler:
+    def test_folded_should_count_stacks_outermost_first(self):
+        # given
+        sampler = StackSampler(threading.get_ident(), 0.001)
+
+        # when
+        sampler.start()
+        time.sleep(0.05)
+        sampler.stop()
+
+        # then
+        stack, count = sampler.folded().splitlines()[0].rsplit(" ", 1)
+        frames = stack.split(";")
+        assert int(count) > 0
+        assert len(frames) > 1
+        assert frames[-1] == (
+            "core.tests.test_profiling.test_folded_should_count_stacks_outermost_first"
+        )
+
+
+@pytest.mark.django_db
+class TestProfileViews:
+    def test_post_token_should_return_usable_token(self, staff_client, staff_user):
+        # when
+        response = staff_client.post(reverse("core:profile-token"))
+
+        # then
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["header"] == "X-Profile"
+        assert get_token_user(response.data["token"]) == staff_user
+
+    def test_post_token_should_forbid_non_staff(self, given_user):
+        # given
+        client = APIClient()
+        client.force_authenticate(user=given_user)
+
+        # when
+        response = client.post(reverse("core:profile-token"))
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_get_should_return_profile_and_folded_stacks(self, staff_client):
+        # given
+        profile = RequestProfile.objects.create(
+            method="GET",
+            path="/resources/",
+            status_code=200,
+            duration_ms=12.5,
+            stacks="a.main;b.view 3\na.main 1",
+            samples=4,
+        )
+
+        # when
+        response = staff_client.get(
+            reverse("core:profile-detail", kwargs={"pk": profile.id})
+        )
+        folded = staff_client.get(
+            reverse("core:profile-folded", kwargs={"pk": profile.id})
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["samples"] == 4
+        assert response.data["path"] == "/resources/"
+        assert folded.status_code == status.HTTP_200_OK
+        assert folded["Content-Type"] == "text/plain; charset=utf-8"
+        assert folded.content == b"a.main;b.view 3\na.main 1\n"
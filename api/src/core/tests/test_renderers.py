@@ -0,0 +1,78 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+import msgpack
+import pytest
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+DATA = ReturnList(
+    [
+        {
+            "id": 1,
+            "title": "Bitcoin is Sound Money ₿",
+            "created_at": datetime.datetime(
+                2021, 8, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+            ),
+            "day": datetime.date(2021, 8, 1),
+            "amount": decimal.Decimal("1.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "detail": gettext_lazy("Not found."),
+            "tags": ("a", "b"),
+            "nested": {1: None, "ok": True, "ratio": 0.5},
+        }
+    ],
+    serializer=None,
+)
+
+
+class TestFastJSONRenderer:
+    def test_render_should_match_json_renderer(self):
+        # when
+        rendered = FastJSONRenderer().render(DATA)
+
+        # then
+        assert rendered == JSONRenderer().render(DATA)
+
+    def test_render_should_escape_line_and_paragraph_separators(self):
+        # given
+        data = {"title": "line\u2028paragraph\u2029end"}
+
+        # when
+        rendered = FastJSONRenderer().render(data)
+
+        # then
+        assert rendered == JSONRenderer().render(data)
+        assert rendered == b'{"title":"line\\u2028paragraph\\u2029end"}'
+        assert json.loads(rendered) == data
+
+    def test_render_should_indent_given_accept_header_indent(self):
+        # when
+        rendered = FastJSONRenderer().render(
+            {"id": 1}, accepted_media_type="application/json; indent=4"
+        )
+
+        # then
+        assert rendered == b'{\n  "id": 1\n}'
+
+    @pytest.mark.parametrize("renderer", [FastJSONRenderer, MessagePackRenderer])
+    def test_render_should_return_empty_given_none(self, renderer):
+        # then
+        assert renderer().render(None) == b""
+
+
+class TestMessagePackRenderer:
+    def test_render_should_match_json_renderer(self):
+        # when
+        rendered = MessagePackRenderer().render(DATA)
+
+        # then
+        expected = json.loads(JSONRenderer().render(DATA))
+        assert msgpack.unpackb(rendered, strict_map_key=False) == [
+            {**expected[0], "nested": {1: None, "ok": True, "ratio": 0.5}}
+        ]
@@ -0,0 +1,65 @@
+from django.db import transaction
+
+import pytest
+from core.routers import PRIMARY_DATABASE, PrimaryReplicaRouter, use_primary
+from resources.models import Resource
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.REPLICA_DATABASES = ["replica_0", "replica_1"]
+    return settings.REPLICA_DATABASES
+
+
+class TestPrimaryReplicaRouter:
+    def test_db_for_read_should_return_replica(self, replicas):
+        # when
+        db = PrimaryReplicaRouter().db_for_read(Resource)
+
+        # then
+        assert db in replicas
+
+    def test_db_for_read_should_return_primary_without_replicas(self, settings):
+        # given
+        settings.REPLICA_DATABASES = []
+
+        # when
+        db = PrimaryReplicaRouter().db_for_read(Resource)
+
+        # then
+        assert db == PRIMARY_DATABASE
+
+    def test_db_for_read_should_return_primary_given_use_primary(self, replicas):
+        # when
+        with use_primary():
+            db = PrimaryReplicaRouter().db_for_read(Resource)
+
+        # then
+        assert db == PRIMARY_DATABASE
+        assert PrimaryReplicaRouter().db_for_read(Resource) in replicas
+
+    @pytest.mark.django_db
+    def test_db_for_read_should_return_primary_in_transaction(self, replicas):
+        # when
+        with transaction.atomic():
+            db = PrimaryReplicaRouter().db_for_read(Resource)
+
+        # then
+        assert db == PRIMARY_DATABASE
+
+    def test_db_for_write_should_return_primary(self, replicas):
+        # when
+        db = PrimaryReplicaRouter().db_for_write(Resource)
+
+        # then
+        assert db == PRIMARY_DATABASE
+
+    @pytest.mark.parametrize(
+        "db,allowed", [(PRIMARY_DATABASE, True), ("replica_0", False)]
+    )
+    def test_allow_migrate_should_only_allow_primary(self, replicas, db, allowed):
+        # when
+        allow = PrimaryReplicaRouter().allow_migrate(db, "resources")
+
+        # then
+        assert allow is allowed
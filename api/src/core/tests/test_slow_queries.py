@@ -0,0 +1,171 @@
+import logging
+import threading
+
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+import pytest
+from conftest import UserFactory
+from core.profiling import QueryRecorder
+from core.slow_queries import (
+    SlowQueryLog,
+    get_request_id,
+    record_slow_query,
+    request_context,
+    slow_queries,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_slow_queries():
+    slow_queries.clear()
+    yield
+    slow_queries.clear()
+
+
+@pytest.fixture
+def staff_client():
+    client = APIClient()
+    client.force_authenticate(user=UserFactory.create(is_staff=True))
+    return client
+
+
+def run_sleep(seconds):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_sleep(%s)", [seconds])
+
+
+class TestSlowQueryLog:
+    def test_records_should_keep_latest_first(self):
+        # given
+        log = SlowQueryLog(maxlen=2)
+
+        # when
+        for i in range(3):
+            log.add({"sql": str(i)})
+
+        # then
+        assert log.records() == [{"sql": "2"}, {"sql": "1"}]
+
+    def test_get_request_id_should_prefer_proxy_header(self):
+        # given
+        request = RequestFactory().get("/", HTTP_X_REQUEST_ID="abc-123")
+
+        # when
+        request_id = get_request_id(request)
+
+        # then
+        assert request_id == "abc-123"
+
+    def test_get_request_id_should_generate_id_without_header(self):
+        # when
+        request_id = get_request_id(RequestFactory().get("/"))
+
+        # then
+        assert len(request_id) == 32
+
+
+@pytest.mark.django_db
+class TestRecordSlowQuery:
+    def test_should_be_installed_on_connections(self):
+        # when
+        connection.ensure_connection()
+
+        # then
+        assert connection.execute_wrappers.count(record_slow_query) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_should_outlast_wrappers_of_block_opening_connection(self):
+        # given a thread's connection, first opened within a block of QueryRecorder
+        recorder = QueryRecorder()
+        wrappers = []
+
+        def run():
+            try:
+                with recorder.record():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                wrappers.extend(connection.execute_wrappers)
+            finally:
+                connection.close()
+
+        # when
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+        # then
+        assert wrappers == [record_slow_query]
+        assert len(recorder.queries) == 1
+
+    def test_should_record_query_over_threshold(self, settings, caplog):
+        # given
+        settings.SLOW_QUERY_THRESHOLD_MS = 20
+        request = RequestFactory().get("/")
+
+        # when
+        with request_context(request, "abc-123"), caplog.at_level(logging.WARNING):
+            run_sleep(0)
+            run_sleep(0.03)
+
+        # then
+        (record,) = slow_queries.records()
+        assert record["sql"] == "SELECT pg_sleep(%s)"
+        assert record["duration_ms"] >= 20
+        assert record["database"] == "default"
+        assert record["request_id"] == "abc-123"
+        assert record["stack"][0].startswith("core/tests/test_slow_queries.py:")
+        assert record["stack"][0].endswith(" in run_sleep")
+        (log_record,) = [r for r in caplog.records if r.name == "core.slow_queries"]
+        assert log_record.getMessage().startswith("Slow query (")
+        assert log_record.request_id == "abc-123"
+
+    def test_should_not_record_given_no_threshold(self, settings):
+        # given
+        settings.SLOW_QUERY_THRESHOLD_MS = None
+
+        # when
+        run_sleep(0.01)
+
+        # then
+        assert slow_queries.records() == []
+
+
+@pytest.mark.django_db
+class TestSlowQueryView:
+    def test_get_should_return_slow_queries_with_view_and_request_id(
+        self, settings, staff_client
+    ):
+        # given
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        response = staff_client.get(reverse("resources:resource-list"))
+        settings.SLOW_QUERY_THRESHOLD_MS = None
+
+        # when
+        slow = staff_client.get(reverse("core:slow-queries"))
+
+        # then
+        assert slow.status_code == status.HTTP_200_OK
+        assert slow.data
+        for record in slow.data:
+            assert record["view"] == "resources:resource-list"
+            assert record["request_id"] == response["X-Request-Id"]
+        assert any(
+            line.startswith("resources/views.py:")
+            for record in slow.data
+            for line in record["stack"]
+        )
+
+    def test_get_should_forbid_non_staff(self, given_user):
+        # given
+        client = APIClient()
+        client.force_authenticate(user=given_user)
+
+        # when
+        response = client.get(reverse("core:slow-queries"))
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,91 @@
+import pytest
+from core import stickiness
+from core.stickiness import PrimaryPins, _on_pin
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def primary_pins(clock):
+    return PrimaryPins(window=10, clock=clock)
+
+
+class TestPrimaryPins:
+    def test_pin_should_pin_user_for_window(self, primary_pins, clock):
+        # when
+        primary_pins.pin(1)
+
+        # then
+        assert primary_pins.is_pinned(1)
+        assert not primary_pins.is_pinned(2)
+        assert primary_pins
+
+        # when
+        clock.now = 10
+
+        # then
+        assert not primary_pins.is_pinned(1)
+        assert not primary_pins
+
+    def test_pin_should_extend_window_of_pinned_user(self, primary_pins, clock):
+        # given
+        primary_pins.pin(1)
+        clock.now = 5
+
+        # when
+        primary_pins.pin(1)
+        clock.now = 12
+
+        # then
+        assert primary_pins.is_pinned(1)
+
+    def test_pin_should_drop_expired_pins(self, primary_pins, clock):
+        # given
+        primary_pins.pin(1)
+        primary_pins.pin(2)
+        clock.now = 10
+
+        # when
+        primary_pins.pin(3)
+
+        # then
+        assert list(primary_pins._until) == [3]
+
+    def test_pin_given_none_should_pin_all_users(self, primary_pins, clock):
+        # when
+        primary_pins.pin()
+
+        # then
+        assert primary_pins.is_pinned(1)
+        assert primary_pins.is_pinned(2)
+
+        # when
+        clock.now = 10
+
+        # then
+        assert not primary_pins.is_pinned(1)
+
+
+@pytest.mark.parametrize("payload,pinned", [(None, [1, 2]), ("1", [1])])
+def test_notification_should_pin(monkeypatch, payload, pinned):
+    # given
+    monkeypatch.setattr(stickiness, "primary_pins", PrimaryPins(window=10))
+
+    # when
+    _on_pin(payload)
+
+    # then
+    assert [stickiness.primary_pins.is_pinned(user_id) for user_id in [1, 2]] == [
+        user_id in pinned for user_id in [1, 2]
+    ]
@@ -0,0 +1,29 @@
+import logging
+
+from core import warmup
+
+
+class TestWarmUp:
+    def test_should_return_duration_of_each_step(self):
+        # when
+        durations = warmup.warm_up()
+
+        # then
+        assert list(durations) == [step.__name__ for step in warmup.STEPS]
+
+    def test_should_skip_failing_step(self, monkeypatch, caplog):
+        # given
+        def warm_up_failing():
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(warmup, "STEPS", [warm_up_failing, warmup.warm_up_settings])
+
+        # when
+        with caplog.at_level(logging.INFO, logger="core.warmup"):
+            durations = warmup.warm_up()
+
+        # then
+        assert list(durations) == ["warm_up_settings"]
+        messages = [record.getMessage() for record in caplog.records]
+        assert "Warm-up step warm_up_failing failed" in messages
+        assert messages[-1].startswith("Warmed up in ")
@@ -0,0 +1,25 @@
+from django.urls import path
+
+from .views import HealthView, ProfileTokenView, RequestProfileViewSet, SlowQueryView
+
+app_name = "core"
+
+urlpatterns = [
+    path("health/", HealthView.as_view(), name="health"),
+    path(
+        "profiles/token/",
+        ProfileTokenView.as_view({"post": "create"}),
+        name="profile-token",
+    ),
+    path(
+        "profiles/<int:pk>/",
+        RequestProfileViewSet.as_view({"get": "retrieve"}),
+        name="profile-detail",
+    ),
+    path(
+        "profiles/<int:pk>/folded/",
+        RequestProfileViewSet.as_view({"get": "folded"}),
+        name="profile-folded",
+    ),
+    path("slow-queries/", SlowQueryView.as_view({"get": "list"}), name="slow-queries"),
+]
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import mixins, status
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet
+
+from users.authentication import JWTCookieAuthentication
+
+from .models import RequestProfile
+from .profiling import make_token
+from .serializers import RequestProfileSerializer
+from .slow_queries import slow_queries
+
+
+class HealthView(APIView):
+    """
+    Health check for load balancers and orchestrators, answered without touching the
+    database so that it stays cheap under load.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"status": "ok"})
+
+
+class ProfileTokenView(GenericViewSet):
+    """
+    Staff endpoint returning a token to profile requests with, see core.profiling
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def create(self, request, *args, **kwargs):
+        return Response(
+            {
+                "header": "X-Profile",
+                "token": make_token(request.user),
+                "expires_in": settings.PROFILING_TOKEN_MAX_AGE,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class RequestProfileViewSet(mixins.RetrieveModelMixin, GenericViewSet):
+    """
+    Staff endpoint returning a request profile, or only its stacks in the folded format
+    of flamegraph.pl e.g. `curl .../folded/ | flamegraph.pl > profile.svg`.
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    queryset = RequestProfile.objects.all()
+    serializer_class = RequestProfileSerializer
+
+    def folded(self, request, *args, **kwargs):
+        stacks = self.get_object().stacks
+        return HttpResponse(stacks + "\n", content_type="text/plain; charset=utf-8")
+
+
+class SlowQueryView(GenericViewSet):
+    """
+    Staff endpoint returning the latest slow queries of the process serving the request,
+    the latest first. See core.slow_queries
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        return Response(slow_queries.records())
@@ -0,0 +1,96 @@
+"""
+Warm-up of a worker before it accepts traffic, called by config.wsgi and config.asgi
+once the application is loaded.
+
+Without it, the first requests a worker serves after a deploy or a scale-up pay for
+what django, DRF and simplejwt build lazily: the URL resolvers, the classes named in
+the REST_FRAMEWORK and SIMPLE_JWT settings, the password hashers, the JWT backend, and
+the fields of the serializers. None of it touches the database, so that it is safe in
+a process that forks workers afterwards.
+"""
+
+import logging
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.urls import get_resolver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DRF_SETTINGS = [
+    "DEFAULT_RENDERER_CLASSES",
+    "DEFAULT_PARSER_CLASSES",
+    "DEFAULT_AUTHENTICATION_CLASSES",
+    "DEFAULT_PERMISSION_CLASSES",
+    "DEFAULT_THROTTLE_CLASSES",
+    "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+    "DEFAULT_PAGINATION_CLASS",
+    "DEFAULT_FILTER_BACKENDS",
+    "EXCEPTION_HANDLER",
+]
+
+JWT_SETTINGS = ["AUTH_TOKEN_CLASSES", "USER_AUTHENTICATION_RULE"]
+
+
+def warm_up_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        namespace_resolver.reverse_dict
+
+
+def warm_up_settings():
+    from rest_framework.settings import api_settings
+
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+    for name in DRF_SETTINGS:
+        getattr(api_settings, name)
+    for name in JWT_SETTINGS:
+        getattr(jwt_settings, name)
+
+
+def warm_up_auth():
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from users.authentication import JWTCookieAuthentication
+    from users.models import EmailUser
+
+    get_hashers()
+    # encodes and decodes a token of an unsaved user, which loads the JWT backend
+    token = str(AccessToken.for_user(EmailUser(id=0)))
+    JWTCookieAuthentication().get_validated_token(token)
+
+
+def warm_up_serializers():
+    from resources.models import Resource
+    from resources.serializers import ResourceSerializer
+    from users.models import EmailUser
+
+    owner = EmailUser(id=0, email="warm-up@localhost")
+    resource = Resource(id=0, title="", owner=owner, created_at=timezone.now())
+    ResourceSerializer(resource).data
+    ResourceSerializer(resource, expand=["owner"]).data
+
+
+STEPS = [warm_up_urls, warm_up_settings, warm_up_auth, warm_up_serializers]
+
+
+def warm_up():
+    """
+    Runs every warm-up step, and returns the duration of each in milliseconds.
+    A failing step is logged and skipped, warming up is only an optimization.
+    """
+    durations = {}
+    for step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", step.__name__)
+            continue
+        durations[step.__name__] = (time.perf_counter() - start) * 1000
+
+    logger.info("Warmed up in %.1f ms", sum(durations.values()))
+    return durations
@@ -1,12 +1,174 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import router
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 
-from .models import Quota, Resource
+from core.paginators import EstimatedCountPaginator
+
+from .models import Quota, QuotaGroup, QuotaUtilization, Resource
+from .services import (
+    MAX_QUOTA_AMOUNT,
+    BulkQuotaService,
+    get_quota_utilization,
+    recount_quota_group,
+)
 
 
 @admin.register(Resource)
 class ResourceAdmin(admin.ModelAdmin):
     list_display = ("title", "owner")
+    # join owner into the changelist query instead of one lookup per row
+    list_select_related = ("owner",)
+    # render owner as an AJAX search box instead of a <select> of every user
+    autocomplete_fields = ("owner",)
+
+    # avoid exact COUNT(*) over the whole table on every changelist view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class UtilizationListFilter(admin.SimpleListFilter):
+    title = "utilization"
+    parameter_name = "utilization"
+
+    def lookups(self, request, model_admin):
+        return [("0.9", "90% or more"), ("1", "At or over quota")]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        # the queryset is listed by get_quota_utilization()
+        return queryset.filter(
+            Q(utilization__gte=float(self.value())) | Q(utilization__isnull=True)
+        )
+
+
+@admin.register(QuotaUtilization)
+class QuotaUtilizationAdmin(admin.ModelAdmin):
+    """
+    Report of the users near or over their quota, see get_quota_utilization().
+    """
+
+    list_display = ("owner", "amount", "resource_count", "utilization_percent")
+    list_filter = (UtilizationListFilter,)
+    search_fields = ("owner__email",)
+
+    # avoid exact COUNT(*) over every quota on every changelist view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return get_quota_utilization()
+
+    @admin.display(description="resources", ordering="count")
+    def resource_count(self, obj):
+        return obj.count
+
+    @admin.display(description="utilization", ordering="utilization")
+    def utilization_percent(self, obj):
+        if obj.utilization is None:  # a quota of 0, always reached
+            return "-"
+        return "%d%%" % (obj.utilization * 100)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QuotaGroup)
+class QuotaGroupAdmin(admin.ModelAdmin):
+    """
+    Quotas shared by groups of users. Saving a group recounts its resources.
+    """
+
+    list_display = ("name", "amount", "resource_count")
+    search_fields = ("name",)
+    # render members as an AJAX search box instead of a <select> of every user
+    autocomplete_fields = ("members",)
+    actions = ["recount"]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(resource_count=Coalesce(Sum("shards__count"), 0))
+        )
+
+    @admin.display(description="resources", ordering="resource_count")
+    def resource_count(self, obj):
+        return obj.resource_count
+
+    @admin.action(description="Recount resources of selected groups")
+    def recount(self, request, queryset):
+        using = router.db_for_write(QuotaGroup)
+        group_ids = list(queryset.order_by("id").values_list("id", flat=True))
+        for group_id in group_ids:
+            recount_quota_group(group_id, using)
+        self.message_user(request, "Recounted %s groups." % len(group_ids))
 
 
 class QuotaInline(admin.TabularInline):
     model = Quota
+
+
+class QuotaActionForm(ActionForm):
+    """
+    Adds an amount input next to the action dropdown of a user changelist, consumed by
+    the bulk quota actions below.
+    """
+
+    amount = forms.IntegerField(
+        required=False, min_value=-MAX_QUOTA_AMOUNT, max_value=MAX_QUOTA_AMOUNT
+    )
+
+
+def _get_action_amount(modeladmin, request, min_value):
+    try:
+        amount = int(request.POST.get("amount", ""))
+    except ValueError:
+        amount = None
+
+    if amount is None or not min_value <= amount <= MAX_QUOTA_AMOUNT:
+        modeladmin.message_user(
+            request,
+            "Enter an amount between %s and %s." % (min_value, MAX_QUOTA_AMOUNT),
+            messages.ERROR,
+        )
+        return None
+
+    return amount
+
+
+@admin.action(description="Set quota of selected users to amount")
+def set_quota(modeladmin, request, queryset):
+    amount = _get_action_amount(modeladmin, request, min_value=0)
+    if amount is None:
+        return
+
+    count = BulkQuotaService(queryset).set(amount)
+    modeladmin.message_user(request, "Set quota of %s users to %s." % (count, amount))
+
+
+@admin.action(description="Increment quota of selected users by amount")
+def increment_quota(modeladmin, request, queryset):
+    amount = _get_action_amount(modeladmin, request, min_value=-MAX_QUOTA_AMOUNT)
+    if amount is None:
+        return
+
+    count = BulkQuotaService(queryset).increment(amount)
+    modeladmin.message_user(
+        request, "Incremented quota of %s users by %s." % (count, amount)
+    )
+
+
+@admin.action(description="Clear quota of selected users (unlimited)")
+def clear_quota(modeladmin, request, queryset):
+    count = BulkQuotaService(queryset).clear()
+    modeladmin.message_user(request, "Cleared quota of %s users." % count)
@@ -0,0 +1,157 @@
+"""
+Per-process cache of quota amounts, read by the quota check of every resource creation
+while quotas change maybe once a month.
+
+Changes to quotas invalidate the cache of every process: through the Quota signals
+(see resources.signals), or explicitly by code bypassing them e.g. BulkQuotaService.
+A worker only receives them once it runs start_quota_invalidation_listener(), and the
+TTL bounds how long a missed invalidation can serve a stale quota.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router, transaction
+
+from core.notifications import Listener, notify
+
+from .models import Quota
+
+QUOTA_INVALIDATION_CHANNEL = "quota_invalidation"
+# payload invalidating the quotas of all users
+ALL_USERS = "*"
+
+
+class QuotaCache:
+    """
+    LRU cache of `loader(user_id)` results, holding up to `maxsize` users for `ttl`
+    seconds each. Thread safe, the loader is called without holding the lock.
+    """
+
+    def __init__(self, loader, maxsize, ttl, clock=time.monotonic):
+        self.loader = loader
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries = OrderedDict()  # user id -> (expires at, amount)
+        self._lock = threading.Lock()
+        # bumped by invalidations, so that a load racing one is not cached
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            generation = self._generation
+
+        amount = self.loader(user_id)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (now + self.ttl, amount)
+                self._entries.move_to_end(user_id)
+
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return amount
+
+    def invalidate(self, user_id=None):
+        """
+        Drops the cached quota of the user, or of all users given None.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def load_quota_amount(user_id):
+    # read from the primary, as a lagging replica would cache an outdated quota
+    return (
+        Quota.objects.using(router.db_for_write(Quota))
+        .filter(user_id=user_id)
+        .values_list("amount", flat=True)
+        .first()
+    )
+
+
+quota_cache = QuotaCache(
+    load_quota_amount, settings.QUOTA_CACHE_SIZE, settings.QUOTA_CACHE_TTL
+)
+
+
+def get_quota_amount(user_id):
+    """
+    Returns the quota amount of the user, None if the user has no quota i.e. is
+    unlimited.
+    """
+    return quota_cache.get(user_id)
+
+
+def invalidate_quota(user_id=None):
+    """
+    Invalidates the cached quota of the user, or of all users given None, in every
+    process once the current transaction commits.
+    """
+    using = router.db_for_write(Quota)
+    payload = ALL_USERS if user_id is None else str(user_id)
+
+    notify(QUOTA_INVALIDATION_CHANNEL, payload, using=using)
+
+    # this process drops it right away and again on commit, as a concurrent request
+    # may cache the uncommitted, outdated quota in between
+    quota_cache.invalidate(user_id)
+    transaction.on_commit(lambda: quota_cache.invalidate(user_id), using=using)
+
+
+def start_quota_invalidation_listener():
+    listener = Listener(
+        QUOTA_INVALIDATION_CHANNEL,
+        _on_quota_invalidation,
+        using=router.db_for_write(Quota),
+    )
+    listener.start()
+    return listener
+
+
+def _on_quota_invalidation(payload):
+    # None after (re)connecting, when invalidations may have been missed
+    if payload is None or payload == ALL_USERS:
+        quota_cache.invalidate()
+    else:
+        quota_cache.invalidate(int(payload))
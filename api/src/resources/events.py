@@ -0,0 +1,146 @@
+"""
+Server-Sent Events stream of the changes to the authenticated user's resources, so that
+the SPA does not have to poll `GET /resources/` for changes made from other tabs,
+devices or the admin.
+
+Events are sent by the Resource signals (see resources.signals) with postgres NOTIFY,
+and fanned out to the streams of a worker by a single listener. The stream is an ASGI
+app mounted in config.asgi, it is not served under WSGI.
+
+Each event is named after the change, with the JSON representation of the resource:
+    event: created | updated | deleted
+    data: {"id": 1, "title": ...}   (only the id for deleted)
+
+A `reset` event means events may have been missed, and the client should reload its
+resources.
+"""
+
+import asyncio
+import io
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, router
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+import orjson
+from asgiref.sync import sync_to_async
+
+from core.broadcast import Broadcaster
+from core.notifications import notify
+from users.authentication import JWTCookieAuthentication
+
+from .models import Resource
+from .serializers import ResourceSerializer
+
+RESOURCE_EVENTS_CHANNEL = "resource_events"
+RESOURCE_EVENTS_PATH = "/resources/events/"
+
+broadcaster = Broadcaster(
+    RESOURCE_EVENTS_CHANNEL, key="owner", using=router.db_for_write(Resource)
+)
+
+
+def notify_resource_event(event, resource):
+    """
+    Sends `event` for `resource` to the streams of its owner once the current
+    transaction commits.
+    """
+    data = (
+        {"id": resource.id} if event == "deleted" else ResourceSerializer(resource).data
+    )
+    payload = orjson.dumps({"event": event, "owner": resource.owner_id, "data": data})
+
+    notify(
+        RESOURCE_EVENTS_CHANNEL, payload.decode(), using=router.db_for_write(Resource)
+    )
+
+
+def format_event(message):
+    if message is None:
+        return b"event: reset\ndata: {}\n\n"
+
+    return b"event: %s\ndata: %s\n\n" % (
+        message["event"].encode(),
+        orjson.dumps(message["data"]),
+    )
+
+
+async def resource_events(scope, receive, send):
+    """
+    ASGI app streaming the resource events of the user authenticated by
+    JWTCookieAuthentication, until the client disconnects.
+    """
+    try:
+        user = await sync_to_async(authenticate)(scope)
+    except APIException as exc:
+        await send_error(send, exc)
+        return
+
+    async with broadcaster.subscribe(user.id) as subscription:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),  # disable buffering in nginx
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": b"", "more_body": True})
+
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                message = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    [message, disconnected],
+                    timeout=settings.RESOURCE_EVENTS_HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if message in done:
+                    body = format_event(message.result())
+                else:
+                    message.cancel()
+                    # a comment line, keeping proxies from closing an idle stream
+                    body = b":\n\n"
+
+                if not disconnected.done():
+                    await send(
+                        {"type": "http.response.body", "body": body, "more_body": True}
+                    )
+        finally:
+            disconnected.cancel()
+
+
+def authenticate(scope):
+    # the same authentication as the resources API, run as a request would be
+    close_old_connections()
+    try:
+        request = Request(ASGIRequest(scope, io.BytesIO()))
+        user, _ = JWTCookieAuthentication().authenticate(request)
+        return user
+    finally:
+        close_old_connections()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def send_error(send, exc):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": exc.status_code,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send(
+        {"type": "http.response.body", "body": orjson.dumps({"detail": exc.detail})}
+    )
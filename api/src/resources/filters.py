@@ -0,0 +1,108 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import ResourceFilterSerializer
+
+
+class ResourceFieldFilter(BaseFilterBackend):
+    """
+    Filters resources by title prefix (case-sensitive), id range and creation time e.g.
+    `?title_prefix=Bit&id_min=10&id_max=99&created_after=2021-09-01T00:00:00Z`
+
+    Each filter is served by an index starting with owner, see Resource.Meta.indexes
+    """
+
+    lookups = {
+        "title_prefix": "title__startswith",
+        "id_min": "id__gte",
+        "id_max": "id__lte",
+        "created_after": "created_at__gt",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = ResourceFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        filters = {
+            self.lookups[param]: value
+            for param, value in serializer.validated_data.items()
+        }
+
+        return queryset.filter(**filters) if filters else queryset
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """
+    Full-text search over resource titles, e.g. `?search=sound mon`. Every search term
+    must prefix-match a word of the title. Results are ordered by relevance.
+
+    The search vector matches the expression of the `resources_owner_title_fts` GIN
+    index on Resource, so searches within an owner's resources are served by it.
+    """
+
+    search_param = "search"
+    config = "simple"  # no stemming, titles are not in any one language
+    max_terms = 10
+
+    def get_search_terms(self, request):
+        # keep word characters only, so that terms are safe in a raw tsquery
+        value = request.query_params.get(self.search_param, "")
+        return re.findall(r"\w+", value)[: self.max_terms]
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        vector = SearchVector("title", config=self.config)
+        query = SearchQuery(
+            " & ".join("%s:*" % term for term in terms),
+            search_type="raw",
+            config=self.config,
+        )
+
+        return (
+            queryset.annotate(search=vector, search_rank=SearchRank(vector, query))
+            .filter(search=query)
+            .order_by("-search_rank", "id")
+        )
+
+
+class IndexedOrderingFilter(BaseFilterBackend):
+    """
+    Orders results by `?ordering=`, accepting only the orderings listed in the view's
+    `orderings`. Each maps to the order_by() fields of an ordering served by an index,
+    so that clients cannot make postgres sort a large result set. Any other ordering
+    is rejected rather than ignored.
+
+    Results not ordered otherwise e.g. by relevance are ordered by the view's
+    `default_ordering`, since LIMIT/OFFSET pages of unordered results may overlap.
+
+    An index only serves the ordering on its own, or with filters on its columns:
+    filters served by other indexes, e.g. a title prefix or a search, leave postgres
+    to sort their matches.
+    """
+
+    ordering_param = "ordering"
+
+    def filter_queryset(self, request, queryset, view):
+        orderings = getattr(view, "orderings", {})
+        ordering = request.query_params.get(self.ordering_param)
+        if ordering is None:
+            default = getattr(view, "default_ordering", None)
+            if default is None or queryset.ordered:
+                return queryset
+            return queryset.order_by(*orderings[default])
+
+        if ordering not in orderings:
+            raise ValidationError(
+                {
+                    self.ordering_param: "Ordering by '%s' is not supported. "
+                    "Use one of: %s." % (ordering, ", ".join(orderings))
+                }
+            )
+
+        return queryset.order_by(*orderings[ordering])
@@ -0,0 +1,79 @@
+"""
+Converts resources_resource into a table hash partitioned on owner_id.
+
+Resources are queried almost exclusively by owner. With hash partitioning, a query
+filtered by owner is pruned to a single partition, and each partition's indexes and
+vacuum work stay a fraction of the size of a single table's.
+
+Postgres requires the partition key in every unique constraint, so the primary key
+becomes (id, owner_id). `id` remains unique since it is still drawn from the same
+sequence, and Django keeps treating it as the primary key.
+
+Rows are copied into the partitioned table and the tables are swapped within the
+migration's transaction, which holds an exclusive lock on resources_resource until it
+commits. Run it in a maintenance window for large tables.
+"""
+
+from django.db import migrations
+
+PARTITIONS = 16
+
+TABLE = "resources_resource"
+OWNER_INDEX = "resources_resource_owner_id_ffd5eed6"
+OWNER_FK = "resources_resource_owner_id_ffd5eed6_fk_users_emailuser_id"
+COLUMNS = '"id", "title", "owner_id"'
+
+
+def swap_table_sql(create_table_sql):
+    """
+    Returns the SQL that creates `<TABLE>_new` with `create_table_sql`, copies the rows
+    of TABLE into it and replaces TABLE with it.
+    """
+    return [
+        create_table_sql,
+        f'INSERT INTO "{TABLE}_new" ({COLUMNS}) SELECT {COLUMNS} FROM "{TABLE}";',
+        # the sequence is dropped along with the column owning it
+        f'ALTER SEQUENCE "{TABLE}_id_seq" OWNED BY "{TABLE}_new"."id";',
+        f'DROP TABLE "{TABLE}";',
+        f'ALTER TABLE "{TABLE}_new" RENAME TO "{TABLE}";',
+        f'ALTER TABLE "{TABLE}" RENAME CONSTRAINT "{TABLE}_new_pkey" TO "{TABLE}_pkey";',
+        # recreate the index and foreign key Django created under their original names
+        f'CREATE INDEX "{OWNER_INDEX}" ON "{TABLE}" ("owner_id");',
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{OWNER_FK}" FOREIGN KEY ("owner_id") '
+        f'REFERENCES "users_emailuser" ("id") DEFERRABLE INITIALLY DEFERRED;',
+    ]
+
+
+partition_sql = swap_table_sql(
+    f'CREATE TABLE "{TABLE}_new" ('
+    f"\"id\" bigint NOT NULL DEFAULT nextval('{TABLE}_id_seq'), "
+    f'"title" varchar(255) NOT NULL, '
+    f'"owner_id" bigint NOT NULL, '
+    f'CONSTRAINT "{TABLE}_new_pkey" PRIMARY KEY ("id", "owner_id")'
+    f') PARTITION BY HASH ("owner_id");'
+    + "".join(
+        f'CREATE TABLE "{TABLE}_p{remainder}" PARTITION OF "{TABLE}_new" '
+        f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder});"
+        for remainder in range(PARTITIONS)
+    )
+)
+
+unpartition_sql = swap_table_sql(
+    f'CREATE TABLE "{TABLE}_new" ('
+    f"\"id\" bigint NOT NULL DEFAULT nextval('{TABLE}_id_seq'), "
+    f'"title" varchar(255) NOT NULL, '
+    f'"owner_id" bigint NOT NULL, '
+    f'CONSTRAINT "{TABLE}_new_pkey" PRIMARY KEY ("id")'
+    f");"
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0002_quota'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=partition_sql, reverse_sql=unpartition_sql),
+    ]
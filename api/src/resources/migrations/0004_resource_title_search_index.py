@@ -0,0 +1,89 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.db import migrations
+import django.db.models.expressions
+
+INDEX = "resources_owner_title_fts"
+
+# btree_gin allows owner_id in the GIN index, so that the index alone narrows a search
+# down to the owner's matching titles
+INDEX_SQL = (
+    'CREATE INDEX {concurrently} IF NOT EXISTS "{name}" ON {only} "{table}" USING gin '
+    "(\"owner_id\", (to_tsvector('simple'::regconfig, COALESCE(\"title\", ''))))"
+)
+
+
+def get_partitions(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = 'resources_resource'::regclass ORDER BY 1"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_index(apps, schema_editor):
+    """
+    An index on a partitioned table cannot be created concurrently. Instead, an invalid
+    index is created on the parent table only, then each partition's index is built
+    concurrently and attached to it. The parent index becomes valid once every
+    partition's index is attached.
+    """
+    schema_editor.execute(
+        INDEX_SQL.format(
+            concurrently="", only="ONLY", name=INDEX, table="resources_resource"
+        )
+    )
+
+    for partition in get_partitions(schema_editor):
+        partition_index = "%s_owner_title_fts" % partition
+        schema_editor.execute(
+            INDEX_SQL.format(
+                concurrently="CONCURRENTLY",
+                only="",
+                name=partition_index,
+                table=partition,
+            )
+        )
+        schema_editor.execute(
+            'ALTER INDEX "%s" ATTACH PARTITION "%s"' % (INDEX, partition_index)
+        )
+
+
+def drop_index(apps, schema_editor):
+    # dropping the parent index drops the attached partition indexes
+    schema_editor.execute('DROP INDEX IF EXISTS "%s"' % INDEX)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("resources", "0003_partition_resource_by_owner"),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.BtreeGinExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_index, drop_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="resource",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        django.db.models.expressions.F("owner"),
+                        django.contrib.postgres.search.SearchVector(
+                            "title", config="simple"
+                        ),
+                        name="resources_owner_title_fts",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.6 on 2026-10-19 14:04
+
+import core.operations
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    # indexes are built concurrently on each partition of resources_resource
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0004_resource_title_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        core.operations.AddIndexToPartitions(
+            model_name='resource',
+            index=models.Index(fields=['owner', 'id'], name='resources_owner_id'),
+        ),
+        core.operations.AddIndexToPartitions(
+            model_name='resource',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='resources_owner_created'),
+        ),
+        core.operations.AddIndexToPartitions(
+            model_name='resource',
+            index=models.Index(fields=['owner', 'title'], name='resources_owner_title_prefix', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        # drop the index on owner alone once (owner, id) can replace it
+        migrations.AlterField(
+            model_name='resource',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
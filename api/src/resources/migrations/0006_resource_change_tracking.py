@@ -0,0 +1,63 @@
+# Generated by Django 3.2.6 on 2026-10-19 14:20
+
+import core.operations
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # the version index is built concurrently on each partition of resources_resource
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0005_resource_filtering_and_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('owner', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        # versions existing resources 1..n per owner and sets the owner's version to n,
+        # so that a full sync (since=0) returns them
+        migrations.RunSQL(
+            sql=[
+                'UPDATE "resources_resource" SET "version" = "numbered"."version" FROM (SELECT "id", "owner_id", ROW_NUMBER() OVER (PARTITION BY "owner_id" ORDER BY "id") AS "version" FROM "resources_resource") AS "numbered" WHERE "resources_resource"."id" = "numbered"."id" AND "resources_resource"."owner_id" = "numbered"."owner_id";',
+                'INSERT INTO "resources_resourceversion" ("owner_id", "version") SELECT "owner_id", COUNT(*) FROM "resources_resource" GROUP BY "owner_id";',
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        core.operations.AddIndexToPartitions(
+            model_name='resource',
+            index=models.Index(fields=['owner', 'version'], name='resources_owner_version'),
+        ),
+        migrations.AddField(
+            model_name='resourcetombstone',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='resourcetombstone',
+            index=models.Index(fields=['owner', 'version'], name='resources_tombstone_version'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.6 on 2026-10-19 14:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0006_resource_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceCount',
+            fields=[
+                ('owner', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='resource_count', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuotaUtilization',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'quota utilization',
+                'verbose_name_plural': 'quota utilization',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('resources.quota',),
+        ),
+        # counts existing resources once, they are counted as they change afterwards
+        migrations.RunSQL(
+            sql='INSERT INTO "resources_resourcecount" ("owner_id", "count") SELECT "owner_id", COUNT(*) FROM "resources_resource" GROUP BY "owner_id";',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.6 on 2026-10-19 14:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0007_resource_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuotaGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('amount', models.PositiveIntegerField(default=0)),
+                ('members', models.ManyToManyField(blank=True, related_name='quota_groups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuotaGroupShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('capacity', models.BigIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='resources.quotagroup')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='quotagroupshard',
+            constraint=models.UniqueConstraint(fields=('group', 'shard'), name='resources_quota_group_shard'),
+        ),
+    ]
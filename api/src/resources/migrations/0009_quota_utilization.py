@@ -0,0 +1,49 @@
+# Generated by Django 3.2.6 on 2026-10-19 15:31
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0008_quota_groups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcecount',
+            name='amount',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resourcecount',
+            name='utilization',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        # copies the amounts of existing quotas, they are copied as they change afterwards
+        migrations.RunSQL(
+            sql='INSERT INTO "resources_resourcecount" ("owner_id", "count", "amount", "utilization") SELECT "user_id", 0, "amount", 0 / NULLIF("amount", 0)::float FROM "resources_quota" ON CONFLICT ("owner_id") DO UPDATE SET "amount" = EXCLUDED."amount", "utilization" = "resources_resourcecount"."count"::float / NULLIF(EXCLUDED."amount", 0);',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='resourcecount',
+            index=models.Index(django.db.models.expressions.OrderBy(django.db.models.expressions.F('utilization'), descending=True, nulls_first=True), django.db.models.expressions.F('owner'), condition=models.Q(('amount__isnull', False)), name='resources_count_utilization'),
+        ),
+        migrations.DeleteModel(
+            name='QuotaUtilization',
+        ),
+        migrations.CreateModel(
+            name='QuotaUtilization',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'quota utilization',
+                'verbose_name_plural': 'quota utilization',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('resources.resourcecount',),
+        ),
+    ]
@@ -1,10 +1,53 @@
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import models, router, transaction
+from django.db.models import F, Q
 
 
 class Resource(models.Model):
+    """
+    The table is hash partitioned by owner (see migration 0003). Filter queries by owner
+    so that postgres prunes them to a single partition.
+    """
+
     title = models.CharField(max_length=255)
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # indexed by the (owner, id) index below instead of an index on owner alone
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    # the owner's ResourceVersion at the last save of the resource
+    version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # changes of an owner's resources, see ResourceViewSet.changes
+            models.Index(fields=["owner", "version"], name="resources_owner_version"),
+            # orderings and filters on an owner's resources, see resources.filters
+            models.Index(fields=["owner", "id"], name="resources_owner_id"),
+            models.Index(
+                fields=["owner", "created_at", "id"], name="resources_owner_created"
+            ),
+            models.Index(
+                fields=["owner", "title"],
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+                name="resources_owner_title_prefix",
+            ),
+            # full-text search over an owner's titles, see resources.filters
+            GinIndex(
+                "owner",
+                SearchVector("title", config="simple"),
+                name="resources_owner_title_fts",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the version bumped on pre_save (see resources.signals) must commit with the
+        # resource, or a sync could pass the version before the resource is visible
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -30,3 +73,149 @@ class Quota(models.Model):
             str(self.amount),
             self.user,
         )
+
+
+class ResourceVersion(models.Model):
+    """
+    Counter of the changes to an owner's resources, versioning them for delta syncs.
+
+    Bumping the counter locks its row until the transaction commits, so the changes of
+    an owner commit in the order of their versions. A sync which has seen version N
+    therefore never misses a change with a lower version.
+
+    Rows are removed with their user by resources.signals, there is no foreign key
+    constraint since resources are still versioned while their owner is deleted.
+    """
+
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    version = models.BigIntegerField(default=0)
+
+
+class ResourceCount(models.Model):
+    """
+    Number of resources of an owner, counted as resources are created and deleted (see
+    resources.signals) so that reports e.g. get_quota_utilization() never count the
+    resources table.
+
+    The owner's quota amount is copied alongside the count, so that the share of the
+    quota used is updated with the count by the same statement, and is indexed.
+
+    Rows are removed with their user by resources.signals, like ResourceVersion.
+    """
+
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="resource_count",
+    )
+    count = models.BigIntegerField(default=0)
+    # the owner's Quota.amount, null without a quota, see update_quota_utilization()
+    amount = models.PositiveSmallIntegerField(null=True, editable=False)
+    # count / amount, null without a quota or with a quota of 0
+    utilization = models.FloatField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # the quotas from most to least used, see get_quota_utilization()
+            models.Index(
+                F("utilization").desc(nulls_first=True),
+                F("owner"),
+                condition=Q(amount__isnull=False),
+                name="resources_count_utilization",
+            )
+        ]
+
+
+class QuotaGroup(models.Model):
+    """
+    Quota shared by a group of users e.g. a team, on top of each member's own quota.
+
+    The group's resources are counted by QuotaGroupShard rows rather than one counter
+    row, which every member creating a resource would otherwise have to lock in turn.
+    See resources.services.add_group_resource_count
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    amount = models.PositiveIntegerField(default=0)
+    members = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, blank=True, related_name="quota_groups"
+    )
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return "<%s: name=%s, amount=%s>" % (
+            self.__class__.__name__,
+            self.name,
+            self.amount,
+        )
+
+
+class QuotaGroupShard(models.Model):
+    """
+    One of the `QUOTA_GROUP_SHARDS` counters of a group's resources, which sum to the
+    number of resources of its members.
+
+    The group's amount is split over its shards as their `capacity`. A resource is
+    counted on a shard below its capacity, so that the group is at its quota once every
+    shard is full. Counts only exceed capacities once the group is over its quota.
+    """
+
+    group = models.ForeignKey(
+        QuotaGroup, on_delete=models.CASCADE, related_name="shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+    capacity = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["group", "shard"], name="resources_quota_group_shard"
+            )
+        ]
+
+
+class QuotaUtilization(ResourceCount):
+    """
+    Resource counts of the users with a quota, with the share of the quota used, for
+    the admin report.
+    """
+
+    class Meta:
+        proxy = True
+        verbose_name = "quota utilization"
+        verbose_name_plural = "quota utilization"
+
+
+class ResourceTombstone(models.Model):
+    """
+    Records the deletion of a resource, for delta syncs to remove it.
+    """
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    resource_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["owner", "version"], name="resources_tombstone_version"
+            )
+        ]
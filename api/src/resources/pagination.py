@@ -0,0 +1,20 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+from core.paginators import EstimatedCountPaginator
+
+
+class ResourcePagination(LimitOffsetPagination):
+    """
+    Pagination is opt-in, responses are only paginated when `?limit=` is given.
+    """
+
+    max_limit = 100
+
+
+class QuotaUtilizationPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+    def get_count(self, queryset):
+        # estimated like admin changelists, rather than COUNT(*) over every quota
+        return EstimatedCountPaginator(queryset, self.default_limit).count
@@ -1,10 +1,122 @@
 from rest_framework import serializers
 
-from .models import Resource
+from users.serializers import UserSerializer
+
+from .models import QuotaUtilization, Resource
+from .services import MAX_QUOTA_AMOUNT
 
 
 class ResourceSerializer(serializers.ModelSerializer):
+    """
+    Accepts `fields`, to only include the given fields, and `expand`, to replace the
+    given related fields by their nested representation in `expandable_fields`.
+    """
+
+    expandable_fields = {"owner": UserSerializer}
+
     class Meta:
         model = Resource
-        fields = ["id", "title", "owner"]
-        read_only_fields = ["owner"]
+        fields = ["id", "title", "owner", "created_at"]
+        read_only_fields = ["owner", "created_at"]
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name in expand:
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+
+
+class ResourceFilterSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of resources.filters.ResourceFieldFilter
+    """
+
+    title_prefix = serializers.CharField(max_length=255, required=False)
+    id_min = serializers.IntegerField(required=False)
+    id_max = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+
+
+class ResourceChangesSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of ResourceViewSet.changes. `since` is the
+    `version` returned by the previous sync, 0 for a full sync.
+    """
+
+    MAX_LIMIT = 1000
+
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_LIMIT, default=MAX_LIMIT
+    )
+
+
+class BulkQuotaSerializer(serializers.Serializer):
+    """
+    Selects users by id and/or by the same search the admin changelist uses, and the
+    operation to apply to their quotas.
+    """
+
+    OPERATION_SET = "set"
+    OPERATION_INCREMENT = "increment"
+    OPERATION_CLEAR = "clear"
+
+    operation = serializers.ChoiceField(
+        choices=[OPERATION_SET, OPERATION_INCREMENT, OPERATION_CLEAR]
+    )
+    amount = serializers.IntegerField(
+        min_value=-MAX_QUOTA_AMOUNT, max_value=MAX_QUOTA_AMOUNT, required=False
+    )
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, required=False
+    )
+    search = serializers.CharField(max_length=254, required=False)
+
+    def validate(self, data):
+        if "user_ids" not in data and "search" not in data:
+            raise serializers.ValidationError(
+                "Select users with `user_ids` and/or `search`."
+            )
+
+        operation, amount = data["operation"], data.get("amount")
+
+        if operation != self.OPERATION_CLEAR and amount is None:
+            raise serializers.ValidationError(
+                {"amount": "This field is required for %s." % operation}
+            )
+        if operation == self.OPERATION_SET and amount < 0:
+            raise serializers.ValidationError(
+                {"amount": "Ensure this value is greater than or equal to 0."}
+            )
+
+        return data
+
+
+class QuotaUtilizationSerializer(serializers.ModelSerializer):
+    """
+    A quota listed by services.get_quota_utilization(). `utilization` is the share of
+    the quota used, null for a quota of 0.
+    """
+
+    user = serializers.IntegerField(source="owner_id", read_only=True)
+    email = serializers.EmailField(source="owner.email", read_only=True)
+    resource_count = serializers.IntegerField(source="count", read_only=True)
+
+    class Meta:
+        model = QuotaUtilization
+        fields = ["user", "email", "amount", "resource_count", "utilization"]
+        read_only_fields = fields
+
+
+class QuotaUtilizationParamsSerializer(serializers.Serializer):
+    """
+    Validates the query parameters of QuotaUtilizationView. `min_utilization` e.g. 0.9
+    only lists the quotas used at 90% or more.
+    """
+
+    min_utilization = serializers.FloatField(min_value=0, required=False)
@@ -0,0 +1,459 @@
+import time
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .cache import invalidate_quota
+from .models import (
+    Quota,
+    QuotaGroup,
+    QuotaGroupShard,
+    QuotaUtilization,
+    ResourceCount,
+    ResourceTombstone,
+    ResourceVersion,
+)
+
+# upper bound of Quota.amount (PositiveSmallIntegerField)
+MAX_QUOTA_AMOUNT = 32767
+
+# wait before trying again to count on a group's shards, all locked by other creations
+SHARD_RETRY_SECONDS = 0.001
+# time spent trying again, before waiting for the locks of the shards one at a time
+SHARD_RETRY_TIMEOUT_SECONDS = 0.5
+
+
+class BulkQuotaService:
+    """
+    Changes the quota of every user in a queryset with a single set-based statement,
+    instead of loading and saving each user's Quota row.
+
+    `users` is never evaluated, it is embedded in each statement as a subquery. It can
+    therefore be an arbitrarily large filtered queryset e.g. an admin changelist
+    selection with "select all" applied.
+
+    The statements bypass the Quota signals, so every operation invalidates the cached
+    quotas of all users, and copies the changed amounts to ResourceCount itself.
+    """
+
+    def __init__(self, users):
+        self.users = users.order_by().values("pk")
+
+    def set(self, amount):
+        """
+        Sets the quota of the users to `amount`, creating quotas for users without one.
+        Returns the number of quotas created or updated.
+        """
+        users_sql, users_params = self.users.query.sql_with_params()
+        table = Quota._meta.db_table
+
+        return self._execute(
+            f'INSERT INTO "{table}" ("user_id", "amount") '
+            f"SELECT selected_users.id, %s FROM ({users_sql}) AS selected_users "
+            f'ON CONFLICT ("user_id") DO UPDATE SET "amount" = EXCLUDED."amount" '
+            'RETURNING "user_id", "amount"',
+            (amount, *users_params),
+        )
+
+    def increment(self, amount):
+        """
+        Adds `amount` (which may be negative) to the existing quotas of the users,
+        clamped to the range of Quota.amount. Users without a quota are unlimited and
+        stay that way. Returns the number of quotas updated.
+        """
+        users_sql, users_params = self.users.query.sql_with_params()
+        table = Quota._meta.db_table
+
+        return self._execute(
+            f'UPDATE "{table}" SET "amount" = LEAST(GREATEST("amount" + %s, 0), %s) '
+            f'WHERE "user_id" IN ({users_sql}) RETURNING "user_id", "amount"',
+            (amount, MAX_QUOTA_AMOUNT, *users_params),
+        )
+
+    def clear(self):
+        """
+        Removes the quotas of the users, which makes them unlimited.
+        Returns the number of quotas removed.
+        """
+        # a queryset delete() would load every quota to send the Quota signals
+        users_sql, users_params = self.users.query.sql_with_params()
+        table = Quota._meta.db_table
+
+        return self._execute(
+            f'DELETE FROM "{table}" WHERE "user_id" IN ({users_sql}) '
+            'RETURNING "user_id", NULL::smallint AS "amount"',
+            users_params,
+        )
+
+    def _execute(self, sql, params):
+        """
+        Executes `sql`, changing quotas and returning their user id and new amount, in
+        the same statement as copying the amounts to ResourceCount. Returns the number
+        of quotas changed.
+        """
+        sql = (
+            f"WITH changed AS ({sql}), "
+            f"copied AS ({copy_quota_amounts_sql('SELECT * FROM changed')}) "
+            "SELECT COUNT(*) FROM changed"
+        )
+
+        with connections[router.db_for_write(Quota)].cursor() as cursor:
+            cursor.execute(sql, params)
+            count = cursor.fetchone()[0]
+
+        invalidate_quota()
+        return count
+
+
+def copy_quota_amounts_sql(quotas_sql):
+    """
+    Returns an upsert copying the quota amounts selected by `quotas_sql`, as `user_id`
+    and `amount` (null without a quota), to ResourceCount, and updating utilizations.
+    Users with a quota but no resources yet get a count of 0.
+    """
+    table = ResourceCount._meta.db_table
+
+    return (
+        f'INSERT INTO "{table}" ("owner_id", "count", "amount", "utilization") '
+        f'SELECT "user_id", 0, "amount", 0 / NULLIF("amount", 0)::float '
+        f"FROM ({quotas_sql}) AS quotas "
+        f'ON CONFLICT ("owner_id") DO UPDATE SET "amount" = EXCLUDED."amount", '
+        f'"utilization" = "{table}"."count"::float / NULLIF(EXCLUDED."amount", 0)'
+    )
+
+
+def update_quota_utilization(user_id, using):
+    """
+    Copies the user's quota amount to their ResourceCount, see ResourceCount.
+    To be called whenever the user's quota is saved or deleted.
+    """
+    table = Quota._meta.db_table
+
+    # reads the committed amount, rather than that of the instance saved, which may
+    # have been overwritten by a concurrent save since
+    sql = copy_quota_amounts_sql(
+        f'SELECT %s AS "user_id", '
+        f'(SELECT "amount" FROM "{table}" WHERE "user_id" = %s) AS "amount"'
+    )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [user_id, user_id])
+
+
+def copy_quota_amounts(user_ids, using):
+    """
+    Copies the quota amounts of the users to their ResourceCount, see ResourceCount.
+    To be called by code creating quotas without their signals e.g. with bulk_create.
+    """
+    table = Quota._meta.db_table
+
+    sql = copy_quota_amounts_sql(
+        f'SELECT "user_id", "amount" FROM "{table}" WHERE "user_id" = ANY(%s)'
+    )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [list(user_ids)])
+
+
+def bump_resource_version(owner_id, using):
+    """
+    Increments and returns the version of the owner's resources. The owner's version
+    stays locked until the current transaction commits.
+    """
+    table = ResourceVersion._meta.db_table
+
+    sql = (
+        f'INSERT INTO "{table}" ("owner_id", "version") VALUES (%s, 1) '
+        f'ON CONFLICT ("owner_id") DO UPDATE SET "version" = "{table}"."version" + 1 '
+        'RETURNING "version"'
+    )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [owner_id])
+        return cursor.fetchone()[0]
+
+
+def get_resource_version(owner_id, using):
+    """
+    Returns the version of the owner's last committed resource change, 0 if none.
+    """
+    return (
+        ResourceVersion.objects.using(using)
+        .filter(owner_id=owner_id)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def add_resource_count(owner_id, delta, using):
+    """
+    Adds `delta` (which may be negative) to the count of the owner's resources.
+    """
+    table = ResourceCount._meta.db_table
+
+    # the utilization is updated with the count, see ResourceCount
+    sql = (
+        f'INSERT INTO "{table}" ("owner_id", "count") VALUES (%s, %s) '
+        f'ON CONFLICT ("owner_id") DO UPDATE SET "count" = "{table}"."count" + %s, '
+        f'"utilization" = ("{table}"."count" + %s)::float '
+        f'/ NULLIF("{table}"."amount", 0)'
+    )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [owner_id, delta, delta, delta])
+
+    add_group_resource_count(owner_id, delta, using)
+
+
+def add_group_resource_count(owner_id, delta, using):
+    """
+    Adds `delta` to the count of the resources of each group of the owner.
+
+    A resource created is counted on a random shard of the group below its capacity,
+    skipping shards locked by concurrent creations. Once every shard is full, it is
+    counted on any shard, which puts the group over its quota. A resource deleted is
+    uncounted from a random shard, preferably one over its capacity. Other deltas e.g.
+    of a batch of deletions recount the group.
+    """
+    members = QuotaGroup.members.through._meta.db_table
+    group_column = QuotaGroup.members.field.m2m_column_name()
+    user_column = QuotaGroup.members.field.m2m_reverse_name()
+
+    with connections[using].cursor() as cursor:
+        # locked in a consistent order, so that creations by members of several of the
+        # same groups cannot deadlock
+        cursor.execute(
+            f'SELECT "{group_column}" FROM "{members}" WHERE "{user_column}" = %s '
+            f'ORDER BY "{group_column}"',
+            [owner_id],
+        )
+        group_ids = [group_id for group_id, in cursor.fetchall()]
+
+        for group_id in group_ids:
+            if delta == 1:
+                if not _add_to_shard(cursor, group_id, 1, '"count" < "capacity"'):
+                    _add_to_shard(cursor, group_id, 1, "TRUE")
+            elif delta == -1:
+                _add_to_shard(
+                    cursor,
+                    group_id,
+                    -1,
+                    '"count" > 0',
+                    order='"count" > "capacity" DESC, random()',
+                )
+            else:
+                recount_quota_group(group_id, using)
+
+
+def _add_to_shard(cursor, group_id, delta, condition, order="random()"):
+    """
+    Adds `delta` to a shard of the group matching `condition`, skipping the shards
+    locked by other transactions. Returns False if no shard matches.
+
+    While every matching shard is locked, tries again shortly rather than waiting for a
+    lock: a `FOR UPDATE` which waits may keep locks on the shards it rechecks and skips,
+    which would deadlock concurrent creations. Shards still locked after
+    `SHARD_RETRY_TIMEOUT_SECONDS`, e.g. by long transactions, are waited for one at a
+    time, locking a single shard by its id.
+    """
+    table = QuotaGroupShard._meta.db_table
+    where = f'"group_id" = %s AND {condition}'
+    deadline = time.monotonic() + SHARD_RETRY_TIMEOUT_SECONDS
+
+    while time.monotonic() < deadline:
+        cursor.execute(
+            f'UPDATE "{table}" SET "count" = "count" + %s WHERE "id" = ('
+            f'SELECT "id" FROM "{table}" WHERE {where} '
+            f"ORDER BY {order} LIMIT 1 FOR UPDATE SKIP LOCKED)",
+            [delta, group_id],
+        )
+        if cursor.rowcount:
+            return True
+
+        # the committed shards, a locked one may match again once its creation rolls back
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM "{table}" WHERE {where})', [group_id]
+        )
+        if not cursor.fetchone()[0]:
+            return False
+
+        time.sleep(SHARD_RETRY_SECONDS)
+
+    cursor.execute(
+        f'SELECT "id" FROM "{table}" WHERE {where} ORDER BY {order}', [group_id]
+    )
+    for (shard_id,) in cursor.fetchall():
+        # the condition is rechecked once the shard's lock is released
+        cursor.execute(
+            f'UPDATE "{table}" SET "count" = "count" + %s WHERE "id" = %s AND {condition}',
+            [delta, shard_id],
+        )
+        if cursor.rowcount:
+            return True
+
+    return False
+
+
+def get_exceeded_quota_groups(owner_id, using):
+    """
+    Returns the ids of the groups of the owner with more resources than their amount,
+    as seen by the current transaction.
+
+    A creation which counted its resource within a shard's capacity sees at most the
+    group's amount. One which found every shard full sees its own resource on top, so
+    that rejecting it keeps the group within its amount.
+    """
+    groups = QuotaGroup._meta.db_table
+    shards = QuotaGroupShard._meta.db_table
+    members = QuotaGroup.members.through._meta.db_table
+    group_column = QuotaGroup.members.field.m2m_column_name()
+    user_column = QuotaGroup.members.field.m2m_reverse_name()
+
+    # raw, as it runs on every creation like the counting itself
+    sql = (
+        f'SELECT "{groups}"."id" FROM "{groups}" INNER JOIN "{members}" '
+        f'ON "{members}"."{group_column}" = "{groups}"."id" '
+        f'WHERE "{members}"."{user_column}" = %s AND "{groups}"."amount" < ('
+        f'SELECT COALESCE(SUM("count"), 0) FROM "{shards}" '
+        f'WHERE "{shards}"."group_id" = "{groups}"."id")'
+    )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [owner_id])
+        return [group_id for group_id, in cursor.fetchall()]
+
+
+def get_shard_capacities(amount, shards):
+    """
+    Splits `amount` over `shards` as evenly as possible.
+    """
+    return [amount // shards + (i < amount % shards) for i in range(shards)]
+
+
+def recount_quota_group(group_id, using):
+    """
+    Counts the resources of the group's members again, and spreads the count over
+    `QUOTA_GROUP_SHARDS` shards, filling each up to its capacity before the next.
+
+    Run when the amount, the members or the number of shards of the group change. The
+    group's shards stay locked until the current transaction commits.
+    """
+    with transaction.atomic(using=using):
+        group = QuotaGroup.objects.using(using).select_for_update().get(pk=group_id)
+        shards = {
+            shard.shard: shard
+            for shard in QuotaGroupShard.objects.using(using)
+            .select_for_update()
+            .filter(group=group)
+            .order_by("shard")
+        }
+        remaining = (
+            ResourceCount.objects.using(using)
+            .filter(owner__quota_groups=group)
+            .aggregate(count=Coalesce(Sum("count"), 0))["count"]
+        )
+
+        capacities = get_shard_capacities(group.amount, settings.QUOTA_GROUP_SHARDS)
+        counted = []
+        for i, capacity in enumerate(capacities):
+            # what exceeds the group's amount goes to the last shard
+            count = remaining if i == len(capacities) - 1 else min(capacity, remaining)
+            remaining -= count
+            shard = shards.pop(i, None) or QuotaGroupShard(group=group, shard=i)
+            shard.count = count
+            shard.capacity = capacity
+            counted.append(shard)
+
+        # updated in place, as creations may be waiting for their locks
+        QuotaGroupShard.objects.using(using).bulk_update(
+            [shard for shard in counted if shard.pk], ["count", "capacity"]
+        )
+        QuotaGroupShard.objects.using(using).bulk_create(
+            [shard for shard in counted if not shard.pk]
+        )
+        QuotaGroupShard.objects.using(using).filter(
+            pk__in=[shard.pk for shard in shards.values()]
+        ).delete()
+
+
+def get_quota_utilization(min_utilization=None):
+    """
+    Returns the resource counts of the users with a quota, with their `utilization`,
+    the share of the quota used, from most to least used. The utilization of a quota
+    of 0 is null, and ranks first since such users are always at their quota.
+
+    Served by the utilization index of ResourceCount, without counting resources or
+    computing utilizations.
+    """
+    quotas = QuotaUtilization.objects.filter(amount__isnull=False).select_related(
+        "owner"
+    )
+
+    if min_utilization is not None:
+        quotas = quotas.filter(
+            Q(utilization__gte=min_utilization) | Q(utilization__isnull=True)
+        )
+
+    return quotas.order_by(F("utilization").desc(nulls_first=True), "owner_id")
+
+
+class ResourceChangesService:
+    """
+    Lists the changes to an owner's resources after a version, at most `limit` of
+    them, served by the (owner, version) indexes of resources and tombstones.
+
+    `resources` is the owner's resources queryset e.g. limited to the requested fields.
+    """
+
+    def __init__(self, owner_id, resources, using, limit):
+        self.owner_id = owner_id
+        self.resources = resources
+        self.using = using
+        self.limit = limit
+
+    def get_changes(self, since):
+        """
+        Returns the resources changed and the ids of resources deleted after `since`,
+        and the version to sync from next. There may be more changes after that
+        version if `has_more`.
+        """
+        # read the version first, changes up to it are committed (see ResourceVersion)
+        # a lagging replica may be behind `since`, which it returns unchanged
+        version = max(get_resource_version(self.owner_id, self.using), since)
+
+        changed = list(
+            self.resources.using(self.using)
+            .filter(version__gt=since, version__lte=version)
+            .annotate(changed_version=F("version"))
+            .order_by("version")[: self.limit + 1]
+        )
+        deleted = list(
+            ResourceTombstone.objects.using(self.using)
+            .filter(owner_id=self.owner_id, version__gt=since, version__lte=version)
+            .order_by("version")
+            .values_list("version", "resource_id")[: self.limit + 1]
+        )
+
+        versions = sorted(
+            [resource.changed_version for resource in changed]
+            + [version for version, _ in deleted]
+        )
+        has_more = len(versions) > self.limit
+        if has_more:
+            version = versions[self.limit - 1]
+
+        return {
+            "changed": [
+                resource for resource in changed if resource.changed_version <= version
+            ],
+            "deleted": [
+                resource_id
+                for deleted_version, resource_id in deleted
+                if deleted_version <= version
+            ],
+            "version": version,
+            "has_more": has_more,
+        }
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .cache import invalidate_quota
+from .events import notify_resource_event
+from .models import (
+    Quota,
+    QuotaGroup,
+    Resource,
+    ResourceCount,
+    ResourceTombstone,
+    ResourceVersion,
+)
+from .services import (
+    add_resource_count,
+    bump_resource_version,
+    recount_quota_group,
+    update_quota_utilization,
+)
+
+
+@receiver([post_save, post_delete], sender=Quota)
+def invalidate_cached_quota(sender, instance, **kwargs):
+    invalidate_quota(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Quota)
+def update_saved_quota_utilization(sender, instance, using, **kwargs):
+    update_quota_utilization(instance.user_id, using)
+
+
+@receiver(pre_save, sender=Resource)
+def version_resource(sender, instance, using, **kwargs):
+    instance.version = bump_resource_version(instance.owner_id, using)
+
+
+@receiver(post_delete, sender=Resource)
+def tombstone_resource(sender, instance, using, **kwargs):
+    # runs in the transaction of the deletion, see django.db.models.deletion.Collector
+    ResourceTombstone.objects.using(using).create(
+        owner_id=instance.owner_id,
+        resource_id=instance.id,
+        version=bump_resource_version(instance.owner_id, using),
+    )
+
+
+@receiver(post_save, sender=Resource)
+def count_resource_created(sender, instance, created, using, **kwargs):
+    if created:
+        add_resource_count(instance.owner_id, 1, using)
+
+
+@receiver(post_delete, sender=Resource)
+def count_resource_deleted(sender, instance, using, **kwargs):
+    add_resource_count(instance.owner_id, -1, using)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def delete_resource_versions(sender, instance, using, **kwargs):
+    # not cascaded, see ResourceVersion and ResourceCount
+    ResourceVersion.objects.using(using).filter(owner_id=instance.id).delete()
+    ResourceTombstone.objects.using(using).filter(owner_id=instance.id).delete()
+    ResourceCount.objects.using(using).filter(owner_id=instance.id).delete()
+
+
+@receiver(post_save, sender=QuotaGroup)
+def recount_saved_quota_group(sender, instance, using, **kwargs):
+    # creates the group's shards, or splits a changed amount over them
+    recount_quota_group(instance.id, using)
+
+
+@receiver(m2m_changed, sender=QuotaGroup.members.through)
+def recount_quota_group_members(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    if reverse:  # user.quota_groups changed
+        if action == "pre_clear":
+            instance._cleared_quota_group_ids = list(
+                instance.quota_groups.values_list("id", flat=True)
+            )
+            return
+        if action == "post_clear":
+            pk_set = instance._cleared_quota_group_ids
+        group_ids = pk_set
+    else:
+        group_ids = [instance.id]
+
+    if action in ("post_add", "post_remove", "post_clear"):
+        for group_id in sorted(group_ids):
+            recount_quota_group(group_id, using)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def get_deleted_user_quota_groups(sender, instance, using, **kwargs):
+    # the user's memberships may be deleted before their resources are uncounted
+    instance._deleted_quota_group_ids = list(
+        instance.quota_groups.using(using).values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def recount_deleted_user_quota_groups(sender, instance, using, **kwargs):
+    for group_id in sorted(getattr(instance, "_deleted_quota_group_ids", [])):
+        recount_quota_group(group_id, using)
+
+
+@receiver(post_save, sender=Resource)
+def notify_resource_saved(sender, instance, created, **kwargs):
+    notify_resource_event("created" if created else "updated", instance)
+
+
+@receiver(post_delete, sender=Resource)
+def notify_resource_deleted(sender, instance, **kwargs):
+    notify_resource_event("deleted", instance)
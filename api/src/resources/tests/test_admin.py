@@ -0,0 +1,83 @@
+from django.urls import reverse
+
+import pytest
+from conftest import UserFactory, count_queries
+from resources.models import Quota
+
+from .conftest import ResourceFactory
+
+
+@pytest.mark.django_db
+class TestResourceAdmin:
+    def test_changelist_queries_should_not_grow_with_row_count(self, admin_client):
+        # given
+        url = reverse("admin:resources_resource_changelist")
+        ResourceFactory.create_batch(2)
+        query_count = count_queries(admin_client, url)
+
+        # when
+        ResourceFactory.create_batch(20)
+
+        # then
+        assert count_queries(admin_client, url) == query_count
+
+    def test_change_form_should_not_render_every_user(self, admin_client):
+        # given
+        resource = ResourceFactory.create()
+        other_users = UserFactory.create_batch(10)
+        url = reverse("admin:resources_resource_change", args=[resource.id])
+        admin_client.get(url)  # warm up per-process caches e.g. content types
+        query_count = count_queries(admin_client, url)
+
+        # when
+        UserFactory.create_batch(20)
+        response = admin_client.get(url)
+
+        # then
+        content = response.content.decode()
+        assert "admin-autocomplete" in content
+        assert resource.owner.email in content
+        assert all(user.email not in content for user in other_users)
+        assert count_queries(admin_client, url) == query_count
+
+    def test_owner_autocomplete_should_search_users(self, admin_client):
+        # given
+        user = UserFactory.create(email="needle@test-domain.com")
+        UserFactory.create_batch(5)
+
+        # when
+        response = admin_client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "needle",
+                "app_label": "resources",
+                "model_name": "resource",
+                "field_name": "owner",
+            },
+        )
+
+        # then
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"id": str(user.id), "text": str(user)}]
+
+
+@pytest.mark.django_db
+class TestQuotaUtilizationAdmin:
+    def test_changelist_should_filter_quotas_near_or_over(self, admin_client):
+        # given
+        full, half = UserFactory.create_batch(2)
+        ResourceFactory.create_batch(4, owner=full)
+        ResourceFactory.create_batch(2, owner=half)
+        Quota.objects.create(amount=4, user=full)
+        Quota.objects.create(amount=4, user=half)
+        url = reverse("admin:resources_quotautilization_changelist")
+
+        # when
+        unfiltered = admin_client.get(url).content.decode()
+        filtered = admin_client.get(url, {"utilization": "0.9"}).content.decode()
+
+        # then
+        for percent, in_filtered in [("100%", True), ("50%", False)]:
+            cell = '<td class="field-utilization_percent">%s</td>' % percent
+            assert cell in unfiltered
+            assert (cell in filtered) == in_filtered
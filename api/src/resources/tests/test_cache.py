@@ -0,0 +1,158 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from conftest import UserFactory
+from resources.cache import (
+    QuotaCache,
+    _on_quota_invalidation,
+    get_quota_amount,
+    quota_cache,
+)
+from resources.models import Quota
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    amounts = {1: 5, 2: None, 3: 7}
+    loaded = []
+
+    def loader(user_id):
+        loaded.append(user_id)
+        return amounts[user_id]
+
+    cache = QuotaCache(loader, maxsize=2, ttl=60, clock=clock)
+    return cache, loaded, amounts
+
+
+class TestQuotaCache:
+    def test_get_should_load_once_within_ttl(self, cache, clock):
+        # given
+        cache, loaded, _ = cache
+
+        # when
+        amounts = [cache.get(1), cache.get(2), cache.get(1), cache.get(2)]
+        clock.now = 61
+        amounts.append(cache.get(1))
+
+        # then
+        assert amounts == [5, None, 5, None, 5]  # None = unlimited is cached as well
+        assert loaded == [1, 2, 1]
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 3
+        assert cache.stats()["hit_rate"] == 0.4
+
+    def test_get_should_evict_least_recently_used(self, cache):
+        # given
+        cache, loaded, _ = cache
+
+        # when
+        for user_id in [1, 2, 1, 3, 1, 2]:
+            cache.get(user_id)
+
+        # then
+        assert loaded == [1, 2, 3, 2]
+        assert cache.stats()["evictions"] == 2
+        assert cache.stats()["size"] == 2
+
+    @pytest.mark.parametrize("user_id,reloaded", [(1, [1]), (None, [1, 2])])
+    def test_invalidate(self, cache, user_id, reloaded):
+        # given
+        cache, loaded, amounts = cache
+        cache.get(1)
+        cache.get(2)
+        amounts[1] = 9
+        loaded.clear()
+
+        # when
+        cache.invalidate(user_id)
+
+        # then
+        assert [cache.get(1), cache.get(2)] == [9, None]
+        assert loaded == reloaded
+
+    def test_get_should_not_cache_load_racing_invalidation(self, cache):
+        # given
+        cache, loaded, amounts = cache
+        loader = cache.loader
+
+        def racing_loader(user_id):
+            amount = loader(user_id)
+            amounts[user_id] = 9
+            cache.invalidate(user_id)  # committed while the outdated amount loaded
+            return amount
+
+        cache.loader = racing_loader
+
+        # when
+        first = cache.get(1)
+        cache.loader = loader
+
+        # then
+        assert [first, cache.get(1)] == [5, 9]
+
+    def test_stats_should_have_no_hit_rate_before_lookups(self, cache):
+        # given
+        cache, _, _ = cache
+
+        # then
+        assert cache.stats()["hit_rate"] is None
+
+
+@pytest.mark.django_db
+class TestQuotaInvalidation:
+    def test_quota_save_and_delete_should_invalidate_and_broadcast(self):
+        # given
+        user = UserFactory.create()
+        assert get_quota_amount(user.id) is None
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            quota = Quota.objects.create(amount=3, user=user)
+
+        # then
+        assert get_quota_amount(user.id) == 3
+        assert "SELECT pg_notify('quota_invalidation', '%s')" % user.id in [
+            query["sql"] for query in context.captured_queries
+        ]
+
+        # when
+        quota.amount = 4
+        quota.save()
+
+        # then
+        assert get_quota_amount(user.id) == 4
+
+        # when
+        quota.delete()
+
+        # then
+        assert get_quota_amount(user.id) is None
+
+    @pytest.mark.parametrize("payload", [None, "*", "user"])
+    def test_notification_should_invalidate_cache(self, payload):
+        # given
+        user = UserFactory.create()
+        assert get_quota_amount(user.id) is None
+        # changed by another process, whose signals do not reach this one
+        Quota.objects.bulk_create([Quota(amount=3, user=user)])
+
+        # when
+        _on_quota_invalidation(str(user.id) if payload == "user" else payload)
+
+        # then
+        assert get_quota_amount(user.id) == 3
+        assert quota_cache.stats()["invalidations"] >= 1
@@ -0,0 +1,171 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from core.broadcast import Broadcaster
+from resources.events import (
+    RESOURCE_EVENTS_CHANNEL,
+    RESOURCE_EVENTS_PATH,
+    format_event,
+    resource_events,
+)
+from resources.models import Resource
+
+from .conftest import ResourceFactory
+
+
+def events_scope(access=None, scheme="https"):
+    headers = [(b"host", b"test-domain.com")]
+    if access is not None:
+        headers.append((b"cookie", b"access=%s" % str(access).encode()))
+
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": RESOURCE_EVENTS_PATH,
+        "query_string": b"",
+        "scheme": scheme,
+        "headers": headers,
+    }
+
+
+def parse_event(body):
+    event, data = body.decode().strip().split("\n")
+    return event[len("event: ") :], json.loads(data[len("data: ") :])
+
+
+@pytest.mark.django_db
+class TestResourceEventNotifications:
+    def test_resource_writes_should_notify_owner(self, given_user):
+        # given
+        with CaptureQueriesContext(connection) as context:
+            resource = ResourceFactory.create(owner=given_user)
+            resource.title = "Gold"
+            resource.save()
+            resource_id = resource.id
+            resource.delete()
+
+        # when
+        notifications = [
+            json.loads(query["sql"].split("', '", 1)[1][:-2])
+            for query in context.captured_queries
+            if query["sql"].startswith(
+                "SELECT pg_notify('%s'" % RESOURCE_EVENTS_CHANNEL
+            )
+        ]
+
+        # then
+        assert [n["event"] for n in notifications] == ["created", "updated", "deleted"]
+        assert {n["owner"] for n in notifications} == {given_user.id}
+        assert notifications[1]["data"]["title"] == "Gold"
+        assert notifications[2]["data"] == {"id": resource_id}
+
+    def test_format_event(self):
+        # then
+        assert format_event({"event": "deleted", "data": {"id": 1}}) == (
+            b'event: deleted\ndata: {"id":1}\n\n'
+        )
+        assert format_event(None) == b"event: reset\ndata: {}\n\n"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResourceEvents:
+    @pytest.fixture(autouse=True)
+    def broadcaster(self, mocker):
+        # a listener is bound to the event loop of its first subscriber
+        broadcaster = Broadcaster(RESOURCE_EVENTS_CHANNEL, key="owner")
+        mocker.patch("resources.events.broadcaster", broadcaster)
+        yield broadcaster
+        broadcaster.stop()
+
+    def test_should_stream_events_of_user_resources(
+        self, given_user, access, broadcaster
+    ):
+        async def run():
+            # given
+            communicator = ApplicationCommunicator(
+                resource_events, events_scope(access)
+            )
+            await communicator.send_input({"type": "http.request"})
+
+            start = await communicator.receive_output(timeout=5)
+            await communicator.receive_output(timeout=5)  # empty first body
+            reset = await communicator.receive_output(timeout=5)
+
+            # when
+            await sync_to_async(ResourceFactory.create)()  # of another user
+            resource = await sync_to_async(ResourceFactory.create)(owner=given_user)
+            created = await communicator.receive_output(timeout=5)
+
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(timeout=5)
+
+            return start, reset, created, resource
+
+        # when
+        start, reset, created, resource = async_to_sync(run)()
+
+        # then
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream") in start["headers"]
+        assert parse_event(reset["body"]) == ("reset", {})
+        assert parse_event(created["body"]) == (
+            "created",
+            {
+                "id": resource.id,
+                "title": resource.title,
+                "owner": given_user.id,
+                "created_at": resource.created_at.isoformat().replace("+00:00", "Z"),
+            },
+        )
+        assert broadcaster.subscription_count == 0
+
+    def test_should_send_heartbeat_when_idle(self, settings, access):
+        # given
+        settings.RESOURCE_EVENTS_HEARTBEAT_SECONDS = 0.1
+
+        async def run():
+            communicator = ApplicationCommunicator(
+                resource_events, events_scope(access)
+            )
+            await communicator.send_input({"type": "http.request"})
+            bodies = [
+                (await communicator.receive_output(timeout=5)).get("body")
+                for _ in range(5)
+            ]
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(timeout=5)
+            return bodies
+
+        # when
+        bodies = async_to_sync(run)()
+
+        # then
+        assert b":\n\n" in bodies
+
+    @pytest.mark.parametrize(
+        "has_access,scheme,status", [(False, "https", 401), (True, "http", 403)]
+    )
+    def test_should_reject_unauthenticated_requests(
+        self, access, has_access, scheme, status
+    ):
+        async def run():
+            communicator = ApplicationCommunicator(
+                resource_events, events_scope(access if has_access else None, scheme)
+            )
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(timeout=5)
+            await communicator.wait(timeout=5)
+            return start
+
+        # when
+        start = async_to_sync(run)()
+
+        # then
+        assert start["status"] == status
+        assert not Resource.objects.exists()
@@ -0,0 +1,238 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+import pytest
+from resources.filters import (
+    IndexedOrderingFilter,
+    ResourceFieldFilter,
+    TitleSearchFilter,
+)
+from resources.models import Resource
+
+from .conftest import ResourceFactory
+
+
+def search_request(search):
+    return Request(APIRequestFactory().get("/", {"search": search}))
+
+
+def query_request(**params):
+    return Request(APIRequestFactory().get("/", params))
+
+
+def explain_without_seqscan(queryset):
+    with connection.cursor() as cursor:
+        # tables in tests are tiny, force the planner to consider the indexes
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+@pytest.mark.django_db
+class TestResourceFieldFilter:
+    @pytest.fixture
+    def resources(self, given_user):
+        resources = [
+            ResourceFactory.create(title=title, owner=given_user)
+            for title in ["Bitcoin", "bitcoin", "Bit", "Gold"]
+        ]
+        Resource.objects.filter(id=resources[0].id).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        return resources
+
+    @pytest.mark.parametrize(
+        "params,expected",
+        [
+            ({"title_prefix": "Bit"}, [0, 2]),
+            ({"created_after": "yesterday"}, [1, 2, 3]),
+            ({"id_min": "first+1", "id_max": "first+2"}, [1, 2]),
+            ({"title_prefix": "Bit", "id_min": "first+1"}, [2]),
+            ({}, [0, 1, 2, 3]),
+        ],
+    )
+    def test_filter_queryset(self, given_user, resources, params, expected):
+        # given
+        first_id = resources[0].id
+        values = {
+            "yesterday": (timezone.now() - timedelta(days=1)).isoformat(),
+            "first+1": first_id + 1,
+            "first+2": first_id + 2,
+        }
+        params = {param: values.get(value, value) for param, value in params.items()}
+        queryset = Resource.objects.filter(owner=given_user).order_by("id")
+
+        # when
+        result = ResourceFieldFilter().filter_queryset(
+            query_request(**params), queryset, None
+        )
+
+        # then
+        assert list(result) == [resources[index] for index in expected]
+
+    @pytest.mark.parametrize(
+        "params", [{"id_min": "abc"}, {"created_after": "last week"}]
+    )
+    def test_filter_queryset_should_reject_invalid_params(self, params):
+        # when
+        with pytest.raises(ValidationError) as excinfo:
+            ResourceFieldFilter().filter_queryset(
+                query_request(**params), Resource.objects.all(), None
+            )
+
+        # then
+        assert list(params) == list(excinfo.value.detail)
+
+    def test_title_prefix_should_be_served_by_index(self, given_user):
+        # given
+        # enough rows for the planner to prefer the narrower (owner, title) index
+        ResourceFactory.create_batch(200, owner=given_user)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE resources_resource")
+        queryset = ResourceFieldFilter().filter_queryset(
+            query_request(title_prefix="Bit"),
+            Resource.objects.filter(owner=given_user),
+            None,
+        )
+
+        # when
+        plan = explain_without_seqscan(queryset)
+
+        # then
+        assert "resources_owner_title_prefix" in plan
+
+
+class TestIndexedOrderingFilter:
+    view = SimpleNamespace(orderings={"id": ["id"], "-created_at": ["-created_at"]})
+
+    @pytest.mark.django_db
+    def test_filter_queryset_should_order_by_accepted_ordering(self, given_user):
+        # given
+        resources = ResourceFactory.create_batch(3, owner=given_user)
+
+        # when
+        result = IndexedOrderingFilter().filter_queryset(
+            query_request(ordering="-created_at"), Resource.objects.all(), self.view
+        )
+
+        # then
+        assert list(result) == resources[::-1]
+
+    def test_filter_queryset_should_not_order_without_ordering(self):
+        # given
+        queryset = Resource.objects.all()
+
+        # when
+        result = IndexedOrderingFilter().filter_queryset(
+            query_request(), queryset, self.view
+        )
+
+        # then
+        assert result is queryset
+
+    def test_filter_queryset_should_order_by_default_ordering_given_no_ordering(self):
+        # given
+        view = SimpleNamespace(orderings=self.view.orderings, default_ordering="id")
+
+        # when
+        result = IndexedOrderingFilter().filter_queryset(
+            query_request(), Resource.objects.all(), view
+        )
+
+        # then
+        assert result.query.order_by == ("id",)
+
+    def test_filter_queryset_should_keep_existing_order_given_no_ordering(self):
+        # given
+        view = SimpleNamespace(orderings=self.view.orderings, default_ordering="id")
+        queryset = Resource.objects.order_by("-title")
+
+        # when
+        result = IndexedOrderingFilter().filter_queryset(
+            query_request(), queryset, view
+        )
+
+        # then
+        assert result is queryset
+
+    @pytest.mark.parametrize("ordering", ["title", "-id", "", "id,title"])
+    def test_filter_queryset_should_reject_other_orderings(self, ordering):
+        # when
+        with pytest.raises(ValidationError) as excinfo:
+            IndexedOrderingFilter().filter_queryset(
+                query_request(ordering=ordering), Resource.objects.all(), self.view
+            )
+
+        # then
+        assert "Use one of: id, -created_at." in str(excinfo.value)
+
+
+class TestTitleSearchFilter:
+    @pytest.mark.parametrize(
+        "search,terms",
+        [
+            ("sound money", ["sound", "money"]),
+            ("  sound   'money':* & !", ["sound", "money"]),
+            ("", []),
+            (" ".join(["word"] * 20), ["word"] * TitleSearchFilter.max_terms),
+        ],
+    )
+    def test_get_search_terms_should_keep_words_only(self, search, terms):
+        # when
+        result = TitleSearchFilter().get_search_terms(search_request(search))
+
+        # then
+        assert result == terms
+
+    @pytest.mark.django_db
+    def test_filter_queryset_should_prefix_match_all_terms_ranked(self, given_user):
+        # given
+        best = ResourceFactory.create(title="Sound money sound money", owner=given_user)
+        good = ResourceFactory.create(title="Bitcoin is sound money", owner=given_user)
+        ResourceFactory.create(title="Bitcoin is sound", owner=given_user)
+        ResourceFactory.create(title="Gold", owner=given_user)
+        queryset = Resource.objects.filter(owner=given_user)
+
+        # when
+        result = TitleSearchFilter().filter_queryset(
+            search_request("SOUND mon"), queryset, None
+        )
+
+        # then
+        assert list(result) == [best, good]
+
+    @pytest.mark.django_db
+    def test_filter_queryset_should_not_filter_without_terms(self, given_user):
+        # given
+        queryset = Resource.objects.filter(owner=given_user)
+
+        # when
+        result = TitleSearchFilter().filter_queryset(
+            search_request("!"), queryset, None
+        )
+
+        # then
+        assert result is queryset
+
+    @pytest.mark.django_db
+    def test_filter_queryset_should_be_served_by_owner_title_index(self, given_user):
+        # given
+        ResourceFactory.create_batch(200, title="Gold", owner=given_user)
+        ResourceFactory.create(title="Sound money", owner=given_user)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE resources_resource")
+
+        queryset = TitleSearchFilter().filter_queryset(
+            search_request("sound"), Resource.objects.filter(owner=given_user), None
+        )
+
+        # when
+        plan = explain_without_seqscan(queryset)
+
+        # then
+        assert "_owner_title_fts" in plan
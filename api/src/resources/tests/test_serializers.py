@@ -1,5 +1,7 @@
+from rest_framework.exceptions import ValidationError
+
 import pytest
-from resources.serializers import ResourceSerializer
+from resources.serializers import BulkQuotaSerializer, ResourceSerializer
 
 from .conftest import ResourceFactory
 
@@ -18,6 +20,28 @@ class TestResourceSerializer:
             "id": resource.id,
             "title": resource.title,
             "owner": resource.owner.id,
+            "created_at": resource.created_at.isoformat().replace("+00:00", "Z"),
+        }
+
+    @pytest.mark.django_db
+    def test_serialize_given_fields_and_expand(self):
+        # given
+        resource = ResourceFactory.create()
+
+        # when
+        serializer = ResourceSerializer(
+            resource, fields=["title", "owner"], expand=["owner"]
+        )
+
+        # then
+        assert serializer.data == {
+            "title": resource.title,
+            "owner": {
+                "id": resource.owner.id,
+                "email": resource.owner.email,
+                "first_name": resource.owner.first_name,
+                "last_name": resource.owner.last_name,
+            },
         }
 
     def test_deserialize(self):
@@ -29,3 +53,47 @@ class TestResourceSerializer:
 
         # then
         assert serializer.is_valid()
+
+
+class TestBulkQuotaSerializer:
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"operation": "set", "amount": 3, "user_ids": [1, 2]},
+            {"operation": "increment", "amount": -3, "search": "test-domain.com"},
+            {"operation": "clear", "user_ids": [1], "search": "test-domain.com"},
+        ],
+    )
+    def test_deserialize(self, data):
+        # when
+        serializer = BulkQuotaSerializer(data=data)
+
+        # then
+        assert serializer.is_valid(), serializer.errors
+
+    @pytest.mark.parametrize(
+        "data,error",
+        [
+            ({"operation": "clear"}, "Select users with `user_ids` and/or `search`."),
+            ({"operation": "set", "user_ids": [1]}, "This field is required for set."),
+            (
+                {"operation": "increment", "user_ids": [1]},
+                "This field is required for increment.",
+            ),
+            (
+                {"operation": "set", "amount": -1, "user_ids": [1]},
+                "greater than or equal to 0",
+            ),
+            ({"operation": "clear", "user_ids": []}, "This list may not be empty."),
+            ({"operation": "reset", "user_ids": [1]}, "is not a valid choice"),
+        ],
+    )
+    def test_deserialize_is_not_valid(self, data, error):
+        # when
+        serializer = BulkQuotaSerializer(data=data)
+
+        # then
+        with pytest.raises(ValidationError) as excinfo:
+            serializer.is_valid(raise_exception=True)
+
+        assert error in str(excinfo.value)
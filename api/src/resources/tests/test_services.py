@@ -0,0 +1,550 @@
+import importlib
+import threading
+import time
+
+from django.db import connection, connections, migrations, transaction
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from conftest import UserFactory
+from resources.models import (
+    Quota,
+    QuotaGroup,
+    QuotaGroupShard,
+    Resource,
+    ResourceCount,
+    ResourceTombstone,
+    ResourceVersion,
+)
+from resources import services
+from resources.services import (
+    MAX_QUOTA_AMOUNT,
+    BulkQuotaService,
+    ResourceChangesService,
+    get_exceeded_quota_groups,
+    get_quota_utilization,
+    get_shard_capacities,
+)
+from users.models import EmailUser
+
+from .conftest import ResourceFactory
+
+
+@pytest.fixture
+def users_with_and_without_quota():
+    with_quota = UserFactory.create_batch(3)
+    for user in with_quota:
+        Quota.objects.create(amount=5, user=user)
+    without_quota = UserFactory.create_batch(2)
+    return with_quota, without_quota
+
+
+def quota_amounts(users):
+    amounts = dict(Quota.objects.filter(user__in=users).values_list("user", "amount"))
+    return [amounts.get(user.id) for user in users]
+
+
+@pytest.mark.django_db
+class TestBulkQuotaService:
+    def test_set_should_upsert_quotas_in_one_query(self, users_with_and_without_quota):
+        # given
+        with_quota, without_quota = users_with_and_without_quota
+        other_user = UserFactory.create()
+        users = EmailUser.objects.exclude(id=other_user.id).order_by("email")
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            count = BulkQuotaService(users).set(9)
+
+        # then: one statement, then the broadcast invalidating cached quotas
+        assert len(context.captured_queries) == 2
+        assert "pg_notify" in context.captured_queries[1]["sql"]
+        assert count == 5
+        assert quota_amounts(with_quota + without_quota) == [9] * 5
+        assert not Quota.objects.filter(user=other_user).exists()
+
+    def test_increment_should_update_existing_quotas_in_one_query(
+        self, users_with_and_without_quota
+    ):
+        # given
+        with_quota, without_quota = users_with_and_without_quota
+        users = EmailUser.objects.all()
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            count = BulkQuotaService(users).increment(2)
+
+        # then: one statement, then the broadcast invalidating cached quotas
+        assert len(context.captured_queries) == 2
+        assert "pg_notify" in context.captured_queries[1]["sql"]
+        assert count == 3
+        assert quota_amounts(with_quota) == [7] * 3
+        assert quota_amounts(without_quota) == [None] * 2  # unlimited
+
+    @pytest.mark.parametrize(
+        "increment,expected", [(-10, 0), (MAX_QUOTA_AMOUNT, MAX_QUOTA_AMOUNT)]
+    )
+    def test_increment_should_clamp_amount(
+        self, users_with_and_without_quota, increment, expected
+    ):
+        # given
+        with_quota, _ = users_with_and_without_quota
+
+        # when
+        BulkQuotaService(EmailUser.objects.all()).increment(increment)
+
+        # then
+        assert quota_amounts(with_quota) == [expected] * 3
+
+    def test_clear_should_delete_quotas_in_one_query(
+        self, users_with_and_without_quota
+    ):
+        # given
+        with_quota, _ = users_with_and_without_quota
+        users = EmailUser.objects.filter(id__in=[user.id for user in with_quota[:2]])
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            count = BulkQuotaService(users).clear()
+
+        # then
+        assert len(context.captured_queries) == 2
+        assert count == 2
+        assert list(Quota.objects.values_list("user", flat=True)) == [with_quota[2].id]
+
+    @pytest.mark.parametrize(
+        "operation,args", [("set", [1]), ("increment", [1]), ("clear", [])]
+    )
+    def test_operations_should_invalidate_cached_quotas(
+        self, users_with_and_without_quota, mocker, operation, args
+    ):
+        # given
+        invalidate_quota = mocker.patch("resources.services.invalidate_quota")
+
+        # when
+        getattr(BulkQuotaService(EmailUser.objects.all()), operation)(*args)
+
+        # then
+        invalidate_quota.assert_called_once_with()
+
+
+@pytest.mark.django_db
+class TestResourceChangesService:
+    @pytest.fixture
+    def changes(self, given_user):
+        # versions 1 to 6 of the user, and changes of another user
+        resources = ResourceFactory.create_batch(4, owner=given_user)
+        resources[0].title = "Gold"
+        resources[0].save()  # 5
+        deleted_id = resources[1].id
+        resources[1].delete()  # 6
+        ResourceFactory.create_batch(2)
+        return resources, deleted_id
+
+    def service(self, user, limit=10):
+        return ResourceChangesService(
+            user.id, Resource.objects.filter(owner=user), "default", limit
+        )
+
+    def test_get_changes_should_return_changes_after_version(self, given_user, changes):
+        # given
+        changes, deleted_id = changes
+
+        # when
+        result = self.service(given_user).get_changes(since=2)
+
+        # then
+        assert result["changed"] == [changes[2], changes[3], changes[0]]
+        assert result["deleted"] == [deleted_id]
+        assert result["version"] == 6
+        assert not result["has_more"]
+
+    def test_get_changes_should_return_all_given_zero(self, given_user, changes):
+        # given
+        changes, deleted_id = changes
+
+        # when
+        result = self.service(given_user).get_changes(since=0)
+
+        # then
+        assert set(result["changed"]) == {changes[0], changes[2], changes[3]}
+        assert result["deleted"] == [deleted_id]
+
+    def test_get_changes_should_stop_at_limit(self, given_user, changes):
+        # given
+        changes, deleted_id = changes
+
+        # when
+        first = self.service(given_user, limit=2).get_changes(since=2)
+        second = self.service(given_user, limit=2).get_changes(since=first["version"])
+
+        # then
+        assert (first["changed"], first["deleted"]) == ([changes[2], changes[3]], [])
+        assert (first["version"], first["has_more"]) == (4, True)
+        assert (second["changed"], second["deleted"]) == ([changes[0]], [deleted_id])
+        assert (second["version"], second["has_more"]) == (6, False)
+
+    def test_get_changes_should_keep_version_given_none(self, given_user):
+        # when
+        result = self.service(given_user).get_changes(since=3)
+
+        # then
+        assert result == {"changed": [], "deleted": [], "version": 3, "has_more": False}
+
+
+@pytest.mark.django_db
+class TestResourceVersioning:
+    def test_writes_should_bump_owner_version(self, given_user):
+        # given
+        other = ResourceFactory.create()
+
+        # when
+        resource = ResourceFactory.create(owner=given_user)
+        resource.save()
+        resource_id = resource.id
+        resource.delete()
+
+        # then
+        assert resource.version == 2
+        assert other.version == 1
+        tombstone = ResourceTombstone.objects.get(resource_id=resource_id)
+        assert (tombstone.owner_id, tombstone.version) == (given_user.id, 3)
+        assert ResourceVersion.objects.get(owner=given_user).version == 3
+
+    def test_user_deletion_should_delete_versions_and_tombstones(self, given_user):
+        # given
+        ResourceFactory.create_batch(2, owner=given_user)
+        ResourceFactory.create_batch(2, owner=given_user)[0].delete()
+
+        # when
+        given_user.delete()
+
+        # then
+        assert not ResourceVersion.objects.filter(owner_id=given_user.id).exists()
+        assert not ResourceTombstone.objects.filter(owner_id=given_user.id).exists()
+        assert not ResourceCount.objects.filter(owner_id=given_user.id).exists()
+
+    def test_migration_should_version_existing_resources(self, given_user):
+        # given resources created before change tracking, which are unversioned
+        resources = ResourceFactory.create_batch(3, owner=given_user)
+        other = ResourceFactory.create()
+        Resource.objects.update(version=0)
+        ResourceVersion.objects.all().delete()
+        migration = importlib.import_module(
+            "resources.migrations.0006_resource_change_tracking"
+        ).Migration
+        (backfill,) = [
+            operation
+            for operation in migration.operations
+            if isinstance(operation, migrations.RunSQL)
+        ]
+
+        # when
+        with connection.cursor() as cursor:
+            for sql in backfill.sql:
+                cursor.execute(sql)
+
+        # then
+        versions = dict(Resource.objects.values_list("id", "version"))
+        assert [versions[resource.id] for resource in resources] == [1, 2, 3]
+        assert versions[other.id] == 1
+        assert dict(ResourceVersion.objects.values_list("owner", "version")) == {
+            given_user.id: 3,
+            other.owner_id: 1,
+        }
+        result = ResourceChangesService(
+            given_user.id, Resource.objects.filter(owner=given_user), "default", 10
+        ).get_changes(since=0)
+        assert result["changed"] == resources
+        assert result["version"] == 3
+
+
+def resource_counts():
+    return dict(ResourceCount.objects.values_list("owner", "count"))
+
+
+@pytest.mark.django_db
+class TestResourceCounting:
+    def test_writes_should_count_owner_resources(self, given_user):
+        # given
+        other = ResourceFactory.create()
+
+        # when
+        resources = ResourceFactory.create_batch(3, owner=given_user)
+        resources[0].save()
+        resources[1].delete()
+        Resource.objects.filter(id=resources[2].id).delete()
+
+        # then
+        assert resource_counts() == {given_user.id: 1, other.owner_id: 1}
+
+
+def group_shards(group):
+    return list(
+        QuotaGroupShard.objects.filter(group=group)
+        .order_by("shard")
+        .values_list("count", "capacity")
+    )
+
+
+@pytest.mark.django_db
+class TestQuotaGroupCounting:
+    @pytest.fixture(autouse=True)
+    def shards(self, settings):
+        settings.QUOTA_GROUP_SHARDS = 4
+
+    def test_get_shard_capacities_should_split_amount_evenly(self):
+        # then
+        assert get_shard_capacities(10, 4) == [3, 3, 2, 2]
+        assert get_shard_capacities(2, 4) == [1, 1, 0, 0]
+
+    def test_save_should_spread_amount_and_count_over_shards(self):
+        # given
+        group = QuotaGroup.objects.create(name="team", amount=10)
+        member = UserFactory.create()
+        ResourceFactory.create_batch(7, owner=member)
+
+        # when
+        group.members.add(member)
+        group.amount = 6
+        group.save()
+
+        # then
+        assert group_shards(group) == [(2, 2), (2, 2), (1, 1), (2, 1)]
+
+    def test_writes_should_count_member_resources_within_capacities(self):
+        # given
+        group = QuotaGroup.objects.create(name="team", amount=8)
+        members = UserFactory.create_batch(2)
+        group.members.set(members)
+        ResourceFactory.create()  # not a member
+
+        # when
+        resources = [ResourceFactory.create(owner=members[i % 2]) for i in range(6)]
+        resources[0].delete()
+
+        # then
+        shards = group_shards(group)
+        assert sum(count for count, _ in shards) == 5
+        assert all(count <= capacity for count, capacity in shards)
+        assert get_exceeded_quota_groups(members[0].id, "default") == []
+
+    def test_writes_should_exceed_capacities_once_group_is_full(self):
+        # given
+        group = QuotaGroup.objects.create(name="team", amount=2)
+        member = UserFactory.create()
+        group.members.add(member)
+
+        # when
+        ResourceFactory.create_batch(3, owner=member)
+
+        # then
+        assert sum(count for count, _ in group_shards(group)) == 3
+        assert get_exceeded_quota_groups(member.id, "default") == [group.id]
+
+    def test_membership_changes_should_recount_group(self):
+        # given
+        groups = [
+            QuotaGroup.objects.create(name=name, amount=10) for name in ("a", "b")
+        ]
+        member = UserFactory.create()
+        ResourceFactory.create_batch(3, owner=member)
+
+        # when
+        member.quota_groups.add(*groups)
+        counts_after_add = [sum(c for c, _ in group_shards(g)) for g in groups]
+        groups[0].members.remove(member)
+        counts_after_remove = [sum(c for c, _ in group_shards(g)) for g in groups]
+        member.quota_groups.clear()
+
+        # then
+        assert counts_after_add == [3, 3]
+        assert counts_after_remove == [0, 3]
+        assert [sum(c for c, _ in group_shards(g)) for g in groups] == [0, 0]
+
+
+def hold_shard_locks(group, locked, waited):
+    # locks every shard of the group until a lock is waited for, for 5 seconds at most
+    try:
+        with transaction.atomic():
+            list(QuotaGroupShard.objects.select_for_update().filter(group=group))
+            locked.set()
+            deadline = time.monotonic() + 5
+            with connection.cursor() as cursor:
+                while time.monotonic() < deadline and not waited:
+                    cursor.execute("SELECT COUNT(*) FROM pg_locks WHERE NOT granted")
+                    waited.extend([True] * cursor.fetchone()[0])
+                    time.sleep(0.01)
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestQuotaGroupShardLocking:
+    def test_add_to_shard_should_wait_for_lock_after_retry_timeout(
+        self, settings, monkeypatch
+    ):
+        # given
+        settings.QUOTA_GROUP_SHARDS = 2
+        monkeypatch.setattr(services, "SHARD_RETRY_TIMEOUT_SECONDS", 0.05)
+        group = QuotaGroup.objects.create(name="team", amount=4)
+        locked, waited = threading.Event(), []
+        holder = threading.Thread(target=hold_shard_locks, args=(group, locked, waited))
+        holder.start()
+        locked.wait()
+
+        # when
+        with connections["default"].cursor() as cursor:
+            added = services._add_to_shard(cursor, group.id, 1, '"count" < "capacity"')
+        holder.join()
+
+        # then
+        assert added
+        assert waited  # rather than retrying until the locks were released
+        assert sum(count for count, _ in group_shards(group)) == 1
+
+    def test_deleting_member_should_uncount_their_resources(self):
+        # given
+        group = QuotaGroup.objects.create(name="team", amount=10)
+        members = UserFactory.create_batch(2)
+        group.members.set(members)
+        ResourceFactory.create_batch(2, owner=members[0])
+        ResourceFactory.create_batch(3, owner=members[1])
+
+        # when
+        members[1].delete()
+
+        # then
+        assert sum(count for count, _ in group_shards(group)) == 2
+
+
+def utilizations(users):
+    counts = dict(ResourceCount.objects.values_list("owner", "utilization"))
+    return [counts.get(user.id) for user in users]
+
+
+@pytest.mark.django_db
+class TestGetQuotaUtilization:
+    @pytest.fixture
+    def quotas(self):
+        quotas = {}
+        for name, amount, resource_count in [
+            ("half", 4, 2),
+            ("over", 2, 3),
+            ("zero", 0, 0),
+            ("unused", 5, 0),
+            ("near", 10, 9),
+        ]:
+            user = UserFactory.create()
+            ResourceFactory.create_batch(resource_count, owner=user)
+            quotas[name] = Quota.objects.create(amount=amount, user=user)
+        ResourceFactory.create()  # unlimited
+        return quotas
+
+    def test_should_order_quotas_by_utilization(self, quotas):
+        # when
+        with CaptureQueriesContext(connection) as context:
+            result = [
+                (quota.owner_id, quota.count, quota.utilization)
+                for quota in get_quota_utilization()
+            ]
+
+        # then
+        assert result == [
+            (quotas["zero"].user_id, 0, None),
+            (quotas["over"].user_id, 3, 1.5),
+            (quotas["near"].user_id, 9, 0.9),
+            (quotas["half"].user_id, 2, 0.5),
+            (quotas["unused"].user_id, 0, 0.0),
+        ]
+        assert len(context.captured_queries) == 1
+        assert 'resources_resource"' not in context.captured_queries[0]["sql"]
+
+    def test_should_filter_by_min_utilization(self, quotas):
+        # when
+        result = get_quota_utilization(min_utilization=0.9)
+
+        # then
+        assert [quota.owner_id for quota in result] == [
+            quotas[name].user_id for name in ["zero", "over", "near"]
+        ]
+
+    def test_should_be_served_by_utilization_index(self, quotas):
+        # when
+        with connection.cursor() as cursor:
+            # tables in tests are tiny, force the planner to consider the indexes, and
+            # to use one for the order
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+            plan = get_quota_utilization(min_utilization=0.9)[:100].explain()
+
+        # then
+        assert "resources_count_utilization" in plan
+        assert "Sort" not in plan
+
+    def test_should_follow_resource_and_quota_changes(self, quotas):
+        # given
+        half, unused = quotas["half"], quotas["unused"]
+
+        # when
+        ResourceFactory.create(owner=half.user)  # 3 of 4
+        Resource.objects.filter(owner=half.user).first().delete()  # 2 of 4
+        half.amount = 8  # 2 of 8
+        half.save()
+        unused.delete()
+
+        # then
+        assert utilizations([half.user, unused.user]) == [0.25, None]
+        assert [quota.owner_id for quota in get_quota_utilization()].count(
+            unused.user_id
+        ) == 0
+
+    def test_migration_should_copy_existing_quotas(self, quotas):
+        # given quotas created before utilizations were stored
+        ResourceCount.objects.update(amount=None, utilization=None)
+        ResourceCount.objects.filter(owner=quotas["unused"].user).delete()
+        migration = importlib.import_module(
+            "resources.migrations.0009_quota_utilization"
+        ).Migration
+        (backfill,) = [
+            operation
+            for operation in migration.operations
+            if isinstance(operation, migrations.RunSQL)
+        ]
+
+        # when
+        with connection.cursor() as cursor:
+            cursor.execute(backfill.sql)
+
+        # then
+        assert [
+            (quota.owner_id, quota.count, quota.utilization)
+            for quota in get_quota_utilization()
+        ] == [
+            (quotas["zero"].user_id, 0, None),
+            (quotas["over"].user_id, 3, 1.5),
+            (quotas["near"].user_id, 9, 0.9),
+            (quotas["half"].user_id, 2, 0.5),
+            (quotas["unused"].user_id, 0, 0.0),
+        ]
+
+    @pytest.mark.parametrize(
+        "operation,args,expected",
+        [("set", [2], [1.0, 0.0]), ("increment", [4], [0.25, 0.0]), ("clear", [], [])],
+    )
+    def test_should_follow_bulk_quota_changes(self, quotas, operation, args, expected):
+        # given
+        users = [quotas["half"].user, quotas["unused"].user]
+
+        # when
+        getattr(
+            BulkQuotaService(
+                EmailUser.objects.filter(id__in=[user.id for user in users])
+            ),
+            operation,
+        )(*args)
+
+        # then
+        listed = [quota.owner_id for quota in get_quota_utilization()]
+        assert [user.id in listed for user in users] == [bool(expected)] * 2
+        assert utilizations(users) == (expected or [None, None])
@@ -1,10 +1,24 @@
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
+import msgpack
 import pytest
-from resources.models import Quota, Resource
+from conftest import UserFactory
+from resources.models import Quota, QuotaGroup, QuotaGroupShard, Resource
+from resources.serializers import ResourceSerializer
 from resources.tests.conftest import ResourceFactory
+from resources.views import ResourceViewSet, resource_reads
+from users.models import EmailUser
+from users.services import UserProvisioningService
 
 
 @pytest.fixture
@@ -71,6 +85,228 @@ class TestResourceViewSet:
         assert len(response.data) == len(user_resources)
         assert all(resource["owner"] == given_user.id for resource in response.data)
 
+    def test_list_should_search_user_resources_by_title(
+        self, authenticated_client, given_user
+    ):
+        # given
+        match = ResourceFactory.create(title="Bitcoin is Sound Money", owner=given_user)
+        ResourceFactory.create(title="Gold is Money", owner=given_user)
+        ResourceFactory.create(title="Bitcoin is Sound Money")
+
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-list"), {"search": "bitcoin sound"}
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert [resource["id"] for resource in response.data] == [match.id]
+
+    def test_list_should_paginate_given_limit(self, authenticated_client, given_user):
+        # given
+        resources = [
+            ResourceFactory.create(title="Sound money %s" % i, owner=given_user)
+            for i in range(5)
+        ]
+
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-list"),
+            {"search": "sound", "limit": 2, "offset": 2},
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 5
+        assert [r["id"] for r in response.data["results"]] == [
+            resource.id for resource in resources[2:4]
+        ]
+
+    def test_list_should_paginate_in_id_order_given_no_ordering(
+        self, authenticated_client, given_user
+    ):
+        # given
+        ids = sorted(r.id for r in ResourceFactory.create_batch(5, owner=given_user))
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                reverse("resources:resource-list"), {"limit": 2, "offset": 2}
+            )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert [r["id"] for r in response.data["results"]] == ids[2:4]
+        assert 'ORDER BY "resources_resource"."id" ASC' in (
+            context.captured_queries[-1]["sql"]
+        )
+
+    def test_list_should_filter_and_order(self, authenticated_client, given_user):
+        # given
+        resources = [
+            ResourceFactory.create(title=title, owner=given_user)
+            for title in ["Bitcoin", "Bit", "Gold", "Bitcoin"]
+        ]
+        ResourceFactory.create(title="Bitcoin")
+
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-list"),
+            {"title_prefix": "Bit", "id_min": resources[1].id, "ordering": "-id"},
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert [r["id"] for r in response.data] == [resources[3].id, resources[1].id]
+
+    def test_list_should_400_given_unindexed_ordering(self, authenticated_client):
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-list"), {"ordering": "title"}
+        )
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "not supported" in str(response.data["ordering"])
+
+    def test_orderings_should_be_served_by_owner_indexes(self):
+        # given
+        indexed = [tuple(index.fields) for index in Resource._meta.indexes]
+
+        # then
+        for fields in ResourceViewSet.orderings.values():
+            columns = tuple(field.lstrip("-") for field in fields)
+            directions = {field.startswith("-") for field in fields}
+            assert ("owner", *columns) in indexed
+            assert len(directions) == 1  # mixed directions cannot scan the index
+
+    def test_list_should_select_and_serialize_requested_fields(
+        self, authenticated_client, given_user
+    ):
+        # given
+        resource = ResourceFactory.create(owner=given_user)
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                reverse("resources:resource-list"), {"fields": "id,title"}
+            )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [{"id": resource.id, "title": resource.title}]
+        assert "created_at" not in context.captured_queries[-1]["sql"]
+
+    def test_list_should_expand_owner_in_one_query(
+        self, authenticated_client, given_user
+    ):
+        # given
+        ResourceFactory.create_batch(3, owner=given_user)
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                reverse("resources:resource-list"),
+                {"fields": "id,owner", "expand": "owner"},
+            )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        # the version keying coalesced reads, then resources joined with their owner
+        assert len(context.captured_queries) == 2
+        assert "resources_resourceversion" in context.captured_queries[0]["sql"]
+        assert [resource["owner"] for resource in response.data] == [
+            {
+                "id": given_user.id,
+                "email": given_user.email,
+                "first_name": given_user.first_name,
+                "last_name": given_user.last_name,
+            }
+        ] * 3
+        assert "password" not in context.captured_queries[1]["sql"]
+
+    @pytest.mark.parametrize("params", [{"fields": ""}, {"fields": " , "}])
+    def test_list_should_serialize_all_fields_given_blank_fields(
+        self, authenticated_client, given_user, params
+    ):
+        # given
+        ResourceFactory.create(owner=given_user)
+
+        # when
+        response = authenticated_client.get(reverse("resources:resource-list"), params)
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data[0]) == set(ResourceSerializer.Meta.fields)
+
+    @pytest.mark.parametrize("params", [{"fields": "id,password"}, {"expand": "title"}])
+    def test_list_should_400_given_unknown_fields(self, authenticated_client, params):
+        # when
+        response = authenticated_client.get(reverse("resources:resource-list"), params)
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Unknown field(s)" in str(response.data[next(iter(params))])
+
+    def test_list_should_render_msgpack_given_accept_header(
+        self, authenticated_client, given_user
+    ):
+        # given
+        ResourceFactory.create_batch(2, owner=given_user)
+
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-list"), HTTP_ACCEPT="application/msgpack"
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == json.loads(
+            JSONRenderer().render(response.data)
+        )
+
+    def test_changes_should_return_changes_since_version(
+        self, authenticated_client, given_user
+    ):
+        # given
+        kept, deleted = ResourceFactory.create_batch(2, owner=given_user)
+        response = authenticated_client.get(reverse("resources:resource-changes"))
+        since = response.data["version"]
+        deleted_id = deleted.id
+        deleted.delete()
+        created = ResourceFactory.create(owner=given_user)
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(
+                reverse("resources:resource-changes"),
+                {"since": since, "fields": "id"},
+            )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "changed": [{"id": created.id}],
+            "deleted": [deleted_id],
+            "version": since + 2,
+            "has_more": False,
+        }
+        # the version, then the changed resources and tombstones after it
+        assert len(context.captured_queries) == 3
+
+    @pytest.mark.parametrize("params", [{"since": -1}, {"limit": 0}, {"since": "a"}])
+    def test_changes_should_400_given_invalid_params(
+        self, authenticated_client, params
+    ):
+        # when
+        response = authenticated_client.get(
+            reverse("resources:resource-changes"), params
+        )
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_retrieve_should_return_user_resource_by_pk(
         self, authenticated_client, given_user
     ):
@@ -125,6 +361,106 @@ class TestResourceViewSet:
         assert "not_found" == response.data["detail"].code
 
 
+def create_resource(user, statuses):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    try:
+        response = client.post(reverse("resources:resource-list"), {"title": "Team"})
+        statuses.append(response.status_code)
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db
+class TestResourceViewSetGroupQuota:
+    def test_create_should_reject_given_full_group(self, settings):
+        # given
+        settings.QUOTA_GROUP_SHARDS = 4
+        members = UserFactory.create_batch(2)
+        group = QuotaGroup.objects.create(name="team", amount=2)
+        group.members.set(members)
+        ResourceFactory.create(owner=members[0])
+        clients = [APIClient() for _ in members]
+        for client, member in zip(clients, members):
+            client.force_authenticate(user=member)
+
+        # when
+        created = clients[1].post(reverse("resources:resource-list"), {"title": "a"})
+        rejected = clients[0].post(reverse("resources:resource-list"), {"title": "b"})
+
+        # then
+        assert created.status_code == status.HTTP_201_CREATED
+        assert rejected.status_code == status.HTTP_403_FORBIDDEN
+        assert rejected.data["detail"] == "Group's resources has exceeded quota."
+        assert not Resource.objects.filter(title="b").exists()
+        shards = QuotaGroupShard.objects.filter(group=group)
+        assert sum(shards.values_list("count", flat=True)) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResourceViewSetGroupQuotaConcurrency:
+    def test_concurrent_creates_should_not_exceed_group_quota(self, settings):
+        # given
+        settings.QUOTA_GROUP_SHARDS = 4
+        members = UserFactory.create_batch(8)
+        group = QuotaGroup.objects.create(name="team", amount=10)
+        group.members.set(members)
+        statuses = []
+
+        # when
+        threads = [
+            threading.Thread(target=create_resource, args=(member, statuses))
+            for member in members * 3
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        assert statuses.count(status.HTTP_201_CREATED) == 10
+        assert statuses.count(status.HTTP_403_FORBIDDEN) == 14
+        assert Resource.objects.filter(owner__in=members).count() == 10
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN " + sql)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def scanned_partitions(plan):
+    return set(re.findall(r"\bresources_resource_p\d+\b", plan))
+
+
+@pytest.mark.django_db
+class TestResourceViewSetPartitionPruning:
+    @pytest.fixture
+    def view(self, given_user):
+        ResourceFactory.create_batch(3, owner=given_user)
+        view = ResourceViewSet()
+        view.request = SimpleNamespace(user=given_user, method="GET", query_params={})
+        return view
+
+    def test_get_queryset_should_scan_one_partition(self, view):
+        # when
+        plan = view.get_queryset().explain()
+
+        # then
+        assert len(scanned_partitions(plan)) == 1
+
+    def test_quota_check_should_scan_one_partition(self, view):
+        # given
+        with CaptureQueriesContext(connection) as context:
+            view._get_resource_count()
+
+        # when
+        plan = explain(context.captured_queries[-1]["sql"])
+
+        # then
+        assert len(scanned_partitions(plan)) == 1
+
+
 @pytest.mark.django_db
 class TestResourceViewSetAuthenticationIntegration:
     @pytest.mark.parametrize(
@@ -167,3 +503,232 @@ class TestResourceViewSetAuthenticationIntegration:
 
         # then
         assert response.status_code == status
+
+
+@pytest.fixture
+def staff_client(given_user):
+    given_user.is_staff = True
+    given_user.save()
+    client = APIClient()
+    client.force_authenticate(user=given_user)
+    return client
+
+
+@pytest.mark.django_db
+class TestBulkQuotaView:
+    def test_post_should_set_quota_of_selected_users(self, staff_client):
+        # given
+        users = UserFactory.create_batch(3)
+        data = {"operation": "set", "amount": 4, "user_ids": [u.id for u in users[:2]]}
+
+        # when
+        response = staff_client.post(reverse("resources:quota-bulk"), data)
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"operation": "set", "count": 2}
+        assert {quota.user_id: quota.amount for quota in Quota.objects.all()} == {
+            users[0].id: 4,
+            users[1].id: 4,
+        }
+
+    def test_post_should_filter_users_by_search(self, staff_client):
+        # given
+        matched = UserFactory.create(email="alice@needle.com")
+        unmatched = UserFactory.create(email="bob@haystack.com")
+        for user in (matched, unmatched):
+            Quota.objects.create(amount=5, user=user)
+        data = {"operation": "increment", "amount": -2, "search": "NEEDLE"}
+
+        # when
+        response = staff_client.post(reverse("resources:quota-bulk"), data)
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"operation": "increment", "count": 1}
+        assert Quota.objects.get(user=matched).amount == 3
+        assert Quota.objects.get(user=unmatched).amount == 5
+
+    def test_post_should_clear_quota(self, staff_client):
+        # given
+        user = UserFactory.create()
+        Quota.objects.create(amount=5, user=user)
+        data = {"operation": "clear", "user_ids": [user.id]}
+
+        # when
+        response = staff_client.post(
+            reverse("resources:quota-bulk"), data, format="json"
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"operation": "clear", "count": 1}
+        assert not Quota.objects.exists()
+
+    def test_post_should_400_given_invalid_data(self, staff_client):
+        # when
+        response = staff_client.post(
+            reverse("resources:quota-bulk"), {"operation": "set", "user_ids": [1]}
+        )
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "This field is required for set." in str(response.data["amount"])
+
+    def test_post_should_403_given_non_staff_user(self, authenticated_client):
+        # given
+        user = UserFactory.create()
+        data = {"operation": "clear", "user_ids": [user.id]}
+
+        # when
+        response = authenticated_client.post(reverse("resources:quota-bulk"), data)
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestQuotaCacheView:
+    def test_get_should_return_cache_stats(self, staff_client, authenticated_client):
+        # given
+        authenticated_client.post(
+            reverse("resources:resource-list"), {"title": "Bitcoin is Sound Money"}
+        )
+
+        # when
+        response = staff_client.get(reverse("resources:quota-cache"))
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["misses"] >= 1
+        assert set(response.data) >= {"hits", "hit_rate", "size", "evictions"}
+
+    def test_get_should_403_given_non_staff_user(self, authenticated_client):
+        # when
+        response = authenticated_client.get(reverse("resources:quota-cache"))
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestQuotaUtilizationView:
+    def test_get_should_list_quotas_used_at_min_utilization(self, staff_client):
+        # given
+        near, unused = UserFactory.create_batch(2)
+        ResourceFactory.create_batch(9, owner=near)
+        Quota.objects.create(amount=10, user=near)
+        Quota.objects.create(amount=10, user=unused)
+
+        # when
+        response = staff_client.get(
+            reverse("resources:quota-utilization"), {"min_utilization": 0.8}
+        )
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 1
+        assert response.data["results"] == [
+            {
+                "user": near.id,
+                "email": near.email,
+                "amount": 10,
+                "resource_count": 9,
+                "utilization": 0.9,
+            }
+        ]
+
+    def test_get_should_list_provisioned_quotas(self, staff_client):
+        # given
+        service = UserProvisioningService.from_csv(
+            ["email,quota", "alice@test-domain.com,5", "bob@test-domain.com,"],
+            processes=1,
+        )
+        service.provision()
+        alice = EmailUser.objects.get(email="alice@test-domain.com")
+
+        # when
+        response = staff_client.get(reverse("resources:quota-utilization"))
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [
+            {
+                "user": alice.id,
+                "email": alice.email,
+                "amount": 5,
+                "resource_count": 0,
+                "utilization": 0.0,
+            }
+        ]
+
+    def test_get_should_400_given_invalid_min_utilization(self, staff_client):
+        # when
+        response = staff_client.get(
+            reverse("resources:quota-utilization"), {"min_utilization": -1}
+        )
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "min_utilization" in response.data
+
+    def test_get_should_403_given_non_staff_user(self, authenticated_client):
+        # when
+        response = authenticated_client.get(reverse("resources:quota-utilization"))
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestResourceReadCoalescing:
+    @pytest.fixture
+    def keys(self, mocker):
+        keys = []
+
+        def call(key, func):
+            keys.append(key)
+            return func()
+
+        mocker.patch.object(resource_reads, "call", side_effect=call)
+        return keys
+
+    def test_reads_should_share_key_until_user_writes(
+        self, authenticated_client, given_user, keys
+    ):
+        # given
+        url = reverse("resources:resource-list")
+        ResourceFactory.create(owner=given_user)
+
+        # when
+        authenticated_client.get(url)
+        authenticated_client.get(url)
+        authenticated_client.post(url, {"title": "Bitcoin is Sound Money"})
+        response = authenticated_client.get(url)
+
+        # then
+        assert keys[0] == keys[1]
+        assert keys[2] != keys[1]
+        assert len(response.data) == 2
+
+    def test_reads_should_not_share_key_across_users_or_params(
+        self, authenticated_client, given_user, keys
+    ):
+        # given
+        resource = ResourceFactory.create(owner=given_user)
+        other_client = APIClient()
+        other_client.force_authenticate(user=UserFactory.create())
+
+        # when
+        authenticated_client.get(reverse("resources:resource-list"))
+        authenticated_client.get(reverse("resources:resource-list"), {"fields": "id"})
+        authenticated_client.get(
+            reverse("resources:resource-detail", args=[resource.id])
+        )
+        response = other_client.get(
+            reverse("resources:resource-detail", args=[resource.id])
+        )
+
+        # then
+        assert len(set(keys)) == 4
+        assert response.status_code == status.HTTP_404_NOT_FOUND
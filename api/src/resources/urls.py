@@ -1,12 +1,34 @@
+from django.urls import path
 from rest_framework.routers import SimpleRouter
 
-from resources.views import ResourceViewSet
+from resources.views import (
+    BulkQuotaView,
+    QuotaCacheView,
+    QuotaUtilizationView,
+    ResourceViewSet,
+)
 
 app_name = "resources"
 
 router = SimpleRouter()
 router.register(r"resources", ResourceViewSet, basename="resource")
 
-urlpatterns = []
+urlpatterns = [
+    path(
+        "quotas/bulk/",
+        BulkQuotaView.as_view({"post": "bulk_update"}),
+        name="quota-bulk",
+    ),
+    path(
+        "quotas/cache/",
+        QuotaCacheView.as_view({"get": "stats"}),
+        name="quota-cache",
+    ),
+    path(
+        "quotas/utilization/",
+        QuotaUtilizationView.as_view({"get": "list"}),
+        name="quota-utilization",
+    ),
+]
 
 urlpatterns += router.urls
@@ -1,14 +1,40 @@
-from django.db.models import Count, F
+from functools import cached_property
+
+from django.db import router, transaction
+from django.db.models import Q
 from rest_framework import mixins
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from core.coalescing import SingleFlight
+from core.routers import PRIMARY_DATABASE
 from users.authentication import JWTCookieAuthentication
 from users.models import EmailUser
 
+from .cache import get_quota_amount, quota_cache
+from .filters import IndexedOrderingFilter, ResourceFieldFilter, TitleSearchFilter
 from .models import Resource
-from .serializers import ResourceSerializer
+from .pagination import QuotaUtilizationPagination, ResourcePagination
+from .serializers import (
+    BulkQuotaSerializer,
+    QuotaUtilizationParamsSerializer,
+    QuotaUtilizationSerializer,
+    ResourceChangesSerializer,
+    ResourceSerializer,
+)
+from .services import (
+    BulkQuotaService,
+    ResourceChangesService,
+    get_exceeded_quota_groups,
+    get_quota_utilization,
+    get_resource_version,
+)
+
+# concurrent identical reads of a user's resources, see ResourceViewSet.coalesce()
+resource_reads = SingleFlight()
 
 
 class ResourceViewSet(
@@ -22,27 +48,234 @@ class ResourceViewSet(
     permission_classes = [IsAuthenticated]
 
     serializer_class = ResourceSerializer
+    filter_backends = [ResourceFieldFilter, TitleSearchFilter, IndexedOrderingFilter]
+    pagination_class = ResourcePagination
+
+    # `?ordering=` values mapped to orderings served by the (owner, ...) indexes of
+    # Resource, when no other filter than that of the ordered column is given: with
+    # `?title_prefix=` or `?search=`, postgres sorts the matching resources instead. An
+    # ordering overrides the relevance ordering of `?search=`.
+    orderings = {
+        "id": ["id"],
+        "-id": ["-id"],
+        "created_at": ["created_at", "id"],
+        "-created_at": ["-created_at", "-id"],
+    }
+    # of results neither searched nor ordered, so that pages neither repeat nor skip
+    # resources
+    default_ordering = "id"
 
     def get_queryset(self):
-        return Resource.objects.filter(owner=self.request.user)
+        queryset = Resource.objects.filter(owner=self.request.user)
+
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+
+        # only select the columns of the requested fields, and join the expanded
+        # related fields instead of querying them per resource
+        fields, expand = self.fieldset
+        columns = fields or self.serializer_class.Meta.fields
+
+        only = []
+        for name in columns:
+            only.append(name)
+
+            if name in expand:
+                queryset = queryset.select_related(name)
+                expanded = self.serializer_class.expandable_fields[name]
+                only.extend(f"{name}__{field}" for field in expanded.Meta.fields)
+
+        return queryset.only(*only)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in SAFE_METHODS:
+            kwargs["fields"], kwargs["expand"] = self.fieldset
+
+        return super().get_serializer(*args, **kwargs)
+
+    @cached_property
+    def fieldset(self):
+        """
+        Returns the fields to include, None for all, and the fields to expand, as
+        requested by the comma separated `?fields=` and `?expand=` query params.
+        """
+        fields = self._parse_field_names("fields", self.serializer_class.Meta.fields)
+        expand = self._parse_field_names(
+            "expand", self.serializer_class.expandable_fields
+        )
+
+        return fields, expand or []
+
+    def _parse_field_names(self, param, allowed):
+        value = self.request.query_params.get(param)
+        names = [name.strip() for name in (value or "").split(",") if name.strip()]
+        if not names:
+            # e.g. a blank `?fields=` of a form, rather than a request for no field
+            return None
+
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValidationError(
+                {
+                    param: f"Unknown field(s): {', '.join(unknown)}. "
+                    f"Use any of: {', '.join(allowed)}."
+                }
+            )
+
+        return names
+
+    def list(self, request, *args, **kwargs):
+        return self.coalesce(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.coalesce(super().retrieve, request, *args, **kwargs)
+
+    def coalesce(self, handler, request, *args, **kwargs):
+        """
+        Shares the response data of concurrent identical requests of the user within
+        the worker process, e.g. of several tabs of the SPA loading at once, so that
+        only one of them queries and serializes.
+
+        The key includes the version of the user's resources, so a request made after
+        a write of the user never shares the data of a request made before it. Reads
+        pinned to the primary, e.g. right after a write, only share with each other.
+        """
+        using = router.db_for_read(Resource)
+        key = (
+            request.user.id,
+            request.build_absolute_uri(),
+            get_resource_version(request.user.id, using),
+            using == PRIMARY_DATABASE,
+        )
+
+        def respond():
+            response = handler(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        status, data = resource_reads.call(key, respond)
+        return Response(data, status=status)
+
+    @action(detail=False)
+    def changes(self, request, *args, **kwargs):
+        """
+        Delta sync: the resources changed and the ids of those deleted since the
+        version of the previous sync, and the version to sync from next. Clients sync
+        again right away while `has_more`.
+        """
+        params = ResourceChangesSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        service = ResourceChangesService(
+            request.user.id,
+            self.get_queryset(),
+            # replicas replay commits in order, a lagging one returns fewer changes but
+            # never skips one
+            using=router.db_for_read(Resource),
+            limit=params.validated_data["limit"],
+        )
+        changes = service.get_changes(params.validated_data["since"])
+
+        changes["changed"] = self.get_serializer(changes["changed"], many=True).data
+        return Response(changes)
 
     def perform_create(self, serializer):
-        user_with_counts = self._get_user_with_resource_count_and_quota()
+        quota_amount = get_quota_amount(self.request.user.id)
 
-        if (
-            user_with_counts.quota_amount is None  # quota unset = unlimited
-            or user_with_counts.resource_count < user_with_counts.quota_amount
+        if not (
+            quota_amount is None  # quota unset = unlimited
+            or self._get_resource_count() < quota_amount
         ):
+            raise PermissionDenied("User's resources has exceeded quota.")
+
+        using = router.db_for_write(Resource)
+        with transaction.atomic(using=using):
+            # counts the resource for the user's groups, see add_group_resource_count()
             serializer.save(owner=self.request.user)
-            return
 
-        raise PermissionDenied("User's resources has exceeded quota.")
+            if get_exceeded_quota_groups(self.request.user.id, using):
+                raise PermissionDenied("Group's resources has exceeded quota.")
 
-    def _get_user_with_resource_count_and_quota(self):
-        # annotated queryset is used to benefit from DB joins and aggregation
-        # instead of performing multiple queries
+    def _get_resource_count(self):
+        # read from the primary, since a lagging replica could undercount resources
         return (
-            EmailUser.objects.filter(id=self.request.user.id)
-            .annotate(resource_count=Count("resource"), quota_amount=F("quota__amount"))
-            .get()
+            Resource.objects.using(router.db_for_write(Resource))
+            .filter(owner=self.request.user)
+            .count()
         )
+
+
+class BulkQuotaView(GenericViewSet):
+    """
+    Staff endpoint to set, increment or clear the quotas of many users at once.
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    serializer_class = BulkQuotaSerializer
+
+    def bulk_update(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        operation = serializer.validated_data["operation"]
+        amount = serializer.validated_data.get("amount")
+        service = BulkQuotaService(self._get_users(serializer.validated_data))
+
+        if operation == BulkQuotaSerializer.OPERATION_SET:
+            count = service.set(amount)
+        elif operation == BulkQuotaSerializer.OPERATION_INCREMENT:
+            count = service.increment(amount)
+        else:
+            count = service.clear()
+
+        return Response({"operation": operation, "count": count})
+
+    def _get_users(self, validated_data):
+        users = EmailUser.objects.all()
+
+        if "user_ids" in validated_data:
+            users = users.filter(id__in=validated_data["user_ids"])
+
+        if "search" in validated_data:
+            # same lookups as EmailUserAdmin.search_fields, served by trigram indexes
+            search = validated_data["search"]
+            users = users.filter(
+                Q(email__icontains=search)
+                | Q(first_name__icontains=search)
+                | Q(last_name__icontains=search)
+            )
+
+        return users
+
+
+class QuotaCacheView(GenericViewSet):
+    """
+    Staff endpoint reporting the hit rate and size of the quota cache of the process
+    serving the request.
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def stats(self, request, *args, **kwargs):
+        return Response(quota_cache.stats())
+
+
+class QuotaUtilizationView(mixins.ListModelMixin, GenericViewSet):
+    """
+    Staff endpoint listing the quotas from most to least used, optionally only those
+    used at `?min_utilization=` or more.
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+
+    serializer_class = QuotaUtilizationSerializer
+    pagination_class = QuotaUtilizationPagination
+
+    def get_queryset(self):
+        params = QuotaUtilizationParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+
+        return get_quota_utilization(params.validated_data.get("min_utilization"))
@@ -3,14 +3,22 @@ Due to custom EmailUser model implementation, django-admin forms and ModelAdmin
 need to be overriden.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from django.utils.translation import gettext_lazy as _
 
-from resources.admin import QuotaInline
+from core.paginators import EstimatedCountPaginator
+from resources.admin import (
+    QuotaActionForm,
+    QuotaInline,
+    clear_quota,
+    increment_quota,
+    set_quota,
+)
 
-from .models import EmailUser
+from .models import EmailUser, UserDeletion
+from .services import UserDeletionService
 
 
 class EmailUserChangeForm(UserChangeForm):
@@ -64,8 +72,70 @@ class EmailUserAdmin(UserAdmin):
     form = UserChangeForm
     add_form = UserCreationForm
     list_display = ("email", "first_name", "last_name", "is_staff", "quota")
+    # join quota (reverse one-to-one) into the changelist query instead of one lookup
+    # per row
+    list_select_related = ("quota",)
+    # icontains searches are served by trigram indexes, see EmailUser.Meta.indexes
     search_fields = ("email", "first_name", "last_name")
     ordering = ("email",)
 
+    # avoid exact COUNT(*) over the whole table on every changelist view
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     # attach forms of related models (InlineModelAdmin)
     inlines = [QuotaInline]
+
+    # bulk quota changes, each applied with a single statement
+    actions = [set_quota, increment_quota, clear_quota]
+    action_form = QuotaActionForm
+
+    def get_deleted_objects(self, objs, request):
+        # collecting every resource of a heavy user for the confirmation page would
+        # time out, they are deleted in the background instead, see delete_model
+        users = [str(user) for user in objs]
+        model_count = {EmailUser._meta.verbose_name_plural: len(users)}
+        return users, model_count, set(), []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, [obj])
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            UserDeletionService.schedule(user)
+
+        self.message_user(
+            request,
+            _(
+                "Deleted users are deactivated, their resources are deleted in the "
+                "background. See the progress under user deletions."
+            ),
+            messages.INFO,
+        )
+
+
+@admin.register(UserDeletion)
+class UserDeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        "email",
+        "status",
+        "progress_percent",
+        "resources_deleted",
+        "resources_total",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("email",)
+    ordering = ("-created_at",)
+    readonly_fields = list_display
+
+    @admin.display(description=_("progress"))
+    def progress_percent(self, obj):
+        return "%d%%" % (obj.progress * 100)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
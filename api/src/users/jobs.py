@@ -0,0 +1,28 @@
+from django.utils import timezone
+
+from core.jobs import job
+
+from .models import UserDeletion, UserProvisioning
+from .services import UserDeletionService, UserProvisioningService
+
+
+@job
+def purge_user_deletion(deletion_id):
+    # resumes from the last committed batch when retried
+    deletion = UserDeletion.objects.get(pk=deletion_id)
+    UserDeletionService(deletion).purge()
+
+
+@job
+def provision_users(provisioning_id):
+    # registered emails are skipped, so a retry resumes after the last batch created
+    provisioning = UserProvisioning.objects.get(pk=provisioning_id)
+    if provisioning.status == UserProvisioning.STATUS_DONE:
+        return
+
+    rows = [tuple(row) for row in provisioning.rows]
+    provisioning.result = UserProvisioningService(rows, hashed=True).provision()
+    provisioning.status = UserProvisioning.STATUS_DONE
+    provisioning.rows = []
+    provisioning.finished_at = timezone.now()
+    provisioning.save()
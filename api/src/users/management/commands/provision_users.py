@@ -0,0 +1,48 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from users.services import UserProvisioningService
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates users and their quotas from a CSV file with an `email` column, and "
+        "optionally `password` and `quota` columns. Users without a password are "
+        "invited, registered emails are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the CSV file.")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Number of processes hashing passwords, all cores by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of users inserted at once.",
+        )
+
+    def handle(self, *args, path, processes, batch_size, **options):
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as lines:
+                service = UserProvisioningService.from_csv(
+                    lines, processes=processes, batch_size=batch_size
+                )
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+
+        result = service.provision()
+
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Created {created} users ({invited} invited), skipped {skipped} "
+                    "already registered, in {seconds}s ({users_per_second} users/s).".format(
+                        **result
+                    )
+                )
+            )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from users.models import UserDeletion
+from users.services import UserDeletionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the resources of users deleted through the admin in batches, then the "
+        "users. Purges are run by background jobs, this resumes them by hand e.g. "
+        "after their job failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches per user, to bound the run time.",
+        )
+
+    def handle(self, *args, max_batches=None, **options):
+        pending = UserDeletion.objects.filter(
+            status=UserDeletion.STATUS_PENDING
+        ).order_by("created_at")
+
+        verbosity = options["verbosity"]
+
+        for deletion in pending.iterator():
+            service = UserDeletionService(deletion)
+            done = service.purge(
+                max_batches=max_batches,
+                on_progress=self.write_progress if verbosity > 1 else None,
+            )
+
+            if verbosity == 1:  # after each batch given a higher verbosity
+                self.write_progress(service.deletion)
+            if done and verbosity > 0:
+                self.stdout.write(self.style.SUCCESS("%s: deleted" % deletion.email))
+
+    def write_progress(self, deletion):
+        self.stdout.write(
+            "%s: %s of %s resources deleted (%d%%)"
+            % (
+                deletion.email,
+                deletion.resources_deleted,
+                deletion.resources_total,
+                deletion.progress * 100,
+            )
+        )
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.6 on 2026-10-19 13:44
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. Building the indexes
+    # concurrently avoids locking users_emailuser against writes while they build.
+    atomic = False
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    # The indexes are created with raw SQL since Django 3.2.6 renders OpClass() in a
+    # functional index with an extra pair of parentheses, which postgres rejects.
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "users_email_upper_trgm" ON "users_emailuser" USING gin ((UPPER("email")) gin_trgm_ops);',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "users_email_upper_trgm";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='emailuser',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='users_email_upper_trgm'),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "users_first_name_upper_trgm" ON "users_emailuser" USING gin ((UPPER("first_name")) gin_trgm_ops);',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "users_first_name_upper_trgm";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='emailuser',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='users_first_name_upper_trgm'),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "users_last_name_upper_trgm" ON "users_emailuser" USING gin ((UPPER("last_name")) gin_trgm_ops);',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "users_last_name_upper_trgm";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='emailuser',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='users_last_name_upper_trgm'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.6 on 2026-10-19 14:30
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. Building the index
+    # concurrently avoids locking users_emailuser against writes while it builds.
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_user_deletion'),
+    ]
+
+    # The index is created with raw SQL since Django 3.2 cannot create functional
+    # indexes as unique. Emails differing only by case must be merged beforehand.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "users_email_lower_unique" ON "users_emailuser" (LOWER("email"));',
+                    reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS "users_email_lower_unique";',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='emailuser',
+                    index=models.Index(django.db.models.functions.text.Lower('email'), name='users_email_lower_unique'),
+                ),
+            ],
+        ),
+    ]
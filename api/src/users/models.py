@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/3.2/topics/auth/customizing/#substituting-a-cu
 from django.apps import apps
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Lower, Upper
 from django.utils.translation import gettext_lazy as _
 
 
@@ -56,6 +58,20 @@ class EmailUserManager(UserManager):
         """
         return self.create_user(**kwargs)
 
+    def filter_email(self, email):
+        """
+        Filters users by case-insensitive email, served by the users_email_lower_unique
+        index. Unlike `email__iexact`, which postgres evaluates as UPPER(), LOWER()
+        matches the indexed expression.
+        """
+        return self.alias(email_lower=Lower("email")).filter(
+            email_lower=Lower(models.Value(email))
+        )
+
+    def get_by_natural_key(self, username):
+        # authenticate() looks users up by their natural key, the email
+        return self.filter_email(username).get()
+
 
 class EmailUser(AbstractUser):
     """
@@ -80,3 +96,102 @@ class EmailUser(AbstractUser):
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
+
+    class Meta(AbstractUser.Meta):
+        # Emails are unique regardless of case, by a unique index on LOWER(email) which
+        # also serves EmailUserManager.filter_email(). Django 3.2 has no functional
+        # unique constraints, migration 0004 creates the index as unique.
+        #
+        # Admin search filters with `icontains`, which postgres evaluates as
+        # UPPER(column::text) LIKE UPPER('%term%'). Trigram indexes over the same
+        # expression serve both substring and prefix patterns without a table scan.
+        indexes = [
+            models.Index(Lower("email"), name="users_email_lower_unique"),
+            GinIndex(
+                OpClass(Upper("email"), name="gin_trgm_ops"),
+                name="users_email_upper_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper("first_name"), name="gin_trgm_ops"),
+                name="users_first_name_upper_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper("last_name"), name="gin_trgm_ops"),
+                name="users_last_name_upper_trgm",
+            ),
+        ]
+
+
+class UserDeletion(models.Model):
+    """
+    Tracks the deletion of a user whose resources are purged in the background, see
+    users.services.UserDeletionService. The user is deactivated when it is created and
+    deleted once all their resources are, after which `user` is null.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_CHOICES = [(STATUS_PENDING, _("Pending")), (STATUS_DONE, _("Done"))]
+
+    user = models.OneToOneField(
+        EmailUser, null=True, on_delete=models.SET_NULL, related_name="deletion"
+    )
+    email = models.EmailField(_("email address"))
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    resources_total = models.PositiveIntegerField(default=0)
+    resources_deleted = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                name="users_deletion_pending",
+                condition=models.Q(status="pending"),
+            )
+        ]
+
+    def __str__(self):
+        return self.email
+
+    @property
+    def progress(self):
+        """
+        Share of the user's resources deleted so far, between 0 and 1.
+        """
+        if self.status == self.STATUS_DONE:
+            return 1.0
+        if not self.resources_total:
+            return 0.0
+        return min(self.resources_deleted / self.resources_total, 1.0)
+
+
+class UserProvisioning(models.Model):
+    """
+    Tracks the provisioning of users uploaded by staff, inserted in the background by
+    users.jobs.provision_users. `rows` hold the (email, hashed password, quota) of the
+    users, never plaintext passwords, and are cleared once provisioned, after which
+    `result` holds the counts.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_CHOICES = [(STATUS_PENDING, _("Pending")), (STATUS_DONE, _("Done"))]
+
+    created_by = models.ForeignKey(
+        EmailUser, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    rows = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    result = models.JSONField(null=True, blank=True)
+    job = models.OneToOneField(
+        "core.Job", null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
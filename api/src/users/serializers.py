@@ -1,18 +1,94 @@
+from contextlib import nullcontext
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router, transaction
 from rest_framework import serializers
 
+from .models import UserProvisioning
+
+# unique constraints rejecting an email already in use, the latter regardless of case
+EMAIL_CONSTRAINTS = {"users_emailuser_email_key", "users_email_lower_unique"}
+
 
 class CreateUserSerializer(serializers.ModelSerializer):
     """
-    The ModelSerializer maps directly to the User model and includes validating for 
-    uniqueness of the email supplied.
+    The ModelSerializer maps directly to the User model. The uniqueness of the email
+    supplied is left to the database, rather than checked with an extra SELECT, and a
+    conflicting INSERT is reported as the usual validation error.
     """
+
     class Meta:
         model = get_user_model()
         fields = ["email", "password"]
-        extra_kwargs = {"password": {"write_only": True}}
+        extra_kwargs = {
+            "password": {"write_only": True},
+            # drops the UniqueValidator, the email format is still validated
+            "email": {"validators": []},
+        }
+
+    def create(self, validated_data):
+        model = self.Meta.model
+        connection = transaction.get_connection(router.db_for_write(model))
+
+        # outside of a transaction a failed INSERT needs no savepoint to roll back
+        savepoint = (
+            transaction.atomic(using=connection.alias)
+            if connection.in_atomic_block
+            else nullcontext()
+        )
+        try:
+            with savepoint:
+                return super().create(validated_data)
+        except IntegrityError as e:
+            diag = getattr(e.__cause__, "diag", None)
+            if diag is None or diag.constraint_name not in EMAIL_CONSTRAINTS:
+                raise
+
+            message = model._meta.get_field("email").error_messages["unique"]
+            raise serializers.ValidationError({"email": [message]}, code="unique")
+
+
+class UserSerializer(serializers.ModelSerializer):
+    """
+    Public details of a user e.g. the expanded owner of a resource
+    """
+
+    class Meta:
+        model = get_user_model()
+        fields = ["id", "email", "first_name", "last_name"]
+        read_only_fields = fields
 
 
 class LoginUserSerializer(serializers.Serializer):
     email = serializers.EmailField(max_length=254)
     password = serializers.CharField(max_length=128, write_only=True)
+
+
+class ProvisionUsersSerializer(serializers.Serializer):
+    """
+    CSV file of the users to provision, see users.services.UserProvisioningService
+    """
+
+    file = serializers.FileField()
+
+
+class UserProvisioningSerializer(serializers.ModelSerializer):
+    """
+    Progress of a provisioning queued by ProvisionUsersSerializer's upload. `job_status`
+    is `failed` once its job ran out of attempts, see core.jobs
+    """
+
+    job_status = serializers.CharField(source="job.status", default=None)
+
+    class Meta:
+        model = UserProvisioning
+        fields = [
+            "id",
+            "status",
+            "job",
+            "job_status",
+            "result",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -1,9 +1,30 @@
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
 from django.contrib.auth import authenticate as authenticate_email_password
+from django.contrib.auth.hashers import is_password_usable, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connections, router, transaction
+from django.db.models.functions import Lower
 from django.middleware.csrf import rotate_token
+from django.utils import timezone
 from rest_framework import exceptions
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.jobs import enqueue
+from resources.models import Quota, Resource
+from resources.services import MAX_QUOTA_AMOUNT, add_resource_count, copy_quota_amounts
+
+from .models import EmailUser, EmailUserManager, UserDeletion, UserProvisioning
+
 
 class LoginUserService:
     def __init__(self, request, email=None, password=None, user=None):
@@ -52,3 +73,305 @@ class LoginUserService:
 
         response.set_cookie("refresh", self.refresh, **cookie_settings)
         response.set_cookie("access", self.access, **cookie_settings)
+
+
+class UserDeletionService:
+    """
+    Deletes a user without collecting and deleting all their resources in a single
+    transaction, which for heavy users can time out and hold locks for long.
+
+    schedule() deactivates the user right away, which revokes their JWT access, and
+    queues a job (see users.jobs) that purge()s their resources in batches of
+    `USER_DELETION_BATCH_SIZE`, each in a transaction of its own. A purge that is
+    interrupted resumes where it stopped when run again. The user itself is deleted
+    once they have no resources left.
+
+    Batches bypass the Resource signals, there is no point in versioning or streaming
+    the changes of a deactivated user. They update the user's ResourceCount themselves.
+    """
+
+    def __init__(self, deletion):
+        self.deletion = deletion
+
+    @classmethod
+    def schedule(cls, user):
+        """
+        Deactivates the user and returns their pending UserDeletion, queuing its purge.
+        """
+        from .jobs import purge_user_deletion
+
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+
+            deletion, created = UserDeletion.objects.get_or_create(
+                user=user,
+                defaults={
+                    "email": user.email,
+                    "resources_total": Resource.objects.filter(owner=user).count(),
+                },
+            )
+            if created:
+                enqueue(purge_user_deletion, deletion.id)
+
+        return deletion
+
+    def purge(self, max_batches=None, on_progress=None):
+        """
+        Deletes batches of the user's resources until none are left, then the user,
+        calling `on_progress(deletion)` after each batch. Returns whether the deletion
+        is done, False if `max_batches` ran out first.
+        """
+        batches = 0
+        while self.deletion.status != UserDeletion.STATUS_DONE:
+            if max_batches is not None and batches >= max_batches:
+                return False
+
+            self.purge_batch()
+            batches += 1
+
+            if on_progress is not None:
+                on_progress(self.deletion)
+
+        return True
+
+    def purge_batch(self):
+        """
+        Deletes a batch of the user's resources, or the user once they have none.
+        Returns the number of resources deleted.
+        """
+        table = Resource._meta.db_table
+        # served by the (owner, id) index of the owner's partition
+        sql = (
+            f'DELETE FROM "{table}" WHERE "owner_id" = %s AND "id" IN ('
+            f'SELECT "id" FROM "{table}" WHERE "owner_id" = %s ORDER BY "id" LIMIT %s)'
+        )
+
+        with transaction.atomic():
+            # serializes purges of the same deletion e.g. by concurrent workers
+            deletion = UserDeletion.objects.select_for_update().get(pk=self.deletion.pk)
+
+            if deletion.user_id is None:
+                count = 0
+            else:
+                using = router.db_for_write(Resource)
+                with connections[using].cursor() as cursor:
+                    user_id = deletion.user_id
+                    batch_size = settings.USER_DELETION_BATCH_SIZE
+                    cursor.execute(sql, [user_id, user_id, batch_size])
+                    count = cursor.rowcount
+
+                if count:
+                    add_resource_count(user_id, -count, using)
+
+            deletion.resources_deleted += count
+            if count == 0:
+                # cheap to collect now, what is left e.g. the quota is deleted with it
+                if deletion.user is not None:
+                    deletion.user.delete()
+                deletion.user = None
+                deletion.status = UserDeletion.STATUS_DONE
+                deletion.finished_at = timezone.now()
+
+            deletion.save()
+
+        self.deletion = deletion
+        return count
+
+
+class UserProvisioningService:
+    """
+    Creates many users at once e.g. the seats of a new customer, from rows of (email,
+    password, quota). Users without a password are invited: they are created with an
+    unusable password, until one is set for them e.g. in the admin. Users without a
+    quota get no Quota row.
+
+    Hashing passwords is deliberately slow and dominates the run time, so passwords are
+    hashed by a pool of `processes` while the users already hashed are inserted with
+    bulk_create in batches of `USER_PROVISIONING_BATCH_SIZE`, along their Quota rows.
+    Emails already registered, regardless of case, are skipped, so that a file can be
+    provisioned again e.g. after a failure.
+
+    Given `hashed`, the passwords of the rows are already hashed e.g. by schedule(),
+    and are inserted as they are.
+    """
+
+    # invalid lines reported at most
+    max_errors = 20
+
+    def __init__(self, rows, processes=None, batch_size=None, hashed=False):
+        self.rows = rows
+        self.hashed = hashed
+        self.processes = processes or settings.USER_PROVISIONING_PROCESSES
+        self.processes = self.processes or os.cpu_count()
+        self.batch_size = batch_size or settings.USER_PROVISIONING_BATCH_SIZE
+
+    @classmethod
+    def from_csv(cls, lines, **kwargs):
+        """
+        Reads rows from CSV `lines` with an `email` column, and optionally `password`
+        and `quota` columns. Raises ValidationError listing the invalid lines.
+        """
+        reader = csv.DictReader(lines)
+        if "email" not in (reader.fieldnames or []):
+            raise ValidationError(
+                "The first line must name the columns: email, and optionally password "
+                "and quota."
+            )
+
+        rows, errors, seen = [], [], set()
+        for row in reader:
+            email = EmailUserManager.normalize_email((row["email"] or "").strip())
+            password = row.get("password") or None
+            quota = (row.get("quota") or "").strip()
+
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append("Line %s: enter a valid email address." % reader.line_num)
+                continue
+
+            if email.lower() in seen:
+                errors.append("Line %s: %s is listed twice." % (reader.line_num, email))
+                continue
+            seen.add(email.lower())
+
+            if quota and (not quota.isdigit() or int(quota) > MAX_QUOTA_AMOUNT):
+                errors.append(
+                    "Line %s: enter a quota between 0 and %s."
+                    % (reader.line_num, MAX_QUOTA_AMOUNT)
+                )
+                continue
+
+            rows.append((email, password, int(quota) if quota else None))
+
+        if errors:
+            raise ValidationError(errors[: cls.max_errors])
+
+        return cls(rows, **kwargs)
+
+    def schedule(self, created_by=None):
+        """
+        Returns a pending UserProvisioning of the rows, queuing their insertion by a
+        job. Passwords are hashed before the rows are stored, so that a provisioning
+        never keeps plaintext passwords, even once its job failed. Raises
+        ValidationError given more than `USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS`
+        passwords, which would take too long to hash in a request.
+        """
+        from .jobs import provision_users
+
+        passwords = sum(password is not None for _, password, _ in self.rows)
+        if passwords > settings.USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS:
+            raise ValidationError(
+                "The file has %s passwords, at most %s can be uploaded. Provision it "
+                "with manage.py provision_users instead."
+                % (passwords, settings.USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS)
+            )
+
+        rows = [
+            (email, make_password(password), quota)
+            for email, password, quota in self.rows
+        ]
+        with transaction.atomic():
+            provisioning = UserProvisioning.objects.create(
+                created_by=created_by, rows=rows
+            )
+            provisioning.job = enqueue(provision_users, provisioning.id)
+            provisioning.save(update_fields=["job"])
+
+        return provisioning
+
+    def provision(self):
+        """
+        Creates the users and their quotas, and returns counts and the throughput.
+        """
+        started = time.perf_counter()
+        rows = self.exclude_registered(self.rows)
+        passwords = [password for _, password, _ in rows]
+
+        created = invited = 0
+        with self.get_executor() as executor:
+            # hashes are yielded in order, while the pool hashes the following ones
+            hashes = (
+                passwords
+                if self.hashed
+                else executor.map(make_password, passwords, chunksize=50)
+            )
+            hashed = zip(rows, hashes)
+
+            while batch := list(islice(hashed, self.batch_size)):
+                self.create_batch(batch)
+
+                created += len(batch)
+                invited += sum(not is_password_usable(encoded) for _, encoded in batch)
+
+        seconds = time.perf_counter() - started
+        return {
+            "created": created,
+            "invited": invited,
+            "skipped": len(self.rows) - created,
+            "seconds": round(seconds, 3),
+            "users_per_second": round(created / seconds, 1),
+        }
+
+    def exclude_registered(self, rows):
+        registered = set()
+
+        for start in range(0, len(rows), self.batch_size):
+            lowered = [
+                email.lower() for email, _, _ in rows[start : start + self.batch_size]
+            ]
+            # served by the users_email_lower_unique index
+            registered.update(
+                EmailUser.objects.annotate(email_lower=Lower("email"))
+                .filter(email_lower__in=lowered)
+                .values_list("email_lower", flat=True)
+            )
+
+        return [row for row in rows if row[0].lower() not in registered]
+
+    def create_batch(self, batch):
+        with transaction.atomic():
+            users = EmailUser.objects.bulk_create(
+                [
+                    EmailUser(email=email, password=hashed)
+                    for (email, _, _), hashed in batch
+                ]
+            )
+            quotas = Quota.objects.bulk_create(
+                [
+                    Quota(user=user, amount=quota)
+                    for user, ((_, _, quota), _) in zip(users, batch)
+                    if quota is not None
+                ]
+            )
+            # bulk_create sends no signals, which copy the amounts of saved quotas
+            copy_quota_amounts(
+                [quota.user_id for quota in quotas], router.db_for_write(Quota)
+            )
+
+    def get_executor(self):
+        if self.hashed or self.processes == 1:
+            return InlineExecutor()
+
+        # forked processes would share, and on exit close, the database connections
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+
+
+class InlineExecutor:
+    """
+    Runs UserProvisioningService's hashing in the calling process, e.g. for few users.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, func, *iterables, chunksize=1):
+        return map(func, *iterables)
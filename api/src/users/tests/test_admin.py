@@ -1,12 +1,168 @@
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+from conftest import UserFactory, count_queries
+from resources.models import Quota
+from resources.tests.conftest import ResourceFactory
+from users.models import EmailUser, UserDeletion
+
 # TODO:
-# Since code from admin modules were overriden, tests should be expected. However,
+# Since code from admin modules were overriden, form tests should be expected. However,
 # doing so would require going through django's internals and due to time constraints
 # on the assignment, I have decided to focus on the completion of the project's
 # end-to-end functionality instead.
 
 
+@pytest.mark.django_db
 class TestEmailUserAdmin:
-    pass
+    def test_changelist_queries_should_not_grow_with_row_count(self, admin_client):
+        # given
+        url = reverse("admin:users_emailuser_changelist")
+        for user in UserFactory.create_batch(2):
+            Quota.objects.create(amount=3, user=user)
+        query_count = count_queries(admin_client, url)
+
+        # when
+        for user in UserFactory.create_batch(20):
+            Quota.objects.create(amount=3, user=user)
+        UserFactory.create_batch(5)  # users without quota
+
+        # then
+        assert count_queries(admin_client, url) == query_count
+
+    def test_changelist_should_display_quota(self, admin_client, given_user):
+        # given
+        Quota.objects.create(amount=7, user=given_user)
+
+        # when
+        response = admin_client.get(reverse("admin:users_emailuser_changelist"))
+
+        # then
+        assert response.status_code == 200
+        assert '<td class="field-quota">7</td>' in response.content.decode()
+
+    @pytest.mark.parametrize(
+        "index", ["users_email_upper_trgm", "users_first_name_upper_trgm"]
+    )
+    def test_search_should_be_served_by_trigram_indexes(self, rf, index):
+        # given
+        model_admin = admin.site._registry[EmailUser]
+        queryset, _ = model_admin.get_search_results(
+            rf.get("/"), EmailUser.objects.all(), "needle"
+        )
+
+        # when
+        with connection.cursor() as cursor:
+            # tables in tests are tiny, force the planner to consider the indexes
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+
+        # then
+        assert index in plan
+
+    @pytest.mark.parametrize(
+        "action,amount,expected",
+        [
+            ("set_quota", "4", [4, 4, 4]),
+            ("increment_quota", "-1", [2, 2, None]),
+            ("clear_quota", "", [None, None, None]),
+        ],
+    )
+    def test_quota_actions_should_apply_to_selected_users(
+        self, admin_client, action, amount, expected
+    ):
+        # given
+        users = UserFactory.create_batch(3)
+        Quota.objects.create(amount=3, user=users[0])
+        Quota.objects.create(amount=3, user=users[1])
+        data = {
+            "action": action,
+            "amount": amount,
+            "_selected_action": [user.id for user in users],
+        }
+
+        # when
+        response = admin_client.post(reverse("admin:users_emailuser_changelist"), data)
+
+        # then
+        assert response.status_code == 302
+        amounts = dict(Quota.objects.values_list("user", "amount"))
+        assert [amounts.get(user.id) for user in users] == expected
+
+    @pytest.mark.parametrize("amount", ["", "-1"])
+    def test_set_quota_action_should_reject_invalid_amount(self, admin_client, amount):
+        # given
+        user = UserFactory.create()
+        data = {"action": "set_quota", "amount": amount, "_selected_action": [user.id]}
+
+        # when
+        response = admin_client.post(
+            reverse("admin:users_emailuser_changelist"), data, follow=True
+        )
+
+        # then
+        assert "Enter an amount between 0 and 32767." in response.content.decode()
+        assert not Quota.objects.exists()
+
+    def test_delete_should_deactivate_user_and_schedule_deletion(
+        self, admin_client, given_user
+    ):
+        # given
+        ResourceFactory.create_batch(3, owner=given_user)
+        url = reverse("admin:users_emailuser_delete", args=[given_user.id])
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            confirmation = admin_client.get(url)
+        response = admin_client.post(url, {"post": "yes"}, follow=True)
+
+        # then
+        assert confirmation.status_code == 200
+        assert "resources_resource" not in str(context.captured_queries)
+        assert response.status_code == 200
+        assert "deleted in the background" in response.content.decode()
+        given_user.refresh_from_db()
+        assert not given_user.is_active
+        assert UserDeletion.objects.get().user == given_user
+
+    def test_delete_selected_action_should_schedule_deletions(self, admin_client):
+        # given
+        users = UserFactory.create_batch(2)
+        data = {
+            "action": "delete_selected",
+            "post": "yes",
+            "_selected_action": [user.id for user in users],
+        }
+
+        # when
+        response = admin_client.post(reverse("admin:users_emailuser_changelist"), data)
+
+        # then
+        assert response.status_code == 302
+        assert set(UserDeletion.objects.values_list("user", flat=True)) == {
+            user.id for user in users
+        }
+        assert not EmailUser.objects.filter(
+            id__in=[u.id for u in users], is_active=True
+        )
+
+    def test_deletions_changelist_should_display_progress(self, admin_client):
+        # given
+        UserDeletion.objects.create(
+            email="heavy@test-domain.com", resources_total=4, resources_deleted=1
+        )
+
+        # when
+        response = admin_client.get(reverse("admin:users_userdeletion_changelist"))
+
+        # then
+        assert response.status_code == 200
+        assert (
+            '<td class="field-progress_percent">25%</td>' in response.content.decode()
+        )
 
 
 class TestEmailUserAdminForms:
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+import pytest
+from conftest import UserFactory
+from resources.tests.conftest import ResourceFactory
+from resources.models import Quota
+from users.models import EmailUser, UserDeletion
+from users.services import UserDeletionService
+
+
+@pytest.mark.django_db
+class TestPurgeDeletedUsersCommand:
+    def test_should_purge_pending_deletions_and_report_progress(self, settings):
+        # given
+        settings.USER_DELETION_BATCH_SIZE = 2
+        user = UserFactory.create(email="heavy@test-domain.com")
+        ResourceFactory.create_batch(3, owner=user)
+        UserDeletionService.schedule(user)
+        stdout = StringIO()
+
+        # when
+        call_command("purge_deleted_users", "--max-batches=1", stdout=stdout)
+        call_command("purge_deleted_users", verbosity=2, stdout=stdout)
+
+        # then
+        assert stdout.getvalue().splitlines() == [
+            "heavy@test-domain.com: 2 of 3 resources deleted (66%)",
+            # a batch per line, the last one deletes the user
+            "heavy@test-domain.com: 3 of 3 resources deleted (100%)",
+            "heavy@test-domain.com: 3 of 3 resources deleted (100%)",
+            "heavy@test-domain.com: deleted",
+        ]
+        assert not EmailUser.objects.filter(id=user.id).exists()
+        assert UserDeletion.objects.get().status == UserDeletion.STATUS_DONE
+
+
+@pytest.mark.django_db
+class TestProvisionUsersCommand:
+    def test_should_provision_users_and_report_throughput(self, tmp_path):
+        # given
+        path = tmp_path / "users.csv"
+        path.write_text("email,password,quota\nalice@test-domain.com,,3\n")
+        stdout = StringIO()
+
+        # when
+        call_command("provision_users", str(path), "--processes=1", stdout=stdout)
+
+        # then
+        assert stdout.getvalue().startswith(
+            "Created 1 users (1 invited), skipped 0 already registered, in "
+        )
+        assert Quota.objects.get().user.email == "alice@test-domain.com"
+
+    def test_should_fail_given_invalid_lines(self, tmp_path):
+        # given
+        path = tmp_path / "users.csv"
+        path.write_text("email\nalice\nbob\n")
+
+        # when
+        with pytest.raises(CommandError) as excinfo:
+            call_command("provision_users", str(path))
+
+        # then
+        assert str(excinfo.value).splitlines() == [
+            "Line 2: enter a valid email address.",
+            "Line 3: enter a valid email address.",
+        ]
+        assert not EmailUser.objects.exists()
@@ -1,4 +1,4 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 
 import pytest
 from users.models import EmailUser, EmailUserManager
@@ -32,6 +32,39 @@ class TestEmailUser:
             in str(excinfo.value)
         )
 
+    def test_email_user_should_not_be_created_for_existing_email_in_other_case(
+        self, email, password
+    ):
+        # given
+        EmailUser.objects.create_user(email=email, password=password)
+
+        # when
+        with pytest.raises(IntegrityError) as excinfo:
+            EmailUser.objects.create_user(email=email.upper(), password=password)
+
+        # then
+        assert '"users_email_lower_unique"' in str(excinfo.value)
+
+    def test_get_by_natural_key_should_ignore_case(self, email, password):
+        # given
+        user = EmailUser.objects.create_user(email=email, password=password)
+
+        # when
+        result = EmailUser.objects.get_by_natural_key(email.upper())
+
+        # then
+        assert result == user
+
+    def test_filter_email_should_be_served_by_lower_index(self, email):
+        # when
+        with connection.cursor() as cursor:
+            # tables in tests are tiny, force the planner to consider the indexes
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = EmailUser.objects.filter_email(email).explain()
+
+        # then
+        assert "users_email_lower_unique" in plan
+
     def test_email_user_should_not_be_created_without_email(self, faker, password):
         # given
         username = faker.user_name()
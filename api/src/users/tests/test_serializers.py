@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
 
 import pytest
@@ -18,20 +20,25 @@ class TestCreateUserSerializer:
         assert serializer.is_valid()
         assert serializer.validated_data == data
 
-    def test_deserialize_is_not_valid_given_existing_email(self, email, password):
+    @pytest.mark.parametrize("case", [str, str.upper])
+    def test_save_should_raise_error_given_existing_email(self, email, password, case):
         # given
-        data = {"email": email, "password": password}
+        data = {"email": case(email), "password": password}
         user_model = get_user_model()
-        user_model.objects.create_user(**data)
-
-        # when
+        user_model.objects.create_user(email=email, password=password)
         serializer = CreateUserSerializer(data=data)
 
-        # then
+        # when
+        with CaptureQueriesContext(connection) as context:
+            assert serializer.is_valid()
         with pytest.raises(ValidationError) as excinfo:
-            serializer.is_valid(raise_exception=True)
+            serializer.save()
 
+        # then
+        assert not context.captured_queries  # left to the unique indexes
+        assert "unique" == excinfo.value.detail["email"][0].code
         assert "A user with that email address already exists" in str(excinfo.value)
+        assert user_model.objects.count() == 1
 
     def test_deserialize_is_not_valid_given_malformed_email(self, password):
         # given
@@ -1,9 +1,23 @@
+import json
+
+from django.contrib.auth.hashers import check_password
+from django.core.exceptions import ValidationError
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.test import APIRequestFactory
 
 import pytest
-from users.services import LoginUserService
+from conftest import UserFactory
+from core.jobs import claim_job, run_job
+from core.models import Job
+from resources.models import Quota, Resource, ResourceCount, ResourceTombstone
+from resources.tests.conftest import ResourceFactory
+from users.models import EmailUser, UserDeletion, UserProvisioning
+from users.services import (
+    LoginUserService,
+    UserDeletionService,
+    UserProvisioningService,
+)
 
 
 @pytest.fixture
@@ -165,3 +179,213 @@ class TestLoginUserService:
         assert response.cookies["access"]["secure"]
         assert response.cookies["access"]["httponly"]
         assert response.cookies["refresh"]["samesite"] == "None"
+
+
+@pytest.fixture
+def heavy_user(settings):
+    settings.USER_DELETION_BATCH_SIZE = 2
+    user = UserFactory.create()
+    ResourceFactory.create_batch(5, owner=user)
+    Quota.objects.create(amount=10, user=user)
+    return user
+
+
+@pytest.mark.django_db
+class TestUserDeletionService:
+    def test_schedule_should_deactivate_user_and_queue_purge(self, heavy_user):
+        # when
+        deletion = UserDeletionService.schedule(heavy_user)
+
+        # then
+        heavy_user.refresh_from_db()
+        assert not heavy_user.is_active
+        assert deletion.user == heavy_user
+        assert deletion.email == heavy_user.email
+        assert deletion.status == UserDeletion.STATUS_PENDING
+        assert (deletion.resources_total, deletion.resources_deleted) == (5, 0)
+        assert UserDeletionService.schedule(heavy_user) == deletion
+        queued = Job.objects.get()  # once
+        assert queued.name == "users.jobs.purge_user_deletion"
+        assert queued.args == [deletion.id]
+
+    def test_purge_job_should_purge_deletion(self, heavy_user):
+        # given
+        deletion = UserDeletionService.schedule(heavy_user)
+
+        # when
+        run_job(claim_job("worker"))
+
+        # then
+        deletion.refresh_from_db()
+        assert deletion.status == UserDeletion.STATUS_DONE
+        assert not EmailUser.objects.filter(id=heavy_user.id).exists()
+
+    def test_purge_batch_should_delete_resources_in_batches(self, heavy_user):
+        # given
+        other_resource = ResourceFactory.create()
+        service = UserDeletionService(UserDeletionService.schedule(heavy_user))
+
+        # when
+        counts = [service.purge_batch() for _ in range(3)]
+
+        # then
+        assert counts == [2, 2, 1]
+        assert not Resource.objects.filter(owner=heavy_user).exists()
+        assert EmailUser.objects.filter(id=heavy_user.id).exists()
+        assert service.deletion.progress == 1.0
+
+        # when
+        assert service.purge_batch() == 0
+
+        # then
+        assert not EmailUser.objects.filter(id=heavy_user.id).exists()
+        assert not Quota.objects.filter(user_id=heavy_user.id).exists()
+        assert Resource.objects.filter(id=other_resource.id).exists()
+        deletion = UserDeletion.objects.get()
+        assert deletion.user is None
+        assert deletion.status == UserDeletion.STATUS_DONE
+        assert deletion.resources_deleted == 5
+        assert deletion.finished_at is not None
+
+    def test_purge_should_resume_where_it_stopped(self, heavy_user):
+        # given
+        deletion = UserDeletionService.schedule(heavy_user)
+        progress = []
+
+        # when
+        stopped = UserDeletionService(deletion).purge(max_batches=1)
+        counted = ResourceCount.objects.get(owner_id=heavy_user.id).count
+        done = UserDeletionService(UserDeletion.objects.get()).purge(
+            on_progress=lambda deletion: progress.append(deletion.progress)
+        )
+
+        # then
+        assert (stopped, done) == (False, True)
+        assert counted == 3
+        assert progress == [0.8, 1.0, 1.0]
+        assert not EmailUser.objects.filter(id=heavy_user.id).exists()
+
+    def test_purge_should_bypass_resource_signals(self, heavy_user):
+        # when
+        UserDeletionService(UserDeletionService.schedule(heavy_user)).purge()
+
+        # then
+        assert not ResourceTombstone.objects.filter(owner_id=heavy_user.id).exists()
+
+
+@pytest.mark.django_db
+class TestUserProvisioningService:
+    csv = [
+        "email,password,quota",
+        "alice@test-domain.com,s3cret-pass,5",
+        "bob@Test-Domain.com,,",
+        "carol@test-domain.com,0ther-pass,",
+    ]
+
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test_provision_should_create_users_and_quotas(self, processes):
+        # given
+        service = UserProvisioningService.from_csv(
+            self.csv, processes=processes, batch_size=2
+        )
+
+        # when
+        result = service.provision()
+
+        # then
+        assert (result["created"], result["invited"], result["skipped"]) == (3, 1, 0)
+        assert result["users_per_second"] > 0
+        alice, bob, carol = EmailUser.objects.order_by("email")
+        assert alice.check_password("s3cret-pass")
+        assert carol.check_password("0ther-pass")
+        assert bob.email == "bob@test-domain.com"  # normalized
+        assert not bob.has_usable_password()
+        assert dict(Quota.objects.values_list("user", "amount")) == {alice.id: 5}
+
+    def test_provision_should_skip_registered_emails(self):
+        # given
+        UserFactory.create(email="ALICE@test-domain.com")
+        service = UserProvisioningService.from_csv(self.csv, processes=1)
+
+        # when
+        result = service.provision()
+
+        # then
+        assert (result["created"], result["skipped"]) == (2, 1)
+        assert not Quota.objects.exists()
+        assert EmailUser.objects.count() == 3
+
+    def test_schedule_should_queue_provisioning(self, given_user):
+        # given
+        service = UserProvisioningService.from_csv(self.csv)
+
+        # when
+        provisioning = service.schedule(created_by=given_user)
+
+        # then
+        assert provisioning.status == UserProvisioning.STATUS_PENDING
+        assert provisioning.created_by == given_user
+        assert provisioning.job.name == "users.jobs.provision_users"
+        assert provisioning.job.args == [provisioning.id]
+        assert EmailUser.objects.count() == 1  # not provisioned yet
+        assert "s3cret-pass" not in json.dumps(provisioning.rows)
+        alice_hash = provisioning.rows[0][1]
+        assert check_password("s3cret-pass", alice_hash)
+
+    def test_schedule_should_raise_error_given_too_many_passwords(self, settings):
+        # given
+        settings.USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS = 1
+        service = UserProvisioningService.from_csv(self.csv)
+
+        # when
+        with pytest.raises(ValidationError) as excinfo:
+            service.schedule()
+
+        # then
+        assert excinfo.value.messages[0].startswith("The file has 2 passwords")
+        assert not UserProvisioning.objects.exists()
+
+    def test_provision_job_should_provision_and_clear_rows(self, settings):
+        # given
+        settings.USER_PROVISIONING_PROCESSES = 1
+        provisioning = UserProvisioningService.from_csv(self.csv).schedule()
+
+        # when
+        run_job(claim_job("worker"))
+        run_job(Job.objects.get())  # run again e.g. after its lease expired
+
+        # then
+        provisioning.refresh_from_db()
+        assert provisioning.status == UserProvisioning.STATUS_DONE
+        assert (provisioning.result["created"], provisioning.result["invited"]) == (
+            3,
+            1,
+        )
+        assert provisioning.rows == []
+        assert provisioning.finished_at is not None
+        assert EmailUser.objects.get(email="alice@test-domain.com").check_password(
+            "s3cret-pass"
+        )
+
+    @pytest.mark.parametrize(
+        "lines,error",
+        [
+            (["mail", "alice@test-domain.com"], "The first line must name the columns"),
+            (["email", "alice"], "Line 2: enter a valid email address."),
+            (
+                ["email", "alice@test-domain.com", "Alice@test-domain.com"],
+                "Line 3: Alice@test-domain.com is listed twice.",
+            ),
+            (
+                ["email,quota", "alice@test-domain.com,-1"],
+                "Line 2: enter a quota between 0 and 32767.",
+            ),
+        ],
+    )
+    def test_from_csv_should_raise_error_given_invalid_lines(self, lines, error):
+        # when
+        with pytest.raises(ValidationError) as excinfo:
+            UserProvisioningService.from_csv(lines)
+
+        # then
+        assert excinfo.value.messages[0].startswith(error)
@@ -1,3 +1,6 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.reverse import reverse
@@ -5,6 +8,10 @@ from rest_framework.test import APIClient
 
 import pytest
 from conftest import TRUSTED_REFERER, UserFactory
+from core.jobs import claim_job, run_job
+from core.models import Job
+from resources.models import Quota
+from users.models import EmailUser, UserProvisioning
 from users.views import logger
 
 
@@ -73,6 +80,41 @@ class TestUserViewSet:
             response.cookies["csrftoken"].value != csrftoken
         )  # different token is issued
 
+    def test_post_should_insert_user_with_single_query(self, email, password):
+        # given
+        client = APIClient()
+        data = {"email": email, "password": password}
+
+        # when
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(reverse("users:register"), data)
+
+        # then
+        assert response.status_code == status.HTTP_201_CREATED
+        user_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "users_emailuser" in query["sql"]
+        ]
+        assert len(user_queries) == 1
+        assert user_queries[0].startswith("INSERT")
+
+    def test_post_should_400_given_existing_email_in_other_case(self, email, password):
+        # given
+        client = APIClient()
+        UserFactory.create(email=email, password=password)
+        data = {"email": email.upper(), "password": password}
+
+        # when
+        response = client.post(reverse("users:register"), data)
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "unique" == response.data["email"][0].code
+        assert "A user with that email address already exists" in str(
+            response.data["email"][0]
+        )
+
 
 class TestLoginUserView:
     def test_post_should_fail_without_csrf_token_header(
@@ -154,3 +196,107 @@ class TestLoginUserView:
         assert response.cookies["refresh"]
         assert response.cookies["access"]
         assert response.cookies["csrftoken"].value != csrftoken
+
+    @pytest.mark.django_db
+    def test_post_should_succeed_given_email_in_other_case(self, email, password):
+        # given
+        client = APIClient()
+        UserFactory.create(email=email, password=password)
+        data = {"email": email.upper(), "password": password}
+
+        # when
+        response = client.post(reverse("users:login"), data)
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestUserProvisioningView:
+    @pytest.fixture
+    def staff_client(self, given_user, settings):
+        settings.USER_PROVISIONING_PROCESSES = 1
+        given_user.is_staff = True
+        given_user.save()
+        client = APIClient()
+        client.force_authenticate(user=given_user)
+        return client
+
+    def upload(self, content):
+        return {"file": SimpleUploadedFile("users.csv", content)}
+
+    def test_post_should_provision_users(self, staff_client):
+        # given
+        data = self.upload(b"\xef\xbb\xbfemail,quota\nalice@test-domain.com,2\n")
+
+        # when
+        response = staff_client.post(reverse("users:provision"), data)
+
+        # then
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status"] == UserProvisioning.STATUS_PENDING
+        assert response.data["job_status"] == Job.STATUS_QUEUED
+        assert response["Location"].endswith(
+            reverse("users:provisioning", args=[response.data["id"]])
+        )
+        assert not Quota.objects.exists()  # provisioned by the job
+
+    def test_get_should_return_provisioning_result(self, staff_client):
+        # given
+        data = self.upload(b"email,quota\nalice@test-domain.com,2\n")
+        location = staff_client.post(reverse("users:provision"), data)["Location"]
+        run_job(claim_job("worker"))
+
+        # when
+        response = staff_client.get(location)
+
+        # then
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == UserProvisioning.STATUS_DONE
+        assert response.data["job_status"] == Job.STATUS_DONE
+        assert response.data["result"]["created"] == 1
+        assert Quota.objects.get().user.email == "alice@test-domain.com"
+
+    @pytest.mark.parametrize(
+        "content,error",
+        [
+            (b"email\nalice\n", "Line 2: enter a valid email address."),
+            (b"email\n\xff\n", "The file must be UTF-8 encoded."),
+        ],
+    )
+    def test_post_should_400_given_invalid_file(self, staff_client, content, error):
+        # when
+        response = staff_client.post(reverse("users:provision"), self.upload(content))
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["file"] == [error]
+        assert EmailUser.objects.count() == 1  # the staff user
+
+    def test_post_should_400_given_too_many_passwords(self, staff_client, settings):
+        # given
+        settings.USER_PROVISIONING_MAX_SCHEDULED_PASSWORDS = 1
+        data = self.upload(
+            b"email,password\na@test-domain.com,p\nb@test-domain.com,p\n"
+        )
+
+        # when
+        response = staff_client.post(reverse("users:provision"), data)
+
+        # then
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "manage.py provision_users" in response.data["file"][0]
+        assert not UserProvisioning.objects.exists()
+
+    def test_post_should_403_given_non_staff_user(self, given_user):
+        # given
+        client = APIClient()
+        client.force_authenticate(user=given_user)
+        data = self.upload(b"email\nalice@test-domain.com\n")
+
+        # when
+        response = client.post(reverse("users:provision"), data)
+
+        # then
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert EmailUser.objects.count() == 1
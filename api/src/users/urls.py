@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import CsrfCookieView, LoginUserView, UserViewSet
+from .views import CsrfCookieView, LoginUserView, UserProvisioningView, UserViewSet
 
 app_name = "users"
 
@@ -8,4 +8,14 @@ urlpatterns = [
     path("csrf-cookie/", CsrfCookieView.as_view(), name="get-csrf-cookie"),
     path("register/", UserViewSet.as_view({"post": "register"}), name="register"),
     path("login/", LoginUserView.as_view({"post": "login"}), name="login"),
+    path(
+        "provision/",
+        UserProvisioningView.as_view({"post": "provision"}),
+        name="provision",
+    ),
+    path(
+        "provision/<int:pk>/",
+        UserProvisioningView.as_view({"get": "retrieve"}),
+        name="provisioning",
+    ),
 ]
@@ -1,17 +1,27 @@
 import logging
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
 from rest_framework import exceptions, status
-from rest_framework.mixins import CreateModelMixin
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
-from users.services import LoginUserService
+from users.models import UserProvisioning
+from users.services import LoginUserService, UserProvisioningService
 
-from .authentication import CsrfAuthentication
-from .serializers import CreateUserSerializer, LoginUserSerializer
+from .authentication import CsrfAuthentication, JWTCookieAuthentication
+from .serializers import (
+    CreateUserSerializer,
+    LoginUserSerializer,
+    ProvisionUsersSerializer,
+    UserProvisioningSerializer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -86,3 +96,47 @@ class LoginUserView(GenericViewSet):
         login_user_service.set_cookies_for_response(response)
 
         return response
+
+
+class UserProvisioningView(GenericViewSet):
+    """
+    Staff endpoint creating the users and quotas listed in an uploaded CSV file. The file
+    is validated and its passwords hashed in the request, then its users are inserted
+    by a job of `manage.py run_jobs` workers, whose progress is polled at the returned
+    Location. Files with many passwords are provisioned with `manage.py provision_users`.
+    """
+
+    authentication_classes = [JWTCookieAuthentication]
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    serializer_class = ProvisionUsersSerializer
+
+    def provision(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        content = serializer.validated_data["file"].read()
+        try:
+            service = UserProvisioningService.from_csv(
+                content.decode("utf-8-sig").splitlines()
+            )
+            provisioning = service.schedule(created_by=request.user)
+        except (UnicodeDecodeError, DjangoValidationError) as e:
+            messages = getattr(e, "messages", ["The file must be UTF-8 encoded."])
+            raise exceptions.ValidationError({"file": messages})
+
+        location = reverse(
+            "users:provisioning", args=[provisioning.id], request=request
+        )
+        return Response(
+            UserProvisioningSerializer(provisioning).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location},
+        )
+
+    def retrieve(self, request, pk=None):
+        provisioning = get_object_or_404(
+            UserProvisioning.objects.select_related("job"), pk=pk
+        )
+        return Response(UserProvisioningSerializer(provisioning).data)